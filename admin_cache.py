@@ -0,0 +1,86 @@
+import asyncio
+import logging
+import time
+from collections import OrderedDict
+
+logger = logging.getLogger(__name__)
+
+ADMIN_STATUSES = ("administrator", "creator")
+
+
+# 🔹 Per-chat admin cache (TTL + LRU)
+# Ek chat ke saare admins ek hi get_chat_administrators call me aate hai,
+# aur ChatMemberUpdated events cache ko turant update kar dete hai.
+class AdminCache:
+    def __init__(self, ttl=600, max_chats=5000):
+        self.ttl = ttl
+        self.max_chats = max_chats
+        self.chats = OrderedDict()  # chat_id -> (expires_at, set(admin_ids))
+        self.inflight = {}          # chat_id -> Future (ek chat ke liye ek hi fetch)
+        self.hits = 0
+        self.misses = 0
+
+    def _lookup(self, chat_id):
+        entry = self.chats.get(chat_id)
+        if entry is None:
+            return None
+        expires_at, admins = entry
+        if time.monotonic() >= expires_at:
+            del self.chats[chat_id]
+            return None
+        self.chats.move_to_end(chat_id)
+        return admins
+
+    def _store(self, chat_id, admins):
+        self.chats[chat_id] = (time.monotonic() + self.ttl, admins)
+        self.chats.move_to_end(chat_id)
+        while len(self.chats) > self.max_chats:
+            self.chats.popitem(last=False)
+
+    # Admin ids ka set lo; cache miss pe `fetch()` (get_chat_administrators) chalao
+    async def get_admins(self, chat_id, fetch):
+        admins = self._lookup(chat_id)
+        if admins is not None:
+            self.hits += 1
+            return admins
+
+        self.misses += 1
+        pending = self.inflight.get(chat_id)
+        if pending is not None:
+            return await asyncio.shield(pending)
+
+        future = asyncio.get_running_loop().create_future()
+        self.inflight[chat_id] = future
+        try:
+            members = await fetch()
+            admins = {member.user.id for member in members if member.status in ADMIN_STATUSES}
+            self._store(chat_id, admins)
+            future.set_result(admins)
+            return admins
+        except Exception as e:
+            future.set_exception(e)
+            # Kisi ne await nahi kiya to "exception never retrieved" warning na aaye
+            future.exception()
+            raise
+        finally:
+            del self.inflight[chat_id]
+
+    async def is_admin(self, chat_id, user_id, fetch) -> bool:
+        return user_id in await self.get_admins(chat_id, fetch)
+
+    # ChatMemberUpdated se cache ko in-place update karo
+    def apply_status(self, chat_id, user_id, status):
+        entry = self.chats.get(chat_id)
+        if entry is None:
+            return
+        _, admins = entry
+        if status in ADMIN_STATUSES:
+            admins.add(user_id)
+        else:
+            admins.discard(user_id)
+
+    def invalidate(self, chat_id=None):
+        if chat_id is None:
+            self.chats.clear()
+        else:
+            self.chats.pop(chat_id, None)
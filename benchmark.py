@@ -0,0 +1,461 @@
+import os
+import sys
+import json
+import time
+import random
+import asyncio
+import logging
+import argparse
+import platform
+import resource
+import tempfile
+import subprocess
+from collections import Counter
+
+from telegram.request import BaseRequest
+
+BENCH_DIR = os.path.dirname(os.path.abspath(__file__))
+BENCH_TOKEN = "123456:BENCHMARK"
+BOT_ID = 123456
+ADMIN_ID = 1
+CHAT_BASE = -1001000000000
+
+# Default matrix: group sizes x banned list sizes
+SUITE_MEMBERS = (1000, 10000, 100000, 1000000)
+SUITE_BANNED = (10, 100, 1000)
+
+
+# 🔹 Fake Bot API: Telegram ki jagah local jawab (koi network nahi)
+# Har method ki ginti rakhta hai; latency diya ho to utna ruk kar jawab deta hai.
+class FakeBotAPI(BaseRequest):
+    def __init__(self, latency=0.0):
+        self.latency = latency
+        self.calls = Counter()
+        self.message_id = 0
+
+    @property
+    def read_timeout(self):
+        return None
+
+    async def initialize(self):
+        pass
+
+    async def shutdown(self):
+        pass
+
+    async def do_request(self, url, method, request_data=None, read_timeout=None,
+                         write_timeout=None, connect_timeout=None, pool_timeout=None):
+        api_method = url.rsplit("/", 1)[-1]
+        params = request_data.parameters if request_data is not None else {}
+        self.calls[api_method] += 1
+        if self.latency:
+            await asyncio.sleep(self.latency)
+        body = {"ok": True, "result": self._result(api_method, params)}
+        return 200, json.dumps(body).encode()
+
+    def _result(self, api_method, params):
+        if api_method == "getMe":
+            return {"id": BOT_ID, "is_bot": True, "first_name": "Bench", "username": "bench_bot"}
+        if api_method == "getChatAdministrators":
+            return [{"status": "creator", "is_anonymous": False, "user": fake_user(ADMIN_ID)}]
+        if api_method == "getChatMember":
+            return {"status": "member", "user": fake_user(int(params.get("user_id", 0)))}
+        if api_method in ("sendMessage", "forwardMessage", "copyMessage", "sendDocument"):
+            self.message_id += 1
+            return {
+                "message_id": self.message_id,
+                "date": int(time.time()),
+                "chat": {"id": int(params.get("chat_id", 0)), "type": "supergroup", "title": "Bench"},
+            }
+        return True
+
+
+def fake_user(user_id):
+    return {"id": user_id, "is_bot": False, "first_name": f"U{user_id}"}
+
+
+def banned_word(i):
+    return f"spamword{i}"
+
+
+# 🔹 Synthetic update stream (dict form, Telegram jaisa JSON)
+# Mix: zyadatar normal text, kuch banned words, links, triggers aur naye members.
+def synthetic_updates(count, members, groups, banned, new_member_ratio=0.05, seed=1):
+    rng = random.Random(seed)
+    per_group = max(1, members // groups)
+    now = int(time.time())
+    for update_id in range(1, count + 1):
+        chat_id = CHAT_BASE - rng.randrange(groups)
+        if rng.random() < new_member_ratio:
+            user_id = 10_000_000 + update_id  # abhi tak index me nahi
+        else:
+            user_id = 100 + rng.randrange(per_group)
+
+        roll = rng.random()
+        if roll < 0.05 and banned:
+            text = f"buy now {banned_word(rng.randrange(banned))} cheap"
+        elif roll < 0.10:
+            text = f"check https://example.com/{update_id}"
+        elif roll < 0.12:
+            text = "hello"
+        else:
+            text = f"just chatting about topic {rng.randrange(1000)} with everyone here"
+
+        yield {
+            "update_id": update_id,
+            "message": {
+                "message_id": update_id,
+                "date": now,
+                "chat": {"id": chat_id, "type": "supergroup", "title": "Bench"},
+                "from": fake_user(user_id),
+                "text": text,
+            },
+        }
+
+
+def recorded_updates(path):
+    with open(path, "r", encoding="utf-8") as file:
+        for line in file:
+            line = line.strip()
+            if line:
+                yield json.loads(line)
+
+
+# Linux pe /proc se process ka I/O (rchar/wchar = read/write syscalls ke bytes)
+def io_counters():
+    try:
+        with open("/proc/self/io", "r") as file:
+            return {key: int(value) for key, value in (line.split(": ") for line in file)}
+    except OSError:
+        return {}
+
+
+def rss_bytes():
+    try:
+        with open("/proc/self/statm", "r") as file:
+            return int(file.read().split()[1]) * os.sysconf("SC_PAGE_SIZE")
+    except (OSError, ValueError):
+        return None
+
+
+def peak_rss_bytes():
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return peak if sys.platform == "darwin" else peak * 1024
+
+
+def percentile(sorted_values, fraction):
+    if not sorted_values:
+        return 0.0
+    index = min(len(sorted_values) - 1, int(round(fraction * (len(sorted_values) - 1))))
+    return sorted_values[index]
+
+
+def directory_size(path):
+    total = 0
+    for root, _, files in os.walk(path):
+        for name in files:
+            try:
+                total += os.path.getsize(os.path.join(root, name))
+            except OSError:
+                pass
+    return total
+
+
+# Storage me pehle se members aur banned words daal do (bot import se pehle)
+def seed_storage(backend, members, groups, banned):
+    from storage import open_storage, DEFAULT_CHAT, default_settings
+
+    storage = open_storage(
+        backend,
+        database_file="bot.db",
+        members_file="members.jsonl",
+        users_file="users.json",
+        settings_file="settings.json",
+        triggers_file="triggers.json",
+    )
+    per_group = max(1, members // groups)
+    rows = []
+    for group in range(groups):
+        chat_id = str(CHAT_BASE - group)
+        for user_id in range(100, 100 + per_group):
+            rows.append((chat_id, user_id, f"U{user_id}", None, None))
+    storage.add_members(rows)
+
+    settings = default_settings()
+    settings["block_links"] = True
+    settings["banned_words"] = [banned_word(i) for i in range(banned)]
+    storage.save_chat_settings(DEFAULT_CHAT, settings)
+    storage.set_trigger("hello", {"chat_id": CHAT_BASE, "message_id": 1})
+    storage.add_user(ADMIN_ID)
+    storage.close()
+
+
+# 🔹 Ek scenario: isi process me (fresh working directory ke andar) chalta hai
+async def run_scenario(args):
+    started = time.perf_counter()
+    seed_storage(args.backend, args.members, args.groups, args.banned)
+    seed_seconds = time.perf_counter() - started
+
+    rss_before = rss_bytes()
+    started = time.perf_counter()
+    import bot
+    bot.load_settings()
+    bot.load_triggers()
+    load_seconds = time.perf_counter() - started
+    rss_loaded = rss_bytes()
+    if not args.log:
+        logging.disable(logging.INFO)
+
+    from telegram import Update
+    from telegram.ext import TypeHandler
+
+    latencies = []
+    fake = FakeBotAPI(latency=args.api_latency)
+    application = bot.build_application(token=BENCH_TOKEN, webhook=True, request=fake)
+    errors = Counter()
+
+    async def count_error(update, context):
+        errors[type(context.error).__name__] += 1
+
+    application.add_error_handler(count_error)
+
+    # Concurrent mode: updates asli queue + ChatOrderedProcessor se jaate hai; latency =
+    # queue me daalne se aakhri handler group tak
+    clock = time.perf_counter
+    queued_at = {}
+
+    async def finished(update, context):
+        latencies.append(clock() - queued_at.pop(id(update)))
+
+    if args.concurrency > 1:
+        application.add_handler(TypeHandler(Update, finished), group=99)
+    await application.initialize()
+    await application.start()
+
+    if args.replay:
+        source = recorded_updates(args.replay)
+    else:
+        source = synthetic_updates(args.updates, args.members, args.groups, args.banned, seed=args.seed)
+    # JSON -> Update decode timing se bahar rakho
+    updates = [Update.de_json(data, application.bot) for data in source]
+
+    io_before = io_counters()
+    run_started = clock()
+    if args.concurrency > 1:
+        for update in updates:
+            queued_at[id(update)] = clock()
+            await application.update_queue.put(update)
+        await application.update_queue.join()
+    else:
+        for update in updates:
+            t0 = clock()
+            await application.process_update(update)
+            latencies.append(clock() - t0)
+    run_seconds = clock() - run_started
+    rss_after = rss_bytes()
+
+    # Shutdown bhi measure karo: pending writes yahin flush hote hai
+    started = time.perf_counter()
+    await application.stop()
+    await bot.on_stop(application)
+    await application.shutdown()
+    await bot.on_shutdown(application)
+    shutdown_seconds = time.perf_counter() - started
+    io_after = io_counters()
+
+    latencies.sort()
+    return {
+        "scenario": {
+            "backend": args.backend,
+            "members": args.members,
+            "groups": args.groups,
+            "banned": args.banned,
+            "updates": len(updates),
+            "replay": args.replay,
+            "api_latency": args.api_latency,
+            "rate_limits": args.rate_limits,
+            "concurrency": args.concurrency,
+        },
+        "updates_per_sec": len(updates) / run_seconds if run_seconds else None,
+        "latency_ms": {
+            "p50": percentile(latencies, 0.50) * 1e3,
+            "p90": percentile(latencies, 0.90) * 1e3,
+            "p99": percentile(latencies, 0.99) * 1e3,
+            "max": (latencies[-1] * 1e3) if latencies else 0.0,
+            "mean": (sum(latencies) / len(latencies) * 1e3) if latencies else 0.0,
+        },
+        "seconds": {
+            "seed": seed_seconds,
+            "load": load_seconds,
+            "run": run_seconds,
+            "shutdown": shutdown_seconds,
+        },
+        "memory": {
+            "rss_before_load": rss_before,
+            "rss_loaded": rss_loaded,
+            "rss_after_run": rss_after,
+            "growth_during_run": (rss_after - rss_loaded) if rss_after and rss_loaded else None,
+            "peak_rss": peak_rss_bytes(),
+        },
+        "io": {
+            "read_bytes": io_after.get("rchar", 0) - io_before.get("rchar", 0) if io_before else None,
+            "write_bytes": io_after.get("wchar", 0) - io_before.get("wchar", 0) if io_before else None,
+            "disk_write_bytes": (io_after.get("write_bytes", 0) - io_before.get("write_bytes", 0)
+                                 if io_before else None),
+            "storage_writes": bot.PERSISTENCE.writes,
+            "storage_coalesced": bot.PERSISTENCE.coalesced,
+            "data_dir_bytes": directory_size("."),
+        },
+        "bot_api_calls": dict(fake.calls),
+        "handler_errors": dict(errors),
+    }
+
+
+def run_command(args):
+    workdir = args.workdir or tempfile.mkdtemp(prefix="bench-")
+    os.chdir(workdir)
+    sys.path.insert(0, BENCH_DIR)
+    os.environ["BOT_TOKEN"] = BENCH_TOKEN
+    os.environ["STORAGE_BACKEND"] = args.backend
+    os.environ["CONCURRENT_UPDATES"] = str(args.concurrency)
+    for name in ("METRICS_PORT", "METRICS_FILE", "BOT_API_URL"):
+        os.environ.pop(name, None)
+    if not args.rate_limits:
+        # Outbound limits handler ka CPU time chhupa dete hai (trigger forwards 20/min pe ruk jaate)
+        os.environ["OUTBOUND_GLOBAL_RATE"] = "1000000000"
+        os.environ["OUTBOUND_CHAT_RATE"] = "1000000000"
+        os.environ["OUTBOUND_CHAT_BURST"] = "1000000000"
+    result = asyncio.run(run_scenario(args))
+    print(json.dumps(result))
+
+
+# Har scenario alag process me - module-level state aur memory ek doosre ko na bigaade
+def suite_command(args):
+    results = []
+    for members in args.members:
+        for banned in args.banned:
+            with tempfile.TemporaryDirectory(prefix="bench-") as workdir:
+                command = [
+                    sys.executable, os.path.abspath(__file__), "run",
+                    "--backend", args.backend,
+                    "--members", str(members),
+                    "--groups", str(args.groups),
+                    "--banned", str(banned),
+                    "--updates", str(args.updates),
+                    "--api-latency", str(args.api_latency),
+                    "--seed", str(args.seed),
+                    "--concurrency", str(args.concurrency),
+                    "--workdir", workdir,
+                ]
+                print(f"▶ members={members} banned={banned} ...", file=sys.stderr, flush=True)
+                completed = subprocess.run(command, capture_output=True, text=True)
+                if completed.returncode != 0:
+                    print(completed.stderr, file=sys.stderr)
+                    results.append({"scenario": {"members": members, "banned": banned}, "error": completed.returncode})
+                    continue
+                result = json.loads(completed.stdout.strip().splitlines()[-1])
+                results.append(result)
+                print(
+                    f"  {result['updates_per_sec']:.0f} upd/s, p50 {result['latency_ms']['p50']:.2f}ms, "
+                    f"p99 {result['latency_ms']['p99']:.2f}ms, +{(result['memory']['growth_during_run'] or 0) / 1e6:.1f}MB",
+                    file=sys.stderr, flush=True,
+                )
+
+    report = {
+        "meta": {
+            "created": time.strftime("%Y-%m-%dT%H:%M:%S%z"),
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+            "commit": git_commit(),
+        },
+        "results": results,
+    }
+    output = json.dumps(report, indent=2)
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as file:
+            file.write(output)
+    else:
+        print(output)
+
+
+def git_commit():
+    try:
+        return subprocess.run(["git", "rev-parse", "--short", "HEAD"], cwd=BENCH_DIR,
+                              capture_output=True, text=True).stdout.strip() or None
+    except OSError:
+        return None
+
+
+def scenario_key(result):
+    scenario = result["scenario"]
+    return (scenario.get("backend"), scenario.get("members"), scenario.get("groups"), scenario.get("banned"))
+
+
+# 🔹 Do reports compare karo; threshold se zyada slow hua to exit code 1
+def compare_command(args):
+    with open(args.baseline, "r", encoding="utf-8") as file:
+        baseline = {scenario_key(r): r for r in json.load(file)["results"] if "error" not in r}
+    with open(args.current, "r", encoding="utf-8") as file:
+        current = [r for r in json.load(file)["results"] if "error" not in r]
+
+    regressions = 0
+    for result in current:
+        old = baseline.get(scenario_key(result))
+        if old is None:
+            continue
+        throughput = result["updates_per_sec"] / old["updates_per_sec"] - 1
+        p99 = result["latency_ms"]["p99"] / old["latency_ms"]["p99"] - 1 if old["latency_ms"]["p99"] else 0.0
+        regressed = throughput < -args.threshold or p99 > args.threshold
+        regressions += regressed
+        _, members, groups, banned = scenario_key(result)
+        print(
+            f"{'❌' if regressed else '✅'} members={members} groups={groups} banned={banned}: "
+            f"throughput {throughput:+.1%}, p99 {p99:+.1%}"
+        )
+    sys.exit(1 if regressions else 0)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Offline benchmark for the bot's update handlers")
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    run = commands.add_parser("run", help="Run one scenario in this process and print a JSON result")
+    run.add_argument("--backend", default="json", choices=("json", "sqlite"))
+    run.add_argument("--members", type=int, default=1000, help="Members already stored (spread over --groups)")
+    run.add_argument("--groups", type=int, default=1)
+    run.add_argument("--banned", type=int, default=100, help="Banned words in the default policy")
+    run.add_argument("--updates", type=int, default=20000)
+    run.add_argument("--replay", help="JSONL file with one recorded Update per line (instead of synthetic)")
+    run.add_argument("--api-latency", type=float, default=0.0, help="Seconds the fake Bot API waits per call")
+    run.add_argument("--seed", type=int, default=1)
+    run.add_argument("--concurrency", type=int, default=1,
+                     help="CONCURRENT_UPDATES (>1: feed through the update queue, chats in parallel)")
+    run.add_argument("--workdir", help="Where storage files are created (default: a new temp dir)")
+    run.add_argument("--log", action="store_true", help="Keep the bot's INFO logging on")
+    run.add_argument("--rate-limits", action="store_true", help="Keep the outbound Telegram rate limits on")
+    run.set_defaults(func=run_command)
+
+    suite = commands.add_parser("suite", help="Run the members x banned matrix, one process per scenario")
+    suite.add_argument("--backend", default="json", choices=("json", "sqlite"))
+    suite.add_argument("--members", type=int, nargs="+", default=list(SUITE_MEMBERS))
+    suite.add_argument("--groups", type=int, default=1)
+    suite.add_argument("--banned", type=int, nargs="+", default=list(SUITE_BANNED))
+    suite.add_argument("--updates", type=int, default=20000)
+    suite.add_argument("--api-latency", type=float, default=0.0)
+    suite.add_argument("--seed", type=int, default=1)
+    suite.add_argument("--concurrency", type=int, default=1)
+    suite.add_argument("--output", help="Write the JSON report here instead of stdout")
+    suite.set_defaults(func=suite_command)
+
+    compare = commands.add_parser("compare", help="Compare two suite reports")
+    compare.add_argument("baseline")
+    compare.add_argument("current")
+    compare.add_argument("--threshold", type=float, default=0.10, help="Allowed slowdown (0.10 = 10%%)")
+    compare.set_defaults(func=compare_command)
+
+    args = parser.parse_args()
+    args.func(args)
+
+
+if __name__ == "__main__":
+    main()
@@ -1,10 +1,33 @@
+import time
+# Startup report ka "imports" phase yahin se (baaki imports se pehle)
+BOOT_STARTED = time.perf_counter()
 import os
-import json
+import asyncio
 import logging
-import time
-from telegram import Update, ChatPermissions
-from telegram.ext import ApplicationBuilder, CommandHandler, MessageHandler, filters, CallbackContext
+from functools import wraps
+from telegram import Update, ChatPermissions, InputFile, MessageEntity
+from telegram.error import BadRequest, Forbidden
+from telegram.ext import ApplicationBuilder, ChatMemberHandler, CommandHandler, MessageHandler, TypeHandler, filters, CallbackContext
 from dotenv import load_dotenv
+from member_index import MemberIndex
+from admin_cache import AdminCache
+from storage import open_storage, DEFAULT_CHAT
+from chat_settings import ChatPolicyCache
+from mute_scheduler import MuteScheduler
+from flood import FloodControl, ALLOW, MUTE, BAN
+from pipeline import Pipeline
+from normalize import normalize_text
+from links import URL_ENTITY_TYPES, extract_hosts, host_from_url
+from triggers import MODES as TRIGGER_MODES, TriggerIndex, TriggerCooldown, message_content
+from config import build_snapshot
+from ordering import ChatOrderedProcessor, BoundedUpdateQueue
+from journal import ModerationJournal, replay_into_storage, scan_recent
+from export import export_members, TELEGRAM_UPLOAD_LIMIT
+from bulk import BulkExecutor, RecentMessages, DELETE_BATCH, chunks
+from persistence import PersistenceWorker
+from outbound import OutboundScheduler, PRIORITY_MODERATION, PRIORITY_REPLY, PRIORITY_WELCOME, PRIORITY_BULK
+from metrics import Metrics, MetricsServer
+from startup import StartupTimer
 
 # Load environment variables
 load_dotenv()
@@ -17,107 +40,201 @@ logging.basicConfig(
 )
 logger = logging.getLogger(__name__)
 
+# Boot ke phases (log + /stats); pehle processed update tak ka time bhi
+STARTUP = StartupTimer(BOOT_STARTED)
+STARTUP.mark("imports")
 
 USERS_FILE = "users.json"
 
-MEMBERS_FILE = "members.json"
+MEMBERS_FILE = "members.jsonl"
 
+# File to store triggers
+SETTINGS_FILE = "settings.json"
+TRIGGERS_FILE = "triggers.json"
 
+# Storage backend: "json" (purani files) ya "sqlite" (WAL, row-level writes)
+STORAGE_BACKEND = os.getenv("STORAGE_BACKEND", "json")
+DATABASE_FILE = os.getenv("DATABASE_FILE", "bot.db")
+
+STORAGE = open_storage(
+    STORAGE_BACKEND,
+    database_file=DATABASE_FILE,
+    members_file=MEMBERS_FILE,
+    users_file=USERS_FILE,
+    settings_file=SETTINGS_FILE,
+    triggers_file=TRIGGERS_FILE,
+)
+STARTUP.mark("storage")
 
-# Load members from JSON file
-def load_members():
-    try:
-        with open(MEMBERS_FILE, "r") as file:
-            data = json.load(file)
-            if isinstance(data, dict):
-                return data  # Agar JSON dictionary hai to use load karo
-            else:
-                return {}  # Agar format galat hai to empty dictionary return karo
-    except (FileNotFoundError, json.JSONDecodeError):
-        return {}  # Agar file nahi hai ya corrupt hai to empty return karo
+# Saari writes background thread me (handlers disk ka wait nahi karte)
+PERSISTENCE = PersistenceWorker().start()
+STORAGE.writer = PERSISTENCE
 
-# Save members to JSON file
-def save_members(members):
-    with open(MEMBERS_FILE, "w") as file:
-        json.dump(members, file, indent=4)
+# Sharding (shard.py har worker ko deta hai): ye process sirf apne chats ka state rakhta hai.
+# Allowed users, triggers aur default template shared SQLite se hot reload hote hai.
+SHARD_INDEX = int(os.getenv("SHARD_INDEX", "0"))
+SHARD_COUNT = int(os.getenv("SHARD_COUNT", "1"))
 
-# Load members at startup
-GROUP_MEMBERS = load_members()
+# shard.py (dispatcher + webhook code) sirf sharded mode me import hota hai
+if SHARD_COUNT > 1:
+    from shard import shard_for
 
-# Load allowed users from JSON file
-def load_users():
-    try:
-        with open(USERS_FILE, "r") as file:
-            data = json.load(file)
-            return set(data.get("allowed_users", []))  # Convert list to set
-    except (FileNotFoundError, json.JSONDecodeError):
-        return set()
+# Kya ye chat is worker ki hai? (purane global mutes shard 0 pe)
+def owns_chat(chat_id) -> bool:
+    if SHARD_COUNT <= 1:
+        return True
+    if str(chat_id) == DEFAULT_CHAT:
+        return SHARD_INDEX == 0
+    return shard_for(chat_id, SHARD_COUNT) == SHARD_INDEX
+
+# 🔹 Moderation journal: mutes, bans, deletes, banned words aur trigger changes ek
+# append-only file me (writer thread batch me likhta hai). Snapshot ke baad ke events
+# startup pe storage pe replay hote hai - crash me adhuri reh gayi writes wapas aati hai.
+JOURNAL_BASE = os.getenv("JOURNAL_FILE", "moderation.jsonl")
+JOURNAL_FSYNC = os.getenv("JOURNAL_FSYNC", "interval")  # always / interval / never
+JOURNAL_FSYNC_INTERVAL = float(os.getenv("JOURNAL_FSYNC_INTERVAL", "1"))
+JOURNAL_SNAPSHOT_INTERVAL = int(os.getenv("JOURNAL_SNAPSHOT_INTERVAL", "300"))
+JOURNAL_RECENT = int(os.getenv("JOURNAL_RECENT", "100"))
+
+# Sharded mode me har worker ki apni file: moderation.0.jsonl, moderation.1.jsonl, ...
+def journal_file(index) -> str:
+    if SHARD_COUNT <= 1:
+        return JOURNAL_BASE
+    base, ext = os.path.splitext(JOURNAL_BASE)
+    return f"{base}.{index}{ext}"
+
+JOURNAL = ModerationJournal(
+    journal_file(SHARD_INDEX),
+    fsync=JOURNAL_FSYNC,
+    fsync_interval=JOURNAL_FSYNC_INTERVAL,
+    recent_size=JOURNAL_RECENT,
+).open()
+STARTUP.mark("journal")
+
+# Pichle snapshot ke baad ke events storage pe dobara lagao (startup pe, load se pehle)
+def recover_from_journal() -> None:
+    events = JOURNAL.unsnapshotted()
+    if not events:
+        return
+    applied = replay_into_storage(STORAGE, events)
+    PERSISTENCE.wait_idle()
+    logger.info(f"Journal: replayed {applied} of {len(events)} events after snapshot #{JOURNAL.checkpoint['seq']}")
+    # Turant checkpoint: agle boot pe yahi events dobara na padhne pade
+    JOURNAL.snapshot(JOURNAL.seq)
+
+# Snapshot: pehle storage writes poori ho, tabhi unke events checkpoint me jaaye
+async def snapshot_journal() -> None:
+    upto = JOURNAL.seq
+    await PERSISTENCE.drain()
+    await asyncio.to_thread(JOURNAL.snapshot, upto)
+
+async def journal_snapshot_job(context: CallbackContext) -> None:
+    await snapshot_journal()
+
+# Members ka in-memory index, write-behind flush ke saath
+MEMBERS_FLUSH_INTERVAL = int(os.getenv("MEMBERS_FLUSH_INTERVAL", "30"))
+MEMBERS_FLUSH_THRESHOLD = int(os.getenv("MEMBERS_FLUSH_THRESHOLD", "200"))
+
+# Startup pe kuch load nahi hota - har group ke member ids pehle message pe aate hai
+GROUP_MEMBERS = MemberIndex(
+    STORAGE,
+    flush_interval=MEMBERS_FLUSH_INTERVAL,
+    flush_threshold=MEMBERS_FLUSH_THRESHOLD,
+    join_window=int(os.getenv("JOIN_HISTORY_SECONDS", "3600")),
+)
 
-# Save allowed users to JSON file
-def save_users(users):
-    with open(USERS_FILE, "w") as file:
-        json.dump({"allowed_users": list(users)}, file)
+# Har group ke aakhri messages (/purge inhi me se delete karta hai)
+RECENT_MESSAGES = RecentMessages(
+    per_chat=int(os.getenv("PURGE_HISTORY", "500")),
+    max_chats=int(os.getenv("PURGE_HISTORY_CHATS", "2000")),
+)
 
 # Load users at startup
-ALLOWED_USERS = load_users()
+ALLOWED_USERS = STORAGE.load_users()
 
-# File to store triggers
-SETTINGS_FILE = "settings.json"
-TRIGGERS_FILE = "triggers.json"
+# Per-chat settings (har group ki apni policy, LRU cache me)
+CHAT_CACHE_SIZE = int(os.getenv("CHAT_CACHE_SIZE", "10000"))
+POLICIES = ChatPolicyCache(STORAGE, max_chats=CHAT_CACHE_SIZE)
 
-# Default settings
-settings = {
-    "block_links": False,
-    "block_media": False,
-    "message_timer": 0,
-    "muted_users": {},
-    "banned_words": []
-}
+forwarding_triggers = {}
+TRIGGERS = TriggerIndex()
+# Ek chat me same trigger kitne seconds me ek hi baar
+TRIGGER_COOLDOWN = TriggerCooldown(seconds=int(os.getenv("TRIGGER_COOLDOWN", "10")))
 
-# Load settings from JSON file
-def load_settings():
-    global settings
-    try:
-        with open(SETTINGS_FILE, "r") as file:
-            settings = json.load(file)
-    except (FileNotFoundError, json.JSONDecodeError):
-        save_settings()
-    
-    # Ensure all keys exist
-    for key, default in {
-        "block_links": False,
-        "block_media": False,
-        "message_timer": 0,
-        "muted_users": {},
-        "banned_words": []
-    }.items():
-        settings.setdefault(key, default)
-    
-    save_settings()
+# Command / message jis chat me aaya uski policy; private chat me default template
+# (naye groups ko yahi settings milti hai). Private chats ki apni policy kabhi nahi
+# banti - warna har naye DM pe settings me ek bekaar entry save hoti.
+def chat_policy(update: Update):
+    chat = update.effective_chat
+    if chat.type == "private":
+        return POLICIES.get(DEFAULT_CHAT)
+    return POLICIES.get(chat.id)
+
+# Reply me batao ki setting kis scope pe lagi
+def policy_scope(policy) -> str:
+    return " (default for new groups)" if policy.chat_id == DEFAULT_CHAT else ""
 
-# Save settings to JSON file
-def save_settings():
-    with open(SETTINGS_FILE, "w") as file:
-        json.dump(settings, file)
+# Load settings from storage (template pehle se ready rakho)
+def load_settings():
+    POLICIES.clear()
+    POLICIES.get(DEFAULT_CHAT)
 
-# Load triggers from JSON file
+# Load triggers from storage
 def load_triggers():
-    global forwarding_triggers
-    try:
-        with open(TRIGGERS_FILE, "r") as file:
-            forwarding_triggers = json.load(file)
-    except (FileNotFoundError, json.JSONDecodeError):
-        forwarding_triggers = {}
+    global forwarding_triggers, TRIGGERS
+    forwarding_triggers = STORAGE.load_triggers()
+    TRIGGERS = TriggerIndex(forwarding_triggers)
+
+# 🔹 Config hot reload (files / DB bahar se badle ya /reload)
+# Snapshot thread me banta hai; apply_config loop pe bina await ke chalta hai,
+# isliye koi handler aadha purana / aadha naya config nahi dekhta.
+CONFIG_RELOAD_INTERVAL = float(os.getenv("CONFIG_RELOAD_INTERVAL", "5"))
+CONFIG_RELOAD_ATTEMPTS = 3
+config_lock = asyncio.Lock()
+config_reloads = 0
+
+def apply_config(snapshot) -> None:
+    global forwarding_triggers, TRIGGERS, config_reloads
+    STORAGE.apply_config(snapshot.chats, snapshot.triggers, snapshot.users)
+    forwarding_triggers = snapshot.triggers
+    TRIGGERS = snapshot.trigger_index
+    # In-place update: allowed_users_only isi set ko dekhta hai
+    ALLOWED_USERS.intersection_update(snapshot.users)
+    ALLOWED_USERS.update(snapshot.users)
+    POLICIES.replace(snapshot.policies)
+    config_reloads += 1
+
+# Build ke dauraan local config write hua (/ban, /set...) to snapshot purana hai - dobara banao
+async def reload_config():
+    async with config_lock:
+        for attempt in range(CONFIG_RELOAD_ATTEMPTS):
+            # Ginti drain se pehle: drain ke beech aayi write (abhi queue me) bhi retry karwati hai
+            writes = STORAGE.config_writes
+            await PERSISTENCE.drain()
+            snapshot = await asyncio.to_thread(build_snapshot, STORAGE, list(POLICIES.policies))
+            if STORAGE.config_writes == writes:
+                apply_config(snapshot)
+                logger.info(
+                    f"Config reloaded in {snapshot.built_in * 1000:.1f} ms: {len(snapshot.triggers)} triggers, "
+                    f"{len(snapshot.policies)} cached chats, {len(snapshot.users)} allowed users"
+                )
+                return snapshot
+        logger.warning("Config reload skipped: settings kept changing while loading")
+        return None
 
-# Save triggers to JSON file
-def save_triggers():
-    with open(TRIGGERS_FILE, "w") as file:
-        json.dump(forwarding_triggers, file)
+# Files / DB bahar se badle to reload (mtime polling / SQLite config_version)
+async def config_watch_job(context: CallbackContext) -> None:
+    try:
+        if await asyncio.to_thread(STORAGE.config_changed):
+            await reload_config()
+    except Exception as e:
+        logger.error(f"Config reload failed, keeping the current config: {e}")
 
 
 
 # Decorator to restrict commands to admin/owner
 def allowed_users_only(func):
+    @wraps(func)
     async def wrapper(update: Update, context: CallbackContext, *args, **kwargs):
         user_id = update.effective_user.id
         if user_id not in ALLOWED_USERS:
@@ -141,29 +258,133 @@ async def save_user_data(update: Update, context: CallbackContext) -> None:
     chat_id = str(chat.id)  
 
     if chat.type in ["group", "supergroup"]:
-        members = load_members()  # Load previous data
+        user = update.effective_user
+        if user is None:
+            return
+        RECENT_MESSAGES.add(chat.id, update.effective_message.message_id, user.id)
 
-        # Agar group ka data nahi hai to ek empty list create karo
-        if chat_id not in members:
-            members[chat_id] = []
+        # ✅ User already saved hai ya nahi check karo (O(1) lookup)
+        if GROUP_MEMBERS.contains(chat_id, user.id):
+            return
 
-        user = update.effective_user
-        user_data = {
-            "id": user.id,
-            "name": user.full_name,
-            "username": f"@{user.username}" if user.username else "N/A",
-            "mobile": "Not Available"
-        }
+        username = f"@{user.username}" if user.username else None
+        GROUP_MEMBERS.add(chat_id, user.id, user.full_name, username)  # Naya member add karo
+        logger.info(f"✅ New Member Saved: {user.full_name} ({user.id})")
 
-        # ✅ User already saved hai ya nahi check karo
-        if not any(member["id"] == user.id for member in members[chat_id]):
-            members[chat_id].append(user_data)  # Naya member add karo
-            save_members(members)  # File update karo
-            print(f"✅ New Member Saved: {user.full_name} ({user.id})")
+        # Batch bada ho gaya to turant flush karo, warna job flush karega
+        if GROUP_MEMBERS.pending >= GROUP_MEMBERS.flush_threshold:
+            GROUP_MEMBERS.flush()
 
 
+# Write-behind flusher (job queue se chalta hai)
+async def flush_members_job(context: CallbackContext) -> None:
+    if GROUP_MEMBERS.should_flush():
+        GROUP_MEMBERS.flush()
+    GROUP_MEMBERS.expire_joins()
 
 
+# Outbound Bot API calls: priority queue + global/per-chat rate limits
+OUTBOUND = OutboundScheduler(
+    global_rate=float(os.getenv("OUTBOUND_GLOBAL_RATE", "25")),
+    chat_rate=float(os.getenv("OUTBOUND_CHAT_RATE", "20")) / 60,
+    chat_burst=int(os.getenv("OUTBOUND_CHAT_BURST", "3")),
+    concurrency=int(os.getenv("OUTBOUND_CONCURRENCY", "8")),
+)
+
+# Moderation action (delete/restrict/ban) sabse pehle jaata hai
+async def moderate(call):
+    return await OUTBOUND.call(PRIORITY_MODERATION, call)
+
+# Metrics: METRICS_PORT ya METRICS_FILE set ho tabhi on (warna koi wrapper nahi lagta)
+METRICS_LISTEN = os.getenv("METRICS_LISTEN", "127.0.0.1")
+METRICS_PORT = int(os.getenv("METRICS_PORT", "0"))
+METRICS_FILE = os.getenv("METRICS_FILE") or None
+METRICS_DUMP_INTERVAL = int(os.getenv("METRICS_DUMP_INTERVAL", "60"))
+METRICS = Metrics(enabled=bool(METRICS_PORT or METRICS_FILE))
+metrics_server = None
+
+UPDATE_TYPES = ("message", "edited_message", "channel_post", "callback_query", "chat_member", "my_chat_member")
+
+# Pehla update aaya: startup report log karo (baad me sirf ek check)
+async def first_update(update: Update, context: CallbackContext) -> None:
+    STARTUP.update_seen()
+
+# Har aane wale update ki ginti (type ke hisaab se)
+async def count_update(update: Update, context: CallbackContext) -> None:
+    for kind in UPDATE_TYPES:
+        if getattr(update, kind, None) is not None:
+            break
+    else:
+        kind = "other"
+    METRICS.updates.labels(kind).inc()
+
+# Metrics file periodically likho
+async def dump_metrics_job(context: CallbackContext) -> None:
+    await asyncio.to_thread(METRICS.dump, METRICS_FILE)
+
+# Handlers, storage writes aur Bot API calls pe metrics lagao
+def instrument(application) -> None:
+    for group, handlers in application.handlers.items():
+        for handler in handlers:
+            handler.callback = METRICS.wrap_handler(handler.callback, handler.callback.__name__)
+    application.add_handler(TypeHandler(Update, count_update), group=-2)
+
+    PERSISTENCE.observer = METRICS.observe_write
+    OUTBOUND.observer = METRICS.observe_bot_call
+    METRICS.gauge("outbound_queue_depth", "Outbound calls waiting to be sent",
+                  lambda: len(OUTBOUND.queue) + len(OUTBOUND.delayed))
+    METRICS.gauge("persistence_queue_depth", "Storage writes waiting for the writer thread",
+                  lambda: PERSISTENCE.depth)
+    METRICS.gauge("members_pending", "Members not yet flushed to storage", lambda: GROUP_MEMBERS.pending)
+    METRICS.gauge("flood_entries", "Flood counters kept in memory", lambda: len(FLOOD))
+    if UPDATE_PROCESSOR is not None:
+        METRICS.gauge("updates_running", "Updates being handled right now", lambda: UPDATE_PROCESSOR.running)
+        METRICS.gauge("updates_waiting_for_chat", "Updates waiting for an earlier update of the same chat",
+                      lambda: UPDATE_PROCESSOR.waiting)
+        METRICS.gauge("updates_backlog", "Updates accepted but not finished",
+                      lambda: application.update_queue.backlog)
+    METRICS.gauge("bulk_jobs_running", "Bulk moderation jobs in progress", lambda: len(BULK.jobs))
+    METRICS.gauge("journal_pending", "Moderation events waiting for the journal writer", lambda: JOURNAL.depth)
+    METRICS.gauge("startup_seconds", "Seconds from process start to the first processed update",
+                  lambda: STARTUP.first_update or 0)
+
+    if METRICS_FILE:
+        application.job_queue.run_repeating(dump_metrics_job, interval=METRICS_DUMP_INTERVAL, first=METRICS_DUMP_INTERVAL)
+
+# Bot start hone pe /metrics server chalu karo
+async def on_start(application) -> None:
+    global metrics_server
+    STARTUP.mark("bot initialize")
+    # JSON backend: member index abhi se background me banna shuru (pehle message ka wait nahi)
+    STORAGE.preload()
+    if METRICS.enabled and METRICS_PORT:
+        metrics_server = MetricsServer(METRICS, host=METRICS_LISTEN, port=METRICS_PORT)
+        await metrics_server.start()
+
+# Bot rukne se pehle (HTTP client band hone se pehle) queue khali karo
+async def on_stop(application) -> None:
+    await OUTBOUND.stop()
+    if metrics_server is not None:
+        await metrics_server.stop()
+
+# Shutdown pe pending members save karo
+async def on_shutdown(application) -> None:
+    GROUP_MEMBERS.flush()
+    await snapshot_journal()
+    await asyncio.to_thread(JOURNAL.close)
+    await asyncio.to_thread(PERSISTENCE.stop)
+    STORAGE.close()
+    if METRICS_FILE:
+        METRICS.dump(METRICS_FILE)
+
+
+
+
+# Admin cache: har message pe get_member call na ho
+ADMIN_CACHE_TTL = int(os.getenv("ADMIN_CACHE_TTL", "600"))
+ADMIN_CACHE_MAX_CHATS = int(os.getenv("ADMIN_CACHE_MAX_CHATS", "5000"))
+ADMIN_CACHE = AdminCache(ttl=ADMIN_CACHE_TTL, max_chats=ADMIN_CACHE_MAX_CHATS)
+
 # Check if user is admin or owner
 async def is_admin(update: Update) -> bool:
     chat = update.effective_chat
@@ -172,8 +393,26 @@ async def is_admin(update: Update) -> bool:
     if chat.type == "private":
         return True
 
-    chat_member = await chat.get_member(user.id)
-    return chat_member.status in ["administrator", "creator"]
+    try:
+        return await ADMIN_CACHE.is_admin(chat.id, user.id, chat.get_administrators)
+    except Exception as e:
+        logger.error(f"Admin list fetch failed for {chat.id}: {e}")
+        chat_member = await chat.get_member(user.id)
+        return chat_member.status in ["administrator", "creator"]
+
+
+# Admin promote/demote hone pe cache turant update karo
+async def track_admin_changes(update: Update, context: CallbackContext) -> None:
+    change = update.chat_member or update.my_chat_member
+    if change is None:
+        return
+
+    if update.my_chat_member:
+        # Bot ka khud ka status badla - poori chat ki list dobara fetch hogi
+        ADMIN_CACHE.invalidate(change.chat.id)
+        return
+
+    ADMIN_CACHE.apply_status(change.chat.id, change.new_chat_member.user.id, change.new_chat_member.status)
 
 
 # Start command
@@ -187,52 +426,110 @@ async def help_command(update: Update, context: CallbackContext) -> None:
         "Available commands (Admins Only):\n"
         "/start - Start bot\n"
         "/help - Help message\n"
-        "/set <trigger> - Set a forwarding trigger (reply to a message)\n"
+        "/set [prefix|keyword|fuzzy] <trigger> - Set a trigger (reply to a message)\n"
         "/remove <trigger> - Remove a forwarding trigger\n"
         "/block_media - Block non-admins from sending media\n"
         "/allow_media - Allow media for everyone\n"
         "/block_link - Block non-admins from sending links\n"
         "/allow_link - Allow links for everyone\n"
+        "/allow_domain <domain> - Always allow links to a domain\n"
+        "/deny_domain <domain> - Always delete links to a domain\n"
+        "/remove_domain <domain> - Remove a domain from both lists\n"
+        "/domains - Allowed and blocked domains\n"
         "/ban - Ban a word (reply to a message)\n"
         "/unban <word> - Unban a word\n"
         "/mute - Mute a user (reply to a message)\n"
         "/unmute <username> - Unmute a user\n"
-        "/set_timer <seconds> - Set message timer\n"
-        "/remove_timer - Remove message timer"
-        "/setwords - trigger words list"
-        "/banwords - banned words list"
+        "/set_timer <seconds> - Min seconds between a user's messages (burst allowed)\n"
+        "/remove_timer - Remove message timer\n"
+        "/setwords - trigger words list\n"
+        "/banwords - banned words list\n"
+        "/stats - Moderation pipeline timings and outbound queue\n"
+        "/reload - Reload settings, triggers and allowed users from storage\n"
+        "/modlog [user_id|group_id] [count] - Recent moderation actions\n"
+        "/massmute, /massban, /massunmute <user_id ...|joined <min>|matched <min> [word]> - Bulk actions\n"
+        "/purge <user_id ...|joined <min>|matched <min> [word]> - Delete users' recent messages\n"
+        "/stopbulk - Stop the running bulk job"
     )
     await update.message.reply_text(help_text)
 
+# Join wave me har member ka alag message na jaye: thodi der naam jama karo,
+# phir ek hi group welcome bhejo
+WELCOME_COALESCE_SECONDS = float(os.getenv("WELCOME_COALESCE_SECONDS", "5"))
+WELCOME_MAX_NAMES = 20
+pending_welcomes = {}  # chat_id -> [first_name, ...]
+
+def welcome_text(names) -> str:
+    if len(names) == 1:
+        return f"Welcome {names[0]} to the group!"
+    shown = names[:WELCOME_MAX_NAMES]
+    others = len(names) - len(shown)
+    if others:
+        return f"Welcome {', '.join(shown)} and {others} others to the group!"
+    return f"Welcome {', '.join(shown[:-1])} and {shown[-1]} to the group!"
+
 # Welcome new members
 async def welcome(update: Update, context: CallbackContext) -> None:
     if update.message:
+        chat_id = update.effective_chat.id
+        names = pending_welcomes.get(chat_id)
+        if names is None:
+            names = pending_welcomes[chat_id] = []
+            context.job_queue.run_once(send_welcomes, WELCOME_COALESCE_SECONDS, chat_id=chat_id)
+
         for new_member in update.message.new_chat_members:
-            # Welcome in group
-            await update.message.reply_text(f"Welcome {new_member.first_name} to the group!")
-            # Welcome in private
-            try:
-                await context.bot.send_message(
-                    chat_id=new_member.id,
-                    text=f"Welcome {new_member.first_name}! Feel free to ask questions."
-                )
-            except Exception as e:
-                logger.error(f"Error sending private welcome: {e}")
+            names.append(new_member.first_name)
+            GROUP_MEMBERS.joined(chat_id, new_member.id)
+            # Welcome in private (sabse kam priority)
+            OUTBOUND.fire(
+                PRIORITY_BULK,
+                lambda member=new_member: context.bot.send_message(
+                    chat_id=member.id,
+                    text=f"Welcome {member.first_name}! Feel free to ask questions."
+                ),
+                chat_id=new_member.id,
+                label="Private welcome",
+            )
+
+# Jama hue naamon ka ek group welcome
+async def send_welcomes(context: CallbackContext) -> None:
+    chat_id = context.job.chat_id
+    names = pending_welcomes.pop(chat_id, None)
+    if not names:
+        return
+    OUTBOUND.fire(
+        PRIORITY_WELCOME,
+        lambda: context.bot.send_message(chat_id=chat_id, text=welcome_text(names)),
+        chat_id=chat_id,
+        label="Group welcome",
+    )
 
 # Set trigger command (Admin Only)
+# /set [prefix|keyword|fuzzy] <trigger> - mode na do to poora message match hona chahiye
 @allowed_users_only
 async def set_trigger(update: Update, context: CallbackContext) -> None:
     if not update.message.reply_to_message or not context.args:
-        await update.message.reply_text("Usage: Reply to a message with /set <trigger>")
+        await update.message.reply_text("Usage: Reply to a message with /set [prefix|keyword|fuzzy] <trigger>")
         return
 
-    trigger = ' '.join(context.args).lower().strip()
+    args = list(context.args)
+    mode = "exact"
+    if len(args) > 1 and args[0].lower() in TRIGGER_MODES:
+        mode = args.pop(0).lower()
+    trigger = ' '.join(args).lower().strip()
+    source = update.message.reply_to_message
     forwarding_triggers[trigger] = {
-        'chat_id': update.message.reply_to_message.chat_id,
-        'message_id': update.message.reply_to_message.message_id
+        'chat_id': source.chat_id,
+        'message_id': source.message_id,
+        'mode': mode,
+        # Content yahin cache - baad me source chat ki zarurat nahi
+        'content': message_content(source)
     }
-    save_triggers()
-    await update.message.reply_text(f"Trigger '{trigger}' set successfully!")
+    TRIGGERS.add(trigger, mode)
+    STORAGE.set_trigger(trigger, forwarding_triggers[trigger])
+    JOURNAL.record("trigger_set", update.effective_chat.id, actor=update.effective_user.id,
+                   trigger=trigger, data=forwarding_triggers[trigger])
+    await update.message.reply_text(f"Trigger '{trigger}' ({mode}) set successfully!")
 
 # Remove trigger command (Admin Only)
 @allowed_users_only
@@ -244,7 +541,9 @@ async def remove_trigger(update: Update, context: CallbackContext) -> None:
     trigger = ' '.join(context.args).lower().strip()
     if trigger in forwarding_triggers:
         del forwarding_triggers[trigger]
-        save_triggers()
+        TRIGGERS.remove(trigger)
+        STORAGE.remove_trigger(trigger)
+        JOURNAL.record("trigger_remove", update.effective_chat.id, actor=update.effective_user.id, trigger=trigger)
         await update.message.reply_text(f"Trigger '{trigger}' removed!")
     else:
         await update.message.reply_text(f"Trigger '{trigger}' not found!")
@@ -252,28 +551,78 @@ async def remove_trigger(update: Update, context: CallbackContext) -> None:
 # Block/Allow Media
 @allowed_users_only
 async def block_media(update: Update, context: CallbackContext) -> None:
-    settings["block_media"] = True
-    save_settings()
-    await update.message.reply_text("Media messages blocked for non-admins!")
+    policy = chat_policy(update)
+    policy.block_media = True
+    STORAGE.set_setting(policy.chat_id, "block_media", True)
+    await update.message.reply_text(f"Media messages blocked for non-admins!{policy_scope(policy)}")
 
 @allowed_users_only
 async def allow_media(update: Update, context: CallbackContext) -> None:
-    settings["block_media"] = False
-    save_settings()
-    await update.message.reply_text("Media messages allowed for everyone!")
+    policy = chat_policy(update)
+    policy.block_media = False
+    STORAGE.set_setting(policy.chat_id, "block_media", False)
+    await update.message.reply_text(f"Media messages allowed for everyone!{policy_scope(policy)}")
 
 # Block/Allow Links
 @allowed_users_only
 async def block_link(update: Update, context: CallbackContext) -> None:
-    settings["block_links"] = True
-    save_settings()
-    await update.message.reply_text("Links blocked for non-admins!")
+    policy = chat_policy(update)
+    policy.block_links = True
+    STORAGE.set_setting(policy.chat_id, "block_links", True)
+    await update.message.reply_text(f"Links blocked for non-admins!{policy_scope(policy)}")
 
 @allowed_users_only
 async def allow_link(update: Update, context: CallbackContext) -> None:
-    settings["block_links"] = False
-    save_settings()
-    await update.message.reply_text("Links allowed for everyone!")
+    policy = chat_policy(update)
+    policy.block_links = False
+    STORAGE.set_setting(policy.chat_id, "block_links", False)
+    await update.message.reply_text(f"Links allowed for everyone!{policy_scope(policy)}")
+
+# Domain allow/deny lists: /allow_domain, /deny_domain, /remove_domain <domain ...>
+async def update_domains(update: Update, context: CallbackContext, kind) -> None:
+    if not context.args:
+        command = {"allowed": "allow_domain", "denied": "deny_domain"}.get(kind, "remove_domain")
+        await update.message.reply_text(f"Usage: /{command} <domain> [domain ...]")
+        return
+
+    policy = chat_policy(update)
+    changed = []
+    for arg in context.args:
+        domain = host_from_url(arg)
+        if domain is None:
+            continue
+        if kind is None:
+            if policy.remove_domain(domain):
+                changed.append(domain)
+        elif policy.set_domain(kind, domain):
+            changed.append(domain)
+
+    if not changed:
+        await update.message.reply_text("Nothing changed!")
+        return
+    STORAGE.set_setting(policy.chat_id, "allowed_domains", list(policy.allowed_domains))
+    STORAGE.set_setting(policy.chat_id, "denied_domains", list(policy.denied_domains))
+    label = {"allowed": "Allowed", "denied": "Blocked"}.get(kind, "Removed")
+    await update.message.reply_text(f"{label}: {', '.join(changed)}{policy_scope(policy)}")
+
+@allowed_users_only
+async def allow_domain(update: Update, context: CallbackContext) -> None:
+    await update_domains(update, context, "allowed")
+
+@allowed_users_only
+async def deny_domain(update: Update, context: CallbackContext) -> None:
+    await update_domains(update, context, "denied")
+
+@allowed_users_only
+async def remove_domain(update: Update, context: CallbackContext) -> None:
+    await update_domains(update, context, None)
+
+@allowed_users_only
+async def domains(update: Update, context: CallbackContext) -> None:
+    policy = chat_policy(update)
+    allowed = "\n".join(f"- {domain}" for domain in policy.allowed_domains) or "-"
+    denied = "\n".join(f"- {domain}" for domain in policy.denied_domains) or "-"
+    await update.message.reply_text(f"✅ Allowed domains:\n{allowed}\n\n🚫 Blocked domains:\n{denied}")
 
 # Ban word (Auto-delete)
 @allowed_users_only
@@ -283,10 +632,11 @@ async def ban_word(update: Update, context: CallbackContext) -> None:
         return
 
     banned_text = update.message.reply_to_message.text.lower()
-    if banned_text not in settings["banned_words"]:
-        settings["banned_words"].append(banned_text)
-        save_settings()
-        await update.message.reply_text(f"Banned: '{banned_text}'")
+    policy = chat_policy(update)
+    if policy.ban(banned_text):
+        STORAGE.add_banned_word(policy.chat_id, banned_text)
+        JOURNAL.record("ban_word", policy.chat_id, actor=update.effective_user.id, word=banned_text)
+        await update.message.reply_text(f"Banned: '{banned_text}'{policy_scope(policy)}")
 
 # Unban word
 @allowed_users_only
@@ -296,10 +646,11 @@ async def unban_word(update: Update, context: CallbackContext) -> None:
         return
 
     word = ' '.join(context.args).lower()
-    if word in settings["banned_words"]:
-        settings["banned_words"].remove(word)
-        save_settings()
-        await update.message.reply_text(f"Unbanned: '{word}'")
+    policy = chat_policy(update)
+    if policy.unban(word):
+        STORAGE.remove_banned_word(policy.chat_id, word)
+        JOURNAL.record("unban_word", policy.chat_id, actor=update.effective_user.id, word=word)
+        await update.message.reply_text(f"Unbanned: '{word}'{policy_scope(policy)}")
     else:
         await update.message.reply_text(f"'{word}' not in banned list")
 
@@ -311,16 +662,20 @@ async def setwords(update: Update, context: CallbackContext) -> None:
         await update.message.reply_text("📜 No triggers set!")
         return
 
-    trigger_list = "\n".join([f"- {trigger}" for trigger in forwarding_triggers.keys()])
+    trigger_list = "\n".join([
+        f"- {trigger}" + (f" ({data['mode']})" if data.get('mode', 'exact') != 'exact' else "")
+        for trigger, data in forwarding_triggers.items()
+    ])
     await update.message.reply_text(f"📌 **Set Triggers:**\n{trigger_list}", parse_mode="Markdown")
 #ban words list
 @allowed_users_only
 async def banwords(update: Update, context: CallbackContext) -> None:
-    if not settings["banned_words"]:
+    policy = chat_policy(update)
+    if not policy.banned_words:
         await update.message.reply_text("🚫 No banned words!")
         return
 
-    banned_list = "\n".join([f"- {word}" for word in settings["banned_words"]])
+    banned_list = "\n".join([f"- {word}" for word in policy.banned_words])
     await update.message.reply_text(f"🚫 **Banned Words:**\n{banned_list}", parse_mode="Markdown")
 
 
@@ -333,7 +688,7 @@ async def add_user(update: Update, context: CallbackContext) -> None:
     try:
         user_id = int(context.args[0])
         ALLOWED_USERS.add(user_id)
-        save_users(ALLOWED_USERS)
+        STORAGE.add_user(user_id)
         await update.message.reply_text(f"✅ User {user_id} added to allowed users!")
     except ValueError:
         await update.message.reply_text("❌ Invalid user ID!")
@@ -348,7 +703,7 @@ async def remove_user(update: Update, context: CallbackContext) -> None:
         user_id = int(context.args[0])
         if user_id in ALLOWED_USERS:
             ALLOWED_USERS.remove(user_id)
-            save_users(ALLOWED_USERS)
+            STORAGE.remove_user(user_id)
             await update.message.reply_text(f"❌ User {user_id} removed from allowed users!")
         else:
             await update.message.reply_text("⚠️ User not found in allowed list!")
@@ -356,62 +711,56 @@ async def remove_user(update: Update, context: CallbackContext) -> None:
         await update.message.reply_text("❌ Invalid user ID!")
 
 # members list 
-import io
-import csv
-import json
-import zipfile
+# Export settings: parts upload limit se chhote, bade exports temp file pe spill hote hai
+MEMBERS_EXPORT_COMPRESS = os.getenv("MEMBERS_EXPORT_COMPRESS", "none")
+MEMBERS_EXPORT_PART_LIMIT = int(os.getenv("MEMBERS_EXPORT_PART_LIMIT", str(TELEGRAM_UPLOAD_LIMIT)))
+MEMBERS_EXPORT_SPILL = int(os.getenv("MEMBERS_EXPORT_SPILL", str(8 * 1024 * 1024)))
 
+# /members [zip|gzip|csv] [group_id ...]
 @allowed_users_only
 async def members(update: Update, context: CallbackContext) -> None:
-    user_id = update.effective_user.id
-
     # **Check Karo Ki Command Private Chat Se Aayi Hai Ya Nahi**
     if update.effective_chat.type != "private":
         await update.message.reply_text("⚠️ This command can only be used in bot's private chat!")
         return
 
-    # **JSON File Se Members Load Karo**
-    try:
-        with open("members.json", "r", encoding="utf-8") as file:
-            all_groups = json.load(file)
-    except (FileNotFoundError, json.JSONDecodeError):
-        await update.message.reply_text("⚠️ Members file not found or corrupted!")
-        return
-
-    if not all_groups:
+    compress = MEMBERS_EXPORT_COMPRESS
+    chat_ids = []
+    for arg in context.args or []:
+        if arg.lower() in ("zip", "gzip", "csv"):
+            compress = "none" if arg.lower() == "csv" else arg.lower()
+        else:
+            chat_ids.append(arg)
+
+    # **Pending members pehle storage me, phir wahin se stream karo**
+    # (sharded mode me baaki groups dusre workers ke paas hai - store sabka hai)
+    GROUP_MEMBERS.flush()
+    await PERSISTENCE.drain()
+
+    # **CSV background thread me banao - event loop block nahi hoga**
+    parts = await asyncio.to_thread(
+        export_members,
+        STORAGE.iter_members(chat_ids or None),
+        compress,
+        MEMBERS_EXPORT_PART_LIMIT,
+        MEMBERS_EXPORT_SPILL,
+    )
+    if not parts:
         await update.message.reply_text("⚠️ No group members found!")
         return
 
-    output = io.StringIO()
-    writer = csv.writer(output)
-
-    # **Header likho**
-    writer.writerow(["Group ID", "User ID", "Name", "Username", "Mobile"])
-
-    # **Sabhi Groups Ke Members Likho with Category-wise Format**
-    for chat_id, members in all_groups.items():
-        writer.writerow([f"Group ID: {chat_id}", "", "", "", ""])  # **Group Separator Row**
-        writer.writerow(["User ID", "Name", "Username", "Mobile"])  # **Column Headers for Each Group**
-        
-        for member in members:
-            writer.writerow([
-                str(member.get("id", "Unknown")),  # User ID as string
-                member.get("name", "Unknown"),
-                member.get("username", "N/A"),
-                member.get("mobile", "N/A")
-            ])
-        
-        writer.writerow([])  # **Empty Row for Separation Between Groups**
-
-    # **Cursor Reset Karo**
-    output.seek(0)
-
-    # **Telegram Pe CSV Send Karo**
-    await update.message.reply_document(
-        document=io.BytesIO(output.getvalue().encode()),
-        filename="group_members.csv",
-        caption="📄 Here is the list of all group members."
-    )
+    # **Telegram Pe CSV Send Karo (bada ho to kai parts me)**
+    for number, part in enumerate(parts, start=1):
+        caption = "📄 Here is the list of all group members."
+        if len(parts) > 1:
+            caption += f" (part {number}/{len(parts)})"
+        try:
+            # File handle stream hota hai (poora part bytes me nahi padhte); SpooledTemporaryFile
+            # ka name memory me None hota hai, isliye filename alag se
+            document = InputFile(part.file, filename=part.filename, read_file_handle=False)
+            await update.message.reply_document(document=document, caption=caption)
+        finally:
+            part.file.close()
 
 # Set/Remove Spam Timer
 @allowed_users_only
@@ -421,88 +770,351 @@ async def set_timer(update: Update, context: CallbackContext) -> None:
         return
 
     try:
-        settings["message_timer"] = int(context.args[0])
-        save_settings()
-        await update.message.reply_text(f"Message timer set to {settings['message_timer']}s")
+        policy = chat_policy(update)
+        policy.message_timer = int(context.args[0])
+        STORAGE.set_setting(policy.chat_id, "message_timer", policy.message_timer)
+        await update.message.reply_text(f"Message timer set to {policy.message_timer}s{policy_scope(policy)}")
     except ValueError:
         await update.message.reply_text("Invalid number!")
 
 @allowed_users_only
 async def remove_timer(update: Update, context: CallbackContext) -> None:
-    settings["message_timer"] = 0
-    save_settings()
-    await update.message.reply_text("Message timer disabled!")
+    policy = chat_policy(update)
+    policy.message_timer = 0
+    STORAGE.set_setting(policy.chat_id, "message_timer", 0)
+    await update.message.reply_text(f"Message timer disabled!{policy_scope(policy)}")
+
+# Flood control: message_timer = ek user ke messages ke beech ka time (burst allowed)
+FLOOD_BURST = int(os.getenv("FLOOD_BURST", "3"))
+FLOOD_MUTE_AFTER = int(os.getenv("FLOOD_MUTE_AFTER", "3"))
+FLOOD_BAN_AFTER = int(os.getenv("FLOOD_BAN_AFTER", "6"))
+FLOOD_MUTE_SECONDS = int(os.getenv("FLOOD_MUTE_SECONDS", "600"))
+FLOOD = FloodControl(
+    burst=FLOOD_BURST,
+    mute_after=FLOOD_MUTE_AFTER,
+    ban_after=FLOOD_BAN_AFTER,
+    max_entries=int(os.getenv("FLOOD_MAX_ENTRIES", "100000")),
+)
 
-# Message filtering
-async def filter_messages(update: Update, context: CallbackContext) -> None:
-    if update.message.text:
-        text = update.message.text.lower()
+# Purani flood entries hatao (memory bounded rahe)
+async def flood_sweep_job(context: CallbackContext) -> None:
+    FLOOD.evict_idle()
+
+# 🔹 Moderation pipeline stages (har stage verdict ya None return karta hai)
+
+# Pipeline ne message delete kiya - journal me likho
+def journal_delete(msg, reason, **detail) -> None:
+    JOURNAL.record("delete", msg.chat.id, msg.user.id if msg.user else None,
+                   reason=reason, message=msg.message.message_id, **detail)
+
+# 🌊 Spam timer / flood check
+async def flood_stage(msg):
+    policy = msg.policy
+    if not policy.message_timer or msg.user is None:
+        return None
+    chat_id, user_id = msg.chat.id, msg.user.id
+    verdict = FLOOD.check(chat_id, user_id, policy.message_timer)
+    if verdict is ALLOW or await msg.sender_is_admin():
+        return None
+
+    await moderate(msg.message.delete)
+    journal_delete(msg, "flood")
+    if verdict == MUTE:
+        logger.info(f"Flood: muting {user_id} in {chat_id} for {FLOOD_MUTE_SECONDS}s")
+        await mute_member(msg.context, chat_id, user_id, FLOOD_MUTE_SECONDS, reason="flood")
+    elif verdict == BAN:
+        FLOOD.reset(chat_id, user_id)
+        logger.info(f"Flood: banning {user_id} in {chat_id}")
+        JOURNAL.record("ban", chat_id, user_id, reason="flood")
+        await moderate(lambda: msg.context.bot.ban_chat_member(chat_id=chat_id, user_id=user_id))
+    return f"flood:{verdict}"
+
+# Cached content se bhejo; cache na ho (purane triggers) to ek baar forward karke
+# jo message mila uska content cache kar lo
+async def send_trigger(bot, chat_id, trigger, data):
+    content = data.get('content')
+    if content is None:
+        forwarded = await bot.forward_message(
+            chat_id=chat_id,
+            from_chat_id=data['chat_id'],
+            message_id=data['message_id']
+        )
+        content = message_content(forwarded)
+        if content is not None and forwarding_triggers.get(trigger) is data:
+            data['content'] = content
+            STORAGE.set_trigger(trigger, data)
+        return forwarded
+
+    kind = content['type']
+    if kind == 'text':
+        return await bot.send_message(
+            chat_id=chat_id,
+            text=content['text'],
+            entities=MessageEntity.de_list(content.get('entities'), bot) or None
+        )
+    kwargs = {kind: content['file_id']}
+    if kind not in ('sticker', 'video_note'):
+        kwargs['caption'] = content.get('caption')
+        kwargs['caption_entities'] = MessageEntity.de_list(content.get('caption_entities'), bot) or None
+    return await getattr(bot, f"send_{kind}")(chat_id=chat_id, **kwargs)
+
+async def fire_trigger(msg, trigger):
+    data = forwarding_triggers.get(trigger)
+    if data is None:
+        return None
+    if not TRIGGER_COOLDOWN.allow(msg.chat.id, trigger):
+        return "trigger:cooldown"
+    try:
+        await OUTBOUND.call(
+            PRIORITY_REPLY,
+            lambda: send_trigger(msg.context.bot, msg.chat.id, trigger, data),
+            chat_id=msg.chat.id,
+        )
+    except Exception as e:
+        logger.error(f"Trigger send error ({trigger}): {e}")
+    return "trigger"
+
+# ⚡️ Exact trigger ho to bhejo, baaki checks skip (message sirf trigger hi hai)
+async def trigger_stage(msg):
+    if not msg.message.text:
+        return None
+    trigger = TRIGGERS.exact_match(msg.stripped)
+    return await fire_trigger(msg, trigger) if trigger is not None else None
+
+# 🔎 Prefix/keyword/fuzzy triggers sabse aakhir me - message me aur bhi text ho
+# sakta hai, isliye pehle saari moderation checks pass honi chahiye
+async def partial_trigger_stage(msg):
+    if not msg.message.text:
+        return None
+    trigger = TRIGGERS.partial_match(msg.stripped)
+    return await fire_trigger(msg, trigger) if trigger is not None else None
+
+# 🚀 Banned words ka check
+async def banned_words_stage(msg):
+    if not msg.text:
+        return None
+    matched = msg.policy.find_banned(msg.folded, msg.normalized)
+    if matched is None:
+        return None
+    logger.info(f"Banned word '{matched}' in chat {msg.chat.id}, deleting message")
+    await moderate(msg.message.delete)
+    journal_delete(msg, "banned_word", word=matched)
+    return "banned_word"
+
+# 🌐 Links ka check: Telegram ke entities se hosts, na ho to scanner;
+# deny list hamesha, block_links on ho to allow list ke bahar sab
+async def links_stage(msg):
+    policy = msg.policy
+    if not (policy.block_links or policy.denied_domains) or not msg.raw_text:
+        return None
+    message = msg.message
+    if message.text:
+        entities = message.parse_entities(URL_ENTITY_TYPES)
+    else:
+        entities = message.parse_caption_entities(URL_ENTITY_TYPES)
+    urls = [entity.url or text for entity, text in entities.items()]
+    host = policy.links.blocked_host(extract_hosts(msg.raw_text, urls), policy.block_links)
+    if host is None:
+        return None
+    if await msg.sender_is_admin():
+        return None
+    logger.info(f"Blocked link to {host} in chat {msg.chat.id}")
+    await moderate(message.delete)
+    journal_delete(msg, "link", host=host)
+    return "link"
+
+# Check media
+async def media_stage(msg):
+    message = msg.message
+    if not msg.policy.block_media or not (message.photo or message.video or message.document):
+        return None
+    if await msg.sender_is_admin():
+        return None
+    await moderate(message.delete)
+    journal_delete(msg, "media")
+    return "media"
+
+MESSAGE_PIPELINE = Pipeline(
+    [
+        ("flood", flood_stage),
+        ("trigger", trigger_stage),
+        ("banned_words", banned_words_stage),
+        ("links", links_stage),
+        ("media", media_stage),
+        ("partial_trigger", partial_trigger_stage),
+    ],
+    policy_lookup=chat_policy,
+    admin_check=is_admin,
+    normalize=normalize_text,
+    fold=normalize_text.fold,
+)
 
-        # ⚡️ Agar message trigger hai, to pehle `auto_forward` run hone do
-        if text in forwarding_triggers:
-            await auto_forward(update, context)  # Pehle forward karne do
-              
-            return
+# Message filtering (ek hi pass, pehle verdict pe stop)
+async def filter_messages(update: Update, context: CallbackContext) -> None:
+    await MESSAGE_PIPELINE.run(update, context)
 
-        # 🚀 Banned words ka check
-        if any(word in text for word in settings["banned_words"]):
-            await update.message.delete()
-            return
+# Pipeline stage timings (Admin Only)
+@allowed_users_only
+async def pipeline_stats(update: Update, context: CallbackContext) -> None:
+    outbound = OUTBOUND.stats()
+    depth = ", ".join(f"{name} {count}" for name, count in outbound["depth"].items())
+    cache = normalize_text.stats()
+    journal = JOURNAL.stats()
+    await update.message.reply_text(
+        f"📊 Pipeline stats:\n{MESSAGE_PIPELINE.report()}\n"
+        f"Normalize cache: {cache['hits']} hits, {cache['misses']} misses\n\n"
+        f"📤 Outbound: {outbound['sent']} sent, {outbound['inflight']} in flight, "
+        f"{outbound['retries']} retries, {outbound['rate_limited']} rate limited, {outbound['failures']} failed\n"
+        f"Queued: {depth}\n\n"
+        f"♻️ Config reloads: {config_reloads}\n"
+        f"🧾 Journal: {journal['written']} events written, {journal['pending']} pending, "
+        f"snapshot at #{journal['checkpoint']}\n\n"
+        f"🚀 Startup: {STARTUP.report()}"
+        + update_processing_stats(context.application)
+    )
 
-        # 🌐 Links ka check
-        if settings["block_links"] and ("http://" in text or "https://" in text):
-            if not await is_admin(update):
-                await update.message.delete()
-                return
+# Concurrent mode me worker pool ki halat
+def update_processing_stats(application) -> str:
+    if UPDATE_PROCESSOR is None:
+        return ""
+    stats = UPDATE_PROCESSOR.stats()
+    queue = application.update_queue
+    return (
+        f"\n\n⚙️ Updates: {stats['running']}/{stats['workers']} running, "
+        f"{stats['waiting']} waiting for their chat, {queue.backlog} in backlog, "
+        f"throttled {queue.throttled} times"
+    )
 
-   
+# Storage se config dobara lo (bahar se edit ki gayi files / DB)
+@allowed_users_only
+async def reload_command(update: Update, context: CallbackContext) -> None:
+    try:
+        snapshot = await reload_config()
+    except Exception as e:
+        logger.error(f"Config reload failed: {e}")
+        await update.message.reply_text(f"❌ Reload failed, current config kept: {e}")
+        return
+    if snapshot is None:
+        await update.message.reply_text("⚠️ Settings kept changing during reload, try again.")
+        return
+    await update.message.reply_text(
+        f"♻️ Config reloaded: {len(snapshot.triggers)} triggers, {len(snapshot.policies)} cached groups, "
+        f"{len(snapshot.users)} allowed users"
+    )
 
-    # Check media
-    if settings["block_media"] and (update.message.photo or update.message.video or update.message.document):
-        if not await is_admin(update):
-            await update.message.delete()
-            return
 
-# Auto-forward messages
-async def auto_forward(update: Update, context: CallbackContext) -> None:
-    if update.message.text:
-        text = update.message.text.lower().strip()
-        if text in forwarding_triggers:
-            data = forwarding_triggers[text]
-            try:
-                await context.bot.forward_message(
-                    chat_id=update.message.chat_id,
-                    from_chat_id=data['chat_id'],
-                    message_id=data['message_id']
-                )
-            except Exception as e:
-                logger.error(f"Forward error: {e}")
+# /modlog ek line per event
+MODLOG_DEFAULT = 15
+MODLOG_MAX = 30
+
+def format_event(event) -> str:
+    stamp = time.strftime("%d %b %H:%M:%S", time.localtime(event["ts"]))
+    parts = [stamp, event["action"]]
+    if "user" in event:
+        parts.append(f"user {event['user']}")
+    if "chat" in event:
+        parts.append(f"in {event['chat']}")
+    if "by" in event:
+        parts.append(f"by {event['by']}")
+    for key in ("reason", "word", "host", "trigger"):
+        if key in event:
+            parts.append(f"{key}={event[key]}")
+    return " ".join(parts)
+
+# Recent moderation actions (Admin Only)
+# Group me: is group ke (user_id do to sirf uske); private me group_id (-100...) ya user_id
+@allowed_users_only
+async def modlog(update: Update, context: CallbackContext) -> None:
+    try:
+        target = int(context.args[0]) if context.args else None
+        limit = min(int(context.args[1]), MODLOG_MAX) if len(context.args) > 1 else MODLOG_DEFAULT
+        if limit < 1:
+            raise ValueError(limit)
+    except ValueError:
+        await update.message.reply_text("Usage: /modlog [user_id|group_id] [count]")
+        return
 
+    chat = update.effective_chat
+    chat_id = user_id = None
+    if target is not None and target < 0:
+        chat_id = target
+    else:
+        user_id = target
+        if chat.type != "private":
+            chat_id = chat.id
+        elif target is None:
+            chat_id = DEFAULT_CHAT
+
+    if SHARD_COUNT <= 1 or (chat_id not in (None, DEFAULT_CHAT) and owns_chat(chat_id)):
+        events = JOURNAL.recent(chat_id, user_id, limit)
+        # Index me sirf is boot ke events (startup pe journal nahi padha jaata) - kam pade to file se
+        if len(events) < limit and JOURNAL.opened_seq:
+            events = await asyncio.to_thread(JOURNAL.history, chat_id, user_id, limit)
+    else:
+        # Dusre workers ke chats: unki journal files ki tail padho
+        # (default template private chat se badalta hai - woh kisi bhi worker pe ho sakta hai)
+        if chat_id not in (None, DEFAULT_CHAT):
+            paths = [journal_file(shard_for(chat_id, SHARD_COUNT))]
+        else:
+            paths = [journal_file(index) for index in range(SHARD_COUNT)]
+        events = await asyncio.to_thread(scan_recent, paths, chat_id, user_id, limit)
 
+    if not events:
+        await update.message.reply_text("No moderation actions found.")
+        return
+    lines = "\n".join(format_event(event) for event in events)
+    await update.message.reply_text(f"🧾 Recent actions:\n{lines}")
 
 # Mute user (Admin Only)
 @allowed_users_only
 async def mute_user(update: Update, context: CallbackContext) -> None:
+    if update.effective_chat.type == "private":
+        await update.message.reply_text("Use this command inside the group.")
+        return
     if not update.message.reply_to_message:
         await update.message.reply_text("Reply to a user's message with /mute to mute them.")
         return
 
     user_id = update.message.reply_to_message.from_user.id
     username = update.message.reply_to_message.from_user.username or update.message.reply_to_message.from_user.first_name
-    settings["muted_users"][str(user_id)] = time.time() + 7200  # Auto unmute in 2 hours
-    save_settings()
+    await mute_member(context, update.effective_chat.id, user_id, 7200, actor=update.effective_user.id)  # Auto unmute in 2 hours
 
-    await context.bot.restrict_chat_member(
-        chat_id=update.effective_chat.id,
+    await update.message.reply_text(f"Muted @{username} for 2 hours!")
+
+# User ko `seconds` ke liye mute karo aur unmute timer lagao
+async def mute_member(context: CallbackContext, chat_id, user_id, seconds, actor=None, reason="manual") -> None:
+    record_mute(context.job_queue, chat_id, user_id, seconds, actor, reason)
+    await moderate(lambda: context.bot.restrict_chat_member(
+        chat_id=chat_id,
         user_id=user_id,
         permissions=ChatPermissions(can_send_messages=False)
-    )
-
-    await update.message.reply_text(f"Muted @{username} for 2 hours!")
+    ))
+
+# Mute ka local state: policy, storage, journal aur unmute timer (API call alag)
+def record_mute(job_queue, chat_id, user_id, seconds, actor=None, reason="manual") -> None:
+    policy = POLICIES.get(chat_id)
+    until = time.time() + seconds
+    policy.muted_users[str(user_id)] = until
+    STORAGE.set_mute(policy.chat_id, user_id, until)
+    JOURNAL.record("mute", policy.chat_id, user_id, actor, until=until, reason=reason)
+    MUTES.schedule(policy.chat_id, user_id, until)
+    unmute_failures.pop((policy.chat_id, str(user_id)), None)
+    arm_unmute_timer(job_queue)
+
+def record_unmute(chat_id, user_id, actor=None, reason="manual") -> None:
+    policy = POLICIES.get(chat_id)
+    policy.muted_users.pop(str(user_id), None)
+    STORAGE.remove_mutes(policy.chat_id, [user_id])
+    MUTES.cancel(policy.chat_id, user_id)
+    unmute_failures.pop((policy.chat_id, str(user_id)), None)
+    JOURNAL.record("unmute", policy.chat_id, user_id, actor, reason=reason)
 
 # Unmute user (Admin Only)
 @allowed_users_only
 async def unmute_user(update: Update, context: CallbackContext) -> None:
+    if update.effective_chat.type == "private":
+        await update.message.reply_text("Use this command inside the group.")
+        return
     if not context.args and not update.message.reply_to_message:
         await update.message.reply_text("Reply to a muted user's message with /unmute or use /unmute <user_id>")
         return
@@ -516,54 +1128,300 @@ async def unmute_user(update: Update, context: CallbackContext) -> None:
             await update.message.reply_text("Invalid user ID!")
             return
 
-    if str(user_id) in settings["muted_users"]:
-        del settings["muted_users"][str(user_id)]
-        save_settings()
+    policy = POLICIES.get(update.effective_chat.id)
+    if str(user_id) in policy.muted_users:
+        record_unmute(policy.chat_id, user_id, update.effective_user.id)
 
-        await context.bot.restrict_chat_member(
+        await moderate(lambda: context.bot.restrict_chat_member(
             chat_id=update.effective_chat.id,
             user_id=user_id,
             permissions=ChatPermissions(can_send_messages=True)
-        )
+        ))
 
         await update.message.reply_text(f"User {user_id} has been manually unmuted!")
     else:
         await update.message.reply_text("User is not muted or invalid user ID!")
 
-# Auto-unmute function (Runs Every 10 Minutes)
+# Mute deadlines ka heap; ek hi run_once job sabse pehle wale deadline pe chalti hai
+MUTES = MuteScheduler()
+UNMUTE_RETRY_DELAY = 60
+UNMUTE_MAX_ATTEMPTS = 5
+unmute_timer = None  # (job, deadline)
+unmute_failures = {}  # (chat_id, user_id) -> ab tak fail hue auto-unmute
+
+# Agla unmute job arm karo (sirf tab jab naya deadline pehle wale se jaldi ho)
+def arm_unmute_timer(job_queue) -> None:
+    global unmute_timer
+    deadline = MUTES.next_deadline()
+    if deadline is None:
+        return
+    if unmute_timer is not None:
+        job, armed_at = unmute_timer
+        if armed_at <= deadline and not job.removed:
+            return
+        job.schedule_removal()
+    job = job_queue.run_once(auto_unmute_task, when=max(0, deadline - time.time()), name="auto_unmute")
+    unmute_timer = (job, deadline)
+
+# Persisted mutes se heap dobara banao (startup pe)
+def load_mutes() -> None:
+    for chat_id, user_id, until in STORAGE.load_mutes():
+        if owns_chat(chat_id):
+            MUTES.schedule(chat_id, user_id, until)
+
+# Auto-unmute: jinka time ho gaya unhe exact deadline pe unmute karo
 async def auto_unmute_task(context: CallbackContext) -> None:
-    while True:
-        current_time = time.time()
-        unmuted_users = []
-
-        for user_id, unmute_time in list(settings["muted_users"].items()):
-            if current_time >= unmute_time:  # If 2 hours are over
-                try:
-                    await context.bot.restrict_chat_member(
-                        chat_id=context.job.chat_id,
-                        user_id=int(user_id),
-                        permissions=ChatPermissions(can_send_messages=True)
-                    )
-                    unmuted_users.append(user_id)
-                except Exception as e:
-                    logger.error(f"Auto-unmute failed for {user_id}: {e}")
-
-        # Remove auto-unmuted users from the list
-        for user_id in unmuted_users:
-            del settings["muted_users"][user_id]
-        
-        save_settings()
-
-        await asyncio.sleep(600)  # Check every 10 minutes
+    global unmute_timer
+    unmute_timer = None
+    current_time = time.time()
+    unmuted_users = {}
+    dropped = set()  # jinka unmute nahi ho saka, par mute list se hata diye
+
+    for key in MUTES.pop_due(current_time):
+        chat_id, user_id = key
+        try:
+            # Purane global mutes ka group pata nahi, unhe sirf list se hatao
+            if chat_id != DEFAULT_CHAT:
+                await moderate(lambda: context.bot.restrict_chat_member(
+                    chat_id=int(chat_id),
+                    user_id=int(user_id),
+                    permissions=ChatPermissions(can_send_messages=True)
+                ))
+            unmute_failures.pop(key, None)
+        except (Forbidden, BadRequest) as e:
+            # Bot group se nikal gaya / admin nahi / user nahi mila - retry se kuch nahi badlega
+            logger.warning(f"Auto-unmute dropped for {user_id} in {chat_id}: {e}")
+            unmute_failures.pop(key, None)
+            dropped.add(key)
+        except Exception as e:
+            # Network / rate limit: thodi der baad phir, par UNMUTE_MAX_ATTEMPTS tak hi
+            attempts = unmute_failures.pop(key, 0) + 1
+            if attempts >= UNMUTE_MAX_ATTEMPTS:
+                logger.error(f"Auto-unmute gave up for {user_id} in {chat_id} after {attempts} attempts: {e}")
+                dropped.add(key)
+            else:
+                logger.error(f"Auto-unmute failed for {user_id} in {chat_id} (attempt {attempts}): {e}")
+                unmute_failures[key] = attempts
+                MUTES.schedule(chat_id, user_id, current_time + UNMUTE_RETRY_DELAY * attempts)
+                continue
+        unmuted_users.setdefault(chat_id, []).append(user_id)
+
+    # Remove auto-unmuted users from the list
+    for chat_id, user_ids in unmuted_users.items():
+        # Restrict call ke dauraan dobara mute hua ho to naya mute rehne do
+        user_ids = [user_id for user_id in user_ids if (chat_id, user_id) not in MUTES]
+        if not user_ids:
+            continue
+        if chat_id in POLICIES:
+            policy = POLICIES.get(chat_id)
+            for user_id in user_ids:
+                policy.muted_users.pop(user_id, None)
+        STORAGE.remove_mutes(chat_id, user_ids)
+        for user_id in user_ids:
+            reason = "unmute_failed" if (chat_id, user_id) in dropped else "expired"
+            JOURNAL.record("unmute", chat_id, int(user_id), reason=reason)
+
+    arm_unmute_timer(context.job_queue)
+
+# 🔹 Bulk moderation: raid ke baad ek command me sau users
+# Calls OUTBOUND se jaati hai (wahi rate limits); job background me chalti hai, status
+# message me progress aata hai aur chat ke naye updates job ka wait nahi karte.
+BULK_WINDOW = int(os.getenv("BULK_WINDOW", "10"))
+BULK_MAX_TARGETS = int(os.getenv("BULK_MAX_TARGETS", "1000"))
+BULK_MUTE_SECONDS = 7200
+BULK = BulkExecutor(
+    OUTBOUND,
+    PRIORITY_MODERATION,
+    window=BULK_WINDOW,
+    progress_interval=float(os.getenv("BULK_PROGRESS_INTERVAL", "3")),
+)
+BULK_USAGE = "<user_id ...> | joined <minutes> | matched <minutes> [word] (or reply to a message)"
+
+# Targets: ids, pichle N minute me join hue, ya jinke message banned word pe delete hue
+async def bulk_targets(update: Update, context: CallbackContext):
+    chat_id = update.effective_chat.id
+    args = [arg.lower() for arg in context.args]
+    if args and args[0] in ("joined", "matched"):
+        since = time.time() - float(args[1]) * 60 if len(args) > 1 else 0
+        if args[0] == "joined":
+            return GROUP_MEMBERS.joined_since(chat_id, since)
+        # Journal me matched pattern hai: normalized, ya chhote/repeat wale words ka folded form
+        word = " ".join(args[2:]) if len(args) > 2 else None
+        words = (word, normalize_text(word), normalize_text.fold(word)) if word else None
+        events = await asyncio.to_thread(JOURNAL.search, chat_id, None, since)
+        return list(dict.fromkeys(
+            event["user"] for event in events
+            if event["action"] == "delete" and event.get("reason") == "banned_word" and "user" in event
+            and (words is None or event.get("word") in words)
+        ))
+    if args:
+        return list(dict.fromkeys(int(arg) for arg in args))
+    reply = update.message.reply_to_message
+    if reply and reply.from_user:
+        return [reply.from_user.id]
+    raise ValueError("no targets")
+
+# Admins, bot users, khud bot aur command chalane wala kabhi target nahi hote
+async def bulk_filter(update: Update, context: CallbackContext, user_ids):
+    chat = update.effective_chat
+    protected = set(await ADMIN_CACHE.get_admins(chat.id, chat.get_administrators))
+    protected.update(ALLOWED_USERS)
+    protected.update((context.bot.id, update.effective_user.id))
+    return [user_id for user_id in user_ids if user_id not in protected]
+
+# Parse + filter + job background me; command handler turant laut jaata hai
+async def start_bulk(update: Update, context: CallbackContext, command, verb, action, on_success=None,
+                     items=None, weight=None):
+    chat = update.effective_chat
+    if chat.type == "private":
+        await update.message.reply_text("Use this command inside the group.")
+        return
+    if BULK.running(chat.id):
+        await update.message.reply_text("⚠️ A bulk job is already running here. /stopbulk stops it.")
+        return
+    if items is None:
+        try:
+            targets = await bulk_targets(update, context)
+        except (ValueError, IndexError):
+            await update.message.reply_text(f"Usage: /{command} {BULK_USAGE}")
+            return
+        try:
+            items = await bulk_filter(update, context, targets)
+        except Exception as e:
+            logger.error(f"Admin list fetch failed for {chat.id}: {e}")
+            await update.message.reply_text("❌ Could not fetch the admin list, nothing was done.")
+            return
+    if not items:
+        await update.message.reply_text("No matching users (admins are always skipped).")
+        return
+    note = ""
+    if len(items) > BULK_MAX_TARGETS:
+        note = f" (first {BULK_MAX_TARGETS} of {len(items)})"
+        items = items[:BULK_MAX_TARGETS]
 
-# Main function
-def main() -> None:
-    # Load persisted data
-    load_settings()
-    load_triggers()
+    job = BULK.start(chat.id, verb, items, weight)
+    status = await update.message.reply_text(f"{job.progress_text()}{note}")
 
-    # Create application
-    application = ApplicationBuilder().token(TOKEN).build()
+    async def progress(job):
+        await OUTBOUND.call(PRIORITY_REPLY, lambda: status.edit_text(job.progress_text()), chat_id=chat.id)
+
+    async def run():
+        await BULK.run(job, action, on_success, progress)
+        logger.info(f"Bulk {command} in {chat.id}: {job.done}/{job.total} done, {job.failed} failed")
+        try:
+            await OUTBOUND.call(PRIORITY_REPLY, lambda: status.edit_text(job.summary()), chat_id=chat.id)
+        except Exception as e:
+            logger.error(f"Bulk summary update failed: {e}")
+
+    context.application.create_task(run(), update=update)
+
+# /massmute <targets> - 2 ghante ke liye mute (Admin Only)
+@allowed_users_only
+async def mass_mute(update: Update, context: CallbackContext) -> None:
+    chat_id, actor = update.effective_chat.id, update.effective_user.id
+    await start_bulk(
+        update, context, "massmute", "Muting",
+        lambda user_id: lambda: context.bot.restrict_chat_member(
+            chat_id=chat_id, user_id=user_id, permissions=ChatPermissions(can_send_messages=False)
+        ),
+        lambda user_id, _: record_mute(context.job_queue, chat_id, user_id, BULK_MUTE_SECONDS, actor, "bulk"),
+    )
+
+# /massunmute <targets> (Admin Only)
+@allowed_users_only
+async def mass_unmute(update: Update, context: CallbackContext) -> None:
+    chat_id, actor = update.effective_chat.id, update.effective_user.id
+    await start_bulk(
+        update, context, "massunmute", "Unmuting",
+        lambda user_id: lambda: context.bot.restrict_chat_member(
+            chat_id=chat_id, user_id=user_id, permissions=ChatPermissions(can_send_messages=True)
+        ),
+        lambda user_id, _: record_unmute(chat_id, user_id, actor, "bulk"),
+    )
+
+# /massban <targets> - ban + unke saare messages delete (Admin Only)
+@allowed_users_only
+async def mass_ban(update: Update, context: CallbackContext) -> None:
+    chat_id, actor = update.effective_chat.id, update.effective_user.id
+    await start_bulk(
+        update, context, "massban", "Banning",
+        lambda user_id: lambda: context.bot.ban_chat_member(chat_id=chat_id, user_id=user_id, revoke_messages=True),
+        lambda user_id, _: JOURNAL.record("ban", chat_id, user_id, actor, reason="bulk"),
+    )
+
+# /purge <targets> - in users ke recent messages delete (100 per call) (Admin Only)
+@allowed_users_only
+async def purge(update: Update, context: CallbackContext) -> None:
+    chat_id, actor = update.effective_chat.id, update.effective_user.id
+    try:
+        targets = await bulk_targets(update, context)
+    except (ValueError, IndexError):
+        await update.message.reply_text(f"Usage: /purge {BULK_USAGE}")
+        return
+    # Telegram 48 ghante se purane messages delete nahi karta
+    message_ids = RECENT_MESSAGES.from_users(chat_id, targets, since=time.time() - 48 * 3600)
+    if not message_ids:
+        await update.message.reply_text("No recent messages from these users.")
+        return
+
+    def purged(batch, _):
+        RECENT_MESSAGES.forget(chat_id, batch)
+        JOURNAL.record("purge", chat_id, actor=actor, messages=len(batch))
+
+    await start_bulk(
+        update, context, "purge", "Deleting messages",
+        lambda batch: lambda: context.bot.delete_messages(chat_id=chat_id, message_ids=batch),
+        purged,
+        items=chunks(message_ids, DELETE_BATCH),
+        weight=len,
+    )
+
+# Chal rahi bulk job rok do (jo calls ja chuki woh ho chuki)
+@allowed_users_only
+async def stop_bulk(update: Update, context: CallbackContext) -> None:
+    if BULK.cancel(update.effective_chat.id):
+        await update.message.reply_text("🛑 Stopping the bulk job...")
+    else:
+        await update.message.reply_text("No bulk job is running here.")
+
+# Bot ka mode: "polling" (default) ya "webhook" (built-in HTTP server)
+BOT_MODE = os.getenv("BOT_MODE", "polling")
+WEBHOOK_LISTEN = os.getenv("WEBHOOK_LISTEN", "127.0.0.1")
+WEBHOOK_PORT = int(os.getenv("WEBHOOK_PORT", "8443"))
+WEBHOOK_PATH = os.getenv("WEBHOOK_PATH", "/telegram")
+WEBHOOK_SECRET = os.getenv("WEBHOOK_SECRET") or None
+WEBHOOK_URL = os.getenv("WEBHOOK_URL") or None  # Public URL; diya ho to set_webhook bhi hota hai
+# CONCURRENT_UPDATES > 1: alag chats ke updates saath chalte hai, har chat ke apne order me.
+# Shared state (policies, forwarding_triggers, ALLOWED_USERS) handlers bina await ke ek hi
+# step me badalte hai aur reload use ek saath swap karta hai - isliye beech me koi aadha
+# badla hua state nahi dekhta.
+CONCURRENT_UPDATES = int(os.getenv("CONCURRENT_UPDATES", "1"))
+MAX_PENDING_UPDATES = int(os.getenv("MAX_PENDING_UPDATES", "1000"))
+UPDATE_PROCESSOR = None
+BOT_API_URL = os.getenv("BOT_API_URL") or None  # Local Bot API server ke liye
+
+# Application banao aur saare handlers/jobs register karo
+# request: custom BaseRequest (benchmark ka fake Bot API yahin se aata hai)
+def build_application(token=TOKEN, webhook=False, request=None):
+    global UPDATE_PROCESSOR
+    builder = (
+        ApplicationBuilder()
+        .token(token)
+        .post_init(on_start)
+        .post_stop(on_stop)
+        .post_shutdown(on_shutdown)
+    )
+    if CONCURRENT_UPDATES > 1:
+        UPDATE_PROCESSOR = ChatOrderedProcessor(CONCURRENT_UPDATES, max_pending=MAX_PENDING_UPDATES)
+        builder = builder.concurrent_updates(UPDATE_PROCESSOR).update_queue(BoundedUpdateQueue(MAX_PENDING_UPDATES))
+    if BOT_API_URL:
+        builder = builder.base_url(f"{BOT_API_URL}/bot").base_file_url(f"{BOT_API_URL}/file/bot")
+    if request is not None:
+        builder = builder.request(request)
+    if webhook:
+        # Updates hamara WebhookServer deta hai, Updater ki zarurat nahi
+        builder = builder.updater(None)
+    application = builder.build()
 
     # Add handlers
     application.add_handler(CommandHandler("start", start))
@@ -574,6 +1432,10 @@ def main() -> None:
     application.add_handler(CommandHandler("allow_media", allow_media))
     application.add_handler(CommandHandler("block_link", block_link))
     application.add_handler(CommandHandler("allow_link", allow_link))
+    application.add_handler(CommandHandler("allow_domain", allow_domain))
+    application.add_handler(CommandHandler("deny_domain", deny_domain))
+    application.add_handler(CommandHandler("remove_domain", remove_domain))
+    application.add_handler(CommandHandler("domains", domains))
     application.add_handler(CommandHandler("ban", ban_word))
     application.add_handler(CommandHandler("unban", unban_word))
     application.add_handler(CommandHandler("setwords", setwords))
@@ -586,18 +1448,82 @@ def main() -> None:
     application.add_handler(CommandHandler("remove_timer", remove_timer))
     application.add_handler(CommandHandler("mute", mute_user))
     application.add_handler(CommandHandler("unmute", unmute_user))
+    application.add_handler(CommandHandler("stats", pipeline_stats))
+    application.add_handler(CommandHandler("reload", reload_command))
+    application.add_handler(CommandHandler("modlog", modlog))
+    application.add_handler(CommandHandler("massmute", mass_mute))
+    application.add_handler(CommandHandler("massunmute", mass_unmute))
+    application.add_handler(CommandHandler("massban", mass_ban))
+    application.add_handler(CommandHandler("purge", purge))
+    application.add_handler(CommandHandler("stopbulk", stop_bulk))
+    application.add_handler(TypeHandler(Update, first_update), group=-3)
     application.add_handler(MessageHandler(filters.ALL, save_user_data), group=-1)
+    application.add_handler(ChatMemberHandler(track_admin_changes, ChatMemberHandler.ANY_CHAT_MEMBER))
     application.add_handler(MessageHandler(filters.StatusUpdate.NEW_CHAT_MEMBERS, welcome))
-    application.add_handler(MessageHandler(filters.TEXT & ~filters.COMMAND, filter_messages))
-   
-    application.add_handler(MessageHandler(filters.TEXT & ~filters.COMMAND, auto_forward))
+    # Text, captions aur media - sab ek hi pipeline se
+    application.add_handler(MessageHandler(
+        filters.UpdateType.MESSAGE & ~filters.COMMAND & ~filters.StatusUpdate.ALL, filter_messages
+    ))
+
+
+    # Members write-behind flush
+    application.job_queue.run_repeating(flush_members_job, interval=MEMBERS_FLUSH_INTERVAL, first=MEMBERS_FLUSH_INTERVAL)
+
+    # Flood counters ki safai
+    application.job_queue.run_repeating(flood_sweep_job, interval=300, first=300)
+
+    # Pending mutes ke timers (expired wale turant unmute honge)
+    load_mutes()
+    arm_unmute_timer(application.job_queue)
+
+    # Journal checkpoint (restart pe itna kam replay)
+    if JOURNAL_SNAPSHOT_INTERVAL > 0:
+        application.job_queue.run_repeating(journal_snapshot_job, interval=JOURNAL_SNAPSHOT_INTERVAL, first=JOURNAL_SNAPSHOT_INTERVAL)
 
+    # Config files / DB ke bahari changes (sharded mode me dusre workers ke bhi)
+    if CONFIG_RELOAD_INTERVAL > 0:
+        application.job_queue.run_repeating(config_watch_job, interval=CONFIG_RELOAD_INTERVAL, first=CONFIG_RELOAD_INTERVAL)
+
+    if METRICS.enabled:
+        instrument(application)
+    return application
+
+# Main function
+def main() -> None:
+    # Crash se pehle ki moderation writes wapas lao, phir persisted data load karo
+    recover_from_journal()
+    STARTUP.mark("recovery")
+    load_settings()
+    load_triggers()
+    STARTUP.mark("config")
+
+    # Create application
+    application = build_application(webhook=BOT_MODE == "webhook")
+    STARTUP.mark("application")
 
-    # Start auto-unmute background task
-    application.job_queue.run_repeating(auto_unmute_task, interval=600, first=10)
     # Start bot
-    logger.info("Bot started")
-    application.run_polling()
+    logger.info(f"Bot started ({BOT_MODE})" + (f", shard {SHARD_INDEX + 1}/{SHARD_COUNT}" if SHARD_COUNT > 1 else ""))
+    if BOT_MODE == "webhook":
+        from webhook import WebhookServer, serve_webhook
+        if not WEBHOOK_SECRET:
+            logger.warning("WEBHOOK_SECRET not set - webhook requests are not authenticated")
+        server = WebhookServer(
+            application,
+            host=WEBHOOK_LISTEN,
+            port=WEBHOOK_PORT,
+            path=WEBHOOK_PATH,
+            secret_token=WEBHOOK_SECRET,
+        )
+        asyncio.run(serve_webhook(
+            application,
+            server,
+            webhook_url=WEBHOOK_URL,
+            allowed_updates=Update.ALL_TYPES,
+            max_connections=max(CONCURRENT_UPDATES, 40),
+        ))
+    else:
+        # chat_member updates default me nahi aate, isliye sab types maango
+        application.run_polling(allowed_updates=Update.ALL_TYPES)
 
 if __name__ == "__main__":
     main()
@@ -0,0 +1,168 @@
+import time
+import asyncio
+import logging
+from collections import OrderedDict, deque
+
+logger = logging.getLogger(__name__)
+
+# deleteMessages ek call me max 100 ids leta hai
+DELETE_BATCH = 100
+# Summary me itni failures naam se
+SHOW_FAILURES = 5
+
+
+def chunks(items, size):
+    return [items[i:i + size] for i in range(0, len(items), size)]
+
+
+# 🔹 Har group ke recent messages: (message_id, user_id, time) - /purge ke liye
+# Telegram 48 ghante se purane messages delete nahi karne deta, isliye thodi hi history.
+class RecentMessages:
+    def __init__(self, per_chat=500, max_chats=2000):
+        self.per_chat = per_chat
+        self.max_chats = max_chats
+        self.chats = OrderedDict()  # chat_id -> deque
+
+    def add(self, chat_id, message_id, user_id, now=None):
+        messages = self.chats.get(chat_id)
+        if messages is None:
+            messages = self.chats[chat_id] = deque(maxlen=self.per_chat)
+            if len(self.chats) > self.max_chats:
+                self.chats.popitem(last=False)
+        else:
+            self.chats.move_to_end(chat_id)
+        messages.append((message_id, user_id, time.time() if now is None else now))
+
+    # In users ke message ids (purane pehle)
+    def from_users(self, chat_id, user_ids, since=0):
+        user_ids = set(user_ids)
+        found = dict.fromkeys(
+            message_id for message_id, user_id, sent in self.chats.get(chat_id, ())
+            if user_id in user_ids and sent >= since
+        )
+        return list(found)
+
+    # Delete ho chuke messages dobara na aaye
+    def forget(self, chat_id, message_ids):
+        messages = self.chats.get(chat_id)
+        if not messages:
+            return
+        message_ids = set(message_ids)
+        kept = [entry for entry in messages if entry[0] not in message_ids]
+        messages.clear()
+        messages.extend(kept)
+
+    def __len__(self):
+        return sum(len(messages) for messages in self.chats.values())
+
+
+# 🔹 Ek bulk operation ka hisaab (progress + partial failures)
+class BulkJob:
+    def __init__(self, chat_id, label, items, weight=None):
+        self.chat_id = chat_id
+        self.label = label
+        self.items = items
+        self.weight = weight or (lambda item: 1)
+        self.total = sum(self.weight(item) for item in items)
+        self.done = 0
+        self.failed = 0
+        self.failures = []  # (item, error) - pehli kuch hi
+        self.cancelled = False
+        self.started = time.monotonic()
+        self.finished = None
+
+    def progress_text(self) -> str:
+        text = f"⏳ {self.label}: {self.done + self.failed}/{self.total}"
+        if self.failed:
+            text += f" ({self.failed} failed)"
+        return text
+
+    def summary(self) -> str:
+        seconds = (self.finished or time.monotonic()) - self.started
+        icon = "🛑" if self.cancelled else ("⚠️" if self.failed else "✅")
+        text = f"{icon} {self.label}: {self.done}/{self.total} done in {seconds:.0f}s"
+        if self.cancelled:
+            text += ", stopped"
+        if self.failed:
+            text += f", {self.failed} failed"
+            text += "".join(f"\n- {item}: {error}" for item, error in self.failures)
+            if self.failed > len(self.failures):
+                text += f"\n- ... and {self.failed - len(self.failures)} more"
+        return text
+
+
+# 🔹 Bulk executor: bahut saari Bot API calls outbound scheduler se (wahi rate limits aur
+# RetryAfter handling). Ek job ke max `window` calls hi queue me hote hai, isliye live
+# moderation (same priority) kabhi poori job ke peeche wait nahi karta. Ek chat me ek
+# waqt pe ek job.
+class BulkExecutor:
+    def __init__(self, outbound, priority, window=10, progress_interval=3.0):
+        self.outbound = outbound
+        self.priority = priority
+        self.window = window
+        self.progress_interval = progress_interval
+        self.jobs = {}  # chat_id -> BulkJob
+        self.completed = 0
+
+    def running(self, chat_id):
+        return self.jobs.get(chat_id)
+
+    # Job turant register hota hai (dusra command same chat me dusri job na chala de)
+    def start(self, chat_id, label, items, weight=None) -> BulkJob:
+        job = BulkJob(chat_id, label, items, weight)
+        self.jobs[chat_id] = job
+        return job
+
+    def cancel(self, chat_id) -> bool:
+        job = self.jobs.get(chat_id)
+        if job is None:
+            return False
+        job.cancelled = True
+        return True
+
+    # action(item): bina argument wala coroutine function deta hai (Bot API call)
+    # on_success(item, result): call ke baad local state (mute list, journal ...)
+    # progress(job): har `progress_interval` seconds pe (status message edit)
+    async def run(self, job, action, on_success=None, progress=None) -> BulkJob:
+        slots = asyncio.Semaphore(self.window)
+        loop = asyncio.get_running_loop()
+        reporter = loop.create_task(self._report(job, progress)) if progress else None
+
+        async def execute(item):
+            try:
+                result = await self.outbound.call(self.priority, action(item))
+                if on_success is not None:
+                    on_success(item, result)
+                job.done += job.weight(item)
+            except Exception as e:
+                job.failed += job.weight(item)
+                if len(job.failures) < SHOW_FAILURES:
+                    job.failures.append((item, e))
+                logger.warning(f"{job.label} failed for {item}: {e}")
+            finally:
+                slots.release()
+
+        tasks = []
+        try:
+            for item in job.items:
+                await slots.acquire()
+                if job.cancelled:
+                    slots.release()
+                    break
+                tasks.append(loop.create_task(execute(item)))
+            await asyncio.gather(*tasks)
+        finally:
+            job.finished = time.monotonic()
+            self.jobs.pop(job.chat_id, None)
+            self.completed += 1
+            if reporter is not None:
+                reporter.cancel()
+        return job
+
+    async def _report(self, job, progress):
+        while True:
+            await asyncio.sleep(self.progress_interval)
+            try:
+                await progress(job)
+            except Exception as e:
+                logger.debug(f"Bulk progress update failed: {e}")
@@ -0,0 +1,179 @@
+import logging
+from collections import OrderedDict
+
+from matcher import BannedWordMatcher
+from links import LinkFilter, normalize_host
+from normalize import banned_pattern, normalize_text
+from storage import DEFAULT_CHAT, copy_settings, default_settings
+
+logger = logging.getLogger(__name__)
+
+
+# 🔹 Ek group ki moderation policy (compact record)
+class ChatPolicy:
+    __slots__ = ("chat_id", "block_links", "block_media", "message_timer",
+                 "banned_words", "muted_users", "allowed_domains", "denied_domains",
+                 "_matcher", "_folded_matcher", "_links")
+
+    def __init__(self, chat_id, settings):
+        self.chat_id = str(chat_id)
+        self.block_links = settings["block_links"]
+        self.block_media = settings["block_media"]
+        self.message_timer = settings["message_timer"]
+        self.banned_words = list(settings["banned_words"])
+        self.muted_users = dict(settings["muted_users"])
+        self.allowed_domains = list(settings.get("allowed_domains", []))
+        self.denied_domains = list(settings.get("denied_domains", []))
+        self._matcher = None
+        self._folded_matcher = None
+        self._links = None
+
+    # Banned words ke matchers pehli baar zarurat pe compile hote hai.
+    # Zyadatar patterns normalized form me hai (message bhi isi tarah normalize hota hai);
+    # jinka repeat collapse bharosemand nahi ("free", "kill") woh folded form me, folded
+    # message pe (_folded_matcher) - homoglyph/zero-width/spacing/leet folding phir bhi lagti hai.
+    # banned_words me admin ka likha original word hi rehta hai.
+    @property
+    def matcher(self):
+        if self._matcher is None:
+            self._matcher, self._folded_matcher = BannedWordMatcher(), BannedWordMatcher()
+            for word in self.banned_words:
+                self._pattern_matcher(word).add(self._pattern(word))
+        return self._matcher
+
+    @staticmethod
+    def _pattern(word):
+        pattern = banned_pattern(word)
+        return normalize_text.fold(word) if pattern is None else pattern
+
+    def _pattern_matcher(self, word):
+        return self._matcher if banned_pattern(word) is not None else self._folded_matcher
+
+    # Message me pehla banned word (folded = normalize_text.fold, normalized = normalize_text)
+    def find_banned(self, folded, normalized):
+        return self.matcher.search(normalized) or self._folded_matcher.search(folded)
+
+    def ban(self, word) -> bool:
+        if word in self.banned_words:
+            return False
+        self.banned_words.append(word)
+        if self._matcher is not None:
+            self._pattern_matcher(word).add(self._pattern(word))
+        return True
+
+    def unban(self, word) -> bool:
+        if word not in self.banned_words:
+            return False
+        self.banned_words.remove(word)
+        if self._matcher is not None:
+            matcher, pattern = self._pattern_matcher(word), self._pattern(word)
+            # "spam" aur "sp4m" ek hi pattern hai - dusra abhi banned ho to rehne do
+            if not any(self._pattern_matcher(other) is matcher and self._pattern(other) == pattern
+                       for other in self.banned_words):
+                matcher.remove(pattern)
+        return True
+
+    # Allow/deny domain tries bhi lazily bante hai
+    @property
+    def links(self):
+        if self._links is None:
+            self._links = LinkFilter(self.allowed_domains, self.denied_domains)
+        return self._links
+
+    # kind: "allowed" ya "denied"; domain dusri list me ho to wahan se hat jaata hai
+    def set_domain(self, kind, domain) -> bool:
+        domain = normalize_host(domain)
+        target = self.allowed_domains if kind == "allowed" else self.denied_domains
+        if domain is None or domain in target:
+            return False
+        self.remove_domain(domain)
+        target.append(domain)
+        if self._links is not None:
+            (self._links.allowed if kind == "allowed" else self._links.denied).add(domain)
+        return True
+
+    def remove_domain(self, domain) -> bool:
+        domain = normalize_host(domain)
+        removed = False
+        for domains, trie in ((self.allowed_domains, "allowed"), (self.denied_domains, "denied")):
+            if domain in domains:
+                domains.remove(domain)
+                if self._links is not None:
+                    getattr(self._links, trie).remove(domain)
+                removed = True
+        return removed
+
+    def as_settings(self):
+        return {
+            "block_links": self.block_links,
+            "block_media": self.block_media,
+            "message_timer": self.message_timer,
+            "muted_users": self.muted_users,
+            "banned_words": self.banned_words,
+            "allowed_domains": self.allowed_domains,
+            "denied_domains": self.denied_domains
+        }
+
+
+# 🔹 chat_id -> ChatPolicy, lazy load + LRU eviction
+# Har change turant storage me jaata hai, isliye evict karna safe hai.
+# Naya group pehli baar DEFAULT_CHAT template se seed hota hai.
+class ChatPolicyCache:
+    def __init__(self, storage, max_chats=10000):
+        self.storage = storage
+        self.max_chats = max_chats
+        self.policies = OrderedDict()
+        self.loads = 0
+
+    def get(self, chat_id) -> ChatPolicy:
+        key = str(chat_id)
+        policy = self.policies.get(key)
+        if policy is not None:
+            self.policies.move_to_end(key)
+            return policy
+
+        policy = self._load(key)
+        self.policies[key] = policy
+        self._evict()
+        return policy
+
+    # max_chats se upar ho to sabse purani chats hatao.
+    # Template kabhi evict nahi hota (har naye chat ko chahiye)
+    def _evict(self):
+        while len(self.policies) > self.max_chats:
+            oldest = next(iter(self.policies))
+            if oldest == DEFAULT_CHAT:
+                self.policies.move_to_end(oldest)
+                oldest = next(iter(self.policies))
+            del self.policies[oldest]
+
+    def _load(self, chat_id):
+        self.loads += 1
+        settings = self.storage.load_chat_settings(chat_id)
+        if settings is None:
+            if chat_id == DEFAULT_CHAT:
+                settings = default_settings()
+            else:
+                template = self.get(DEFAULT_CHAT).as_settings()
+                settings = copy_settings(template)
+                settings["muted_users"] = {}
+            self.storage.save_chat_settings(chat_id, settings)
+        return ChatPolicy(chat_id, settings)
+
+    def __contains__(self, chat_id):
+        return str(chat_id) in self.policies
+
+    # Hot reload: naye (pehle se compiled) policies ek saath lagao. Jo chats snapshot
+    # bante waqt cache me aayi, woh waise hi rehti hai (sabse nayi maani jaati hai).
+    def replace(self, policies):
+        for chat_id, policy in self.policies.items():
+            policies.setdefault(chat_id, policy)
+        self.policies = policies
+        self._evict()
+
+    # Agli get() storage se dobara load karegi
+    def discard(self, chat_id):
+        self.policies.pop(str(chat_id), None)
+
+    def clear(self):
+        self.policies.clear()
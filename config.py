@@ -0,0 +1,42 @@
+import logging
+import time
+from collections import OrderedDict
+
+from chat_settings import ChatPolicy
+from triggers import TriggerIndex
+
+logger = logging.getLogger(__name__)
+
+
+# 🔹 Hot reload ka snapshot: storage se taaza padha hua poora config
+# Worker thread me banta hai (matchers / domain tries / trigger index pehle se compiled)
+# aur loop pe ek hi synchronous step me swap hota hai. Swap se pehle koi ise touch
+# nahi karta, isliye handlers ko kabhi aadha load hua config nahi dikhta.
+class ConfigSnapshot:
+    __slots__ = ("chats", "triggers", "trigger_index", "users", "policies", "built_in")
+
+    def __init__(self, chats, triggers, users, policies, built_in):
+        self.chats = chats
+        self.triggers = triggers
+        self.trigger_index = TriggerIndex(triggers)
+        self.users = users
+        self.policies = policies
+        self.built_in = built_in
+
+
+# chat_ids: abhi cache me jo chats hai (LRU order me) - sirf unki policies dobara banti hai,
+# baaki pehli zarurat pe storage se load hongi.
+def build_snapshot(storage, chat_ids):
+    started = time.perf_counter()
+    chats, triggers, users = storage.read_config(chat_ids)
+    policies = OrderedDict()
+    for chat_id in chat_ids:
+        settings = chats.get(chat_id)
+        if settings is None:
+            continue
+        policy = ChatPolicy(chat_id, settings)
+        # Compile abhi (thread me) - loop pe pehle message ka wait na ho
+        policy.matcher
+        policy.links
+        policies[chat_id] = policy
+    return ConfigSnapshot(chats, triggers, users, policies, time.perf_counter() - started)
@@ -0,0 +1,123 @@
+import io
+import csv
+import gzip
+import tempfile
+import zipfile
+
+# Telegram bots 50 MB tak ki file upload kar sakte hai; thoda margin rakho
+TELEGRAM_UPLOAD_LIMIT = 50 * 1024 * 1024
+PART_MARGIN = 1024 * 1024
+
+HEADER = ["Group ID", "User ID", "Name", "Username", "Mobile"]
+COMPRESSIONS = ("none", "gzip", "zip")
+
+# Storage me None, CSV me yeh text
+NO_USERNAME = "N/A"
+NO_MOBILE = "Not Available"
+
+
+# Har group ke rows se pehle: separator + column headers
+def group_heading(chat_id):
+    return [
+        [f"Group ID: {chat_id}", "", "", "", ""],  # **Group Separator Row**
+        ["User ID", "Name", "Username", "Mobile"],  # **Column Headers for Each Group**
+    ]
+
+
+# 🔹 CSV rows lazily banao (poori list kabhi memory me nahi banti)
+# members: (chat_id, user_id, name, username, mobile) rows, chat ke hisaab se grouped
+# Yields (chat_id, row, member): member=True sirf user rows ke liye
+def iter_member_rows(members):
+    current = None
+    for chat_id, user_id, name, username, mobile in members:
+        if chat_id != current:
+            if current is not None:
+                yield current, [], False  # **Empty Row for Separation Between Groups**
+            current = chat_id
+            for row in group_heading(chat_id):
+                yield chat_id, row, False
+        yield chat_id, [
+            str(user_id),  # User ID as string
+            name or "Unknown",
+            username or NO_USERNAME,
+            mobile or NO_MOBILE
+        ], True
+    if current is not None:
+        yield current, [], False
+
+
+# 🔹 Ek upload part: temp file (memory me, threshold ke baad disk pe) + optional compression
+class ExportPart:
+    def __init__(self, basename, compress="none", spill_threshold=8 * 1024 * 1024):
+        self.file = tempfile.SpooledTemporaryFile(max_size=spill_threshold)
+        self.archive = None
+        if compress == "gzip":
+            self.filename = f"{basename}.csv.gz"
+            self.sink = gzip.GzipFile(filename=f"{basename}.csv", mode="wb", fileobj=self.file)
+        elif compress == "zip":
+            self.filename = f"{basename}.zip"
+            self.archive = zipfile.ZipFile(self.file, "w", compression=zipfile.ZIP_DEFLATED)
+            self.sink = self.archive.open(f"{basename}.csv", "w", force_zip64=True)
+        else:
+            self.filename = f"{basename}.csv"
+            self.sink = self.file
+        self.rows = 0
+
+    def write(self, data: bytes):
+        self.sink.write(data)
+
+    # Compressed output ka size (compressor ke buffer ke alawa)
+    def size(self) -> int:
+        return self.file.tell()
+
+    def finish(self):
+        if self.sink is not self.file:
+            self.sink.close()
+        if self.archive is not None:
+            self.archive.close()
+        self.file.seek(0)
+        return self
+
+
+# 🔹 Rows ko parts me likho; har part upload limit se chhota rahega
+def export_members(members, compress="none", part_limit=TELEGRAM_UPLOAD_LIMIT,
+                   spill_threshold=8 * 1024 * 1024, basename="group_members"):
+    if compress not in COMPRESSIONS:
+        raise ValueError(f"Unknown compression: {compress}")
+
+    line = io.StringIO()
+    writer = csv.writer(line)
+
+    def encode(row) -> bytes:
+        line.seek(0)
+        line.truncate()
+        writer.writerow(row)
+        return line.getvalue().encode()
+
+    header = encode(HEADER)
+    limit = max(part_limit - PART_MARGIN, len(header) + 1)
+    parts = []
+    part = None
+
+    for chat_id, row, member in iter_member_rows(members):
+        data = encode(row)
+        if part is not None and part.size() + len(data) > limit:
+            parts.append(part.finish())
+            part = None
+        if part is None:
+            part = ExportPart(f"{basename}_part{len(parts) + 1}", compress, spill_threshold)
+            part.write(header)
+            # Group beech me kata: naye part me bhi pata chale rows kis group ki hai
+            if member:
+                for heading in group_heading(chat_id):
+                    part.write(encode(heading))
+        part.write(data)
+        part.rows += 1
+
+    if part is not None:
+        parts.append(part.finish())
+
+    # Sirf ek part bana to purana naam rakho
+    if len(parts) == 1:
+        parts[0].filename = parts[0].filename.replace(f"{basename}_part1", basename)
+    return parts
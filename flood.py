@@ -0,0 +1,89 @@
+import time
+from collections import OrderedDict
+
+# Escalation ladder ke verdicts
+ALLOW = None
+DELETE = "delete"
+MUTE = "mute"
+BAN = "ban"
+
+
+class FloodEntry:
+    __slots__ = ("tokens", "last", "strikes", "strike_time")
+
+    def __init__(self, tokens, now):
+        self.tokens = tokens
+        self.last = now
+        self.strikes = 0
+        self.strike_time = now
+
+
+# 🔹 Per (chat, user) token bucket flood control
+# message_timer = har message ke liye kitne seconds ka "token"; burst itne
+# messages ek saath allow karta hai. Limit todne pe strikes badhte hai:
+# delete -> mute -> ban. Entries LRU me bounded hai, idle wali sweep se hatti hai.
+class FloodControl:
+    def __init__(self, burst=3, mute_after=3, ban_after=6, strike_window=3600, max_entries=100000):
+        self.burst = burst
+        self.mute_after = mute_after
+        self.ban_after = ban_after
+        self.strike_window = strike_window
+        self.max_entries = max_entries
+        self.entries = OrderedDict()
+
+    def __len__(self):
+        return len(self.entries)
+
+    # interval = message_timer (seconds per message); verdict return karta hai
+    def check(self, chat_id, user_id, interval, now=None):
+        if interval <= 0:
+            return ALLOW
+        if now is None:
+            now = time.monotonic()
+
+        key = (chat_id, user_id)
+        entry = self.entries.get(key)
+        if entry is None:
+            entry = FloodEntry(self.burst, now)
+            self.entries[key] = entry
+            if len(self.entries) > self.max_entries:
+                self.entries.popitem(last=False)
+        else:
+            self.entries.move_to_end(key)
+            entry.tokens = min(self.burst, entry.tokens + (now - entry.last) / interval)
+            entry.last = now
+
+        if entry.tokens >= 1:
+            entry.tokens -= 1
+            return ALLOW
+
+        if now - entry.strike_time > self.strike_window:
+            entry.strikes = 0
+        entry.strikes += 1
+        entry.strike_time = now
+
+        # Mute/ban sirf threshold cross hone pe ek baar; baaki in-flight messages delete
+        if entry.strikes == self.ban_after:
+            return BAN
+        if entry.strikes == self.mute_after:
+            return MUTE
+        return DELETE
+
+    # Ban ke baad user ki history saaf karo
+    def reset(self, chat_id, user_id):
+        self.entries.pop((chat_id, user_id), None)
+
+    # Jo entries strike_window se idle hai unka koi asar nahi bacha, hata do
+    def evict_idle(self, now=None) -> int:
+        if now is None:
+            now = time.monotonic()
+        cutoff = now - self.strike_window
+        evicted = 0
+        # OrderedDict LRU order me hai - sabse purani entries aage
+        while self.entries:
+            key, entry = next(iter(self.entries.items()))
+            if entry.last > cutoff:
+                break
+            del self.entries[key]
+            evicted += 1
+        return evicted
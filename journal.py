@@ -0,0 +1,391 @@
+import os
+import sys
+import json
+import glob
+import time
+import logging
+import threading
+from collections import OrderedDict, deque
+
+from persistence import atomic_write_json
+
+logger = logging.getLogger(__name__)
+
+FSYNC_POLICIES = ("always", "interval", "never")
+# /modlog file se itna aakhri hissa padhta hai (restart se pehle ke events)
+RECENT_TAIL_BYTES = 4 * 1024 * 1024
+# Startup pe aakhri event dhoondhne ke liye file ke end se itne bytes ek baar me
+LAST_EVENT_BLOCK = 64 * 1024
+# search() itna peeche tak dekhta hai
+SEARCH_TAIL_BYTES = 32 * 1024 * 1024
+
+
+def _empty_state():
+    return {"mutes": {}, "banned_words": {}, "triggers": {}}
+
+
+# 🔹 Ek event state pe lagao (snapshot fold aur replay dono yahi use karte hai)
+def apply_event(state, event):
+    action = event.get("action")
+    chat_id = event.get("chat")
+    if action == "mute":
+        state["mutes"].setdefault(chat_id, {})[str(event["user"])] = event["until"]
+    elif action == "unmute":
+        mutes = state["mutes"].get(chat_id, {})
+        mutes.pop(str(event["user"]), None)
+        if not mutes:
+            state["mutes"].pop(chat_id, None)
+    elif action == "ban_word":
+        words = state["banned_words"].setdefault(chat_id, [])
+        if event["word"] not in words:
+            words.append(event["word"])
+    elif action == "unban_word":
+        words = state["banned_words"].get(chat_id, [])
+        if event["word"] in words:
+            words.remove(event["word"])
+        if not words:
+            state["banned_words"].pop(chat_id, None)
+    elif action == "trigger_set":
+        state["triggers"][event["trigger"]] = event["data"]
+    elif action == "trigger_remove":
+        state["triggers"].pop(event["trigger"], None)
+
+
+# Crash recovery: checkpoint ke baad ke events storage pe dobara lagao (sab idempotent)
+def replay_into_storage(storage, events, now=None):
+    if now is None:
+        now = time.time()
+    applied = 0
+    for event in events:
+        action = event.get("action")
+        chat_id = event.get("chat")
+        if action == "mute" and event["until"] > now:
+            storage.set_mute(chat_id, event["user"], event["until"])
+        elif action == "unmute":
+            storage.remove_mutes(chat_id, [event["user"]])
+        elif action == "ban_word":
+            storage.add_banned_word(chat_id, event["word"])
+        elif action == "unban_word":
+            storage.remove_banned_word(chat_id, event["word"])
+        elif action == "trigger_set":
+            storage.set_trigger(event["trigger"], event["data"])
+        elif action == "trigger_remove":
+            storage.remove_trigger(event["trigger"])
+        else:
+            continue
+        applied += 1
+    return applied
+
+
+def _parse(line):
+    try:
+        event = json.loads(line)
+    except ValueError:
+        return None  # crash me adhuri likhi line
+    return event if isinstance(event, dict) and "seq" in event else None
+
+
+# File ke aakhri `tail_bytes` ke events (pehli adhuri line chhod ke)
+def read_tail(path, tail_bytes=RECENT_TAIL_BYTES):
+    try:
+        file = open(path, "rb")
+    except FileNotFoundError:
+        return []
+    with file:
+        size = file.seek(0, os.SEEK_END)
+        start = max(0, size - tail_bytes)
+        file.seek(start)
+        if start:
+            file.readline()
+        return [event for event in map(_parse, file) if event is not None]
+
+
+# File ka aakhri poora event - startup pe sirf seq ke liye, baaki file nahi padhi jaati
+def last_event(path, block=LAST_EVENT_BLOCK):
+    try:
+        file = open(path, "rb")
+    except FileNotFoundError:
+        return None
+    with file:
+        end = file.seek(0, os.SEEK_END)
+        tail = b""
+        while end > 0:
+            start = max(0, end - block)
+            file.seek(start)
+            tail = file.read(end - start) + tail
+            end = start
+            lines = tail.split(b"\n")
+            # Beech se shuru hua block: pehli line adhuri ho sakti hai
+            for line in reversed(lines if start == 0 else lines[1:]):
+                event = _parse(line) if line.strip() else None
+                if event is not None:
+                    return event
+    return None
+
+
+def matches(event, chat_id=None, user_id=None):
+    if chat_id is not None and event.get("chat") != str(chat_id):
+        return False
+    if user_id is not None and event.get("user") != user_id and event.get("by") != user_id:
+        return False
+    return True
+
+
+# Kai journals (sharded workers) me se recent events - naye pehle
+def scan_recent(paths, chat_id=None, user_id=None, limit=20):
+    events = []
+    for path in paths:
+        events.extend(event for event in read_tail(path) if matches(event, chat_id, user_id))
+    events.sort(key=lambda event: event.get("ts", 0), reverse=True)
+    return events[:limit]
+
+
+# 🔹 Append-only moderation journal (JSON Lines)
+# record() loop pe sirf queue me daalta hai; writer thread batch me likhta hai.
+# fsync: "always" har batch, "interval" har `fsync_interval` seconds, "never" OS pe chhodo.
+# Snapshot (`<file>.snapshot`) = ab tak ka folded state + kis seq/offset tak. Restart pe
+# sirf uske baad ke events replay hote hai.
+class ModerationJournal:
+    def __init__(self, path="moderation.jsonl", fsync="interval", fsync_interval=1.0,
+                 recent_size=100, max_recent_keys=20000):
+        if fsync not in FSYNC_POLICIES:
+            raise ValueError(f"Unknown journal fsync policy: {fsync}")
+        self.path = path
+        self.snapshot_path = f"{path}.snapshot"
+        self.fsync = fsync
+        self.fsync_interval = fsync_interval
+        self.recent_size = recent_size
+        self.max_recent_keys = max_recent_keys
+        self.recent_index = OrderedDict()  # ("chat", id) / ("user", id) -> deque
+        self.pending = []
+        self.cond = threading.Condition()
+        self.thread = None
+        self.running = False
+        self.seq = 0           # aakhri assign hua seq
+        self.written_seq = 0   # disk pe likha aakhri seq
+        self.opened_seq = 0    # open() ke waqt file me aakhri seq (isse pehle ke events index me nahi)
+        self.written = 0
+        self.batches = 0
+        self.errors = 0
+        self.last_fsync = 0.0
+        self.checkpoint = {"seq": 0, "offset": 0, "state": _empty_state()}
+
+    # Snapshot + aakhri event padho, seq aage badhao, writer chalu karo
+    def open(self):
+        snapshot = None
+        try:
+            with open(self.snapshot_path, "r", encoding="utf-8") as file:
+                snapshot = json.load(file)
+        except FileNotFoundError:
+            pass
+        except ValueError as e:
+            logger.error(f"Journal snapshot unreadable, replaying the whole journal: {e}")
+        if isinstance(snapshot, dict) and "seq" in snapshot:
+            self.checkpoint = snapshot
+
+        # Recent index khali shuru hota hai; purane events /modlog file se padhta hai (history)
+        last = last_event(self.path)
+        self.seq = self.written_seq = self.opened_seq = max(self.checkpoint["seq"], last["seq"] if last else 0)
+
+        # Crash me aakhri line adhuri reh gayi ho to nayi line se shuru karo
+        if os.path.exists(self.path) and os.path.getsize(self.path):
+            with open(self.path, "rb+") as file:
+                file.seek(-1, os.SEEK_END)
+                if file.read(1) != b"\n":
+                    file.write(b"\n")
+
+        self.running = True
+        self.thread = threading.Thread(target=self._run, name="journal", daemon=True)
+        self.thread.start()
+        return self
+
+    @property
+    def depth(self):
+        return len(self.pending)
+
+    # Loop pe chalta hai: seq/time lagao, recent index me daalo, writer ko do
+    def record(self, action, chat_id=None, user_id=None, actor=None, **detail):
+        self.seq += 1
+        event = {"seq": self.seq, "ts": round(time.time(), 3), "action": action}
+        if chat_id is not None:
+            event["chat"] = str(chat_id)
+        if user_id is not None:
+            event["user"] = user_id
+        if actor is not None:
+            event["by"] = actor
+        event.update(detail)
+        self._remember(event)
+        line = json.dumps(event, ensure_ascii=False, separators=(",", ":")) + "\n"
+        with self.cond:
+            self.pending.append((event["seq"], line))
+            self.cond.notify_all()
+        return event
+
+    def _remember(self, event):
+        keys = []
+        if "chat" in event:
+            keys.append(("chat", event["chat"]))
+        for field in ("user", "by"):
+            if field in event:
+                keys.append(("user", event[field]))
+        for key in keys:
+            events = self.recent_index.get(key)
+            if events is None:
+                events = self.recent_index[key] = deque(maxlen=self.recent_size)
+                if len(self.recent_index) > self.max_recent_keys:
+                    self.recent_index.popitem(last=False)
+            else:
+                self.recent_index.move_to_end(key)
+            if not events or events[-1] is not event:
+                events.append(event)
+
+    # `since` (unix time) ke baad ke events, file order me - recent index se zyada peeche
+    # tak jaata hai (bulk commands). Thread se call karo.
+    def search(self, chat_id=None, user_id=None, since=0, tail_bytes=SEARCH_TAIL_BYTES):
+        self.wait_written(timeout=5)
+        return [event for event in read_tail(self.path, tail_bytes)
+                if event.get("ts", 0) >= since and matches(event, chat_id, user_id)]
+
+    # recent() jaisa, lekin file se (restart se pehle ke events bhi). Thread se call karo.
+    def history(self, chat_id=None, user_id=None, limit=20):
+        self.wait_written(timeout=5)
+        return scan_recent([self.path], chat_id, user_id, limit)
+
+    # Naye pehle; chat aur/ya user se filter
+    def recent(self, chat_id=None, user_id=None, limit=20):
+        if chat_id is not None:
+            events = self.recent_index.get(("chat", str(chat_id)), ())
+        elif user_id is not None:
+            events = self.recent_index.get(("user", user_id), ())
+        else:
+            return []
+        found = [event for event in reversed(events) if matches(event, chat_id, user_id)]
+        return found[:limit]
+
+    def _run(self):
+        dirty = False  # likha hai par fsync nahi hua
+        with open(self.path, "a", encoding="utf-8") as file:
+            while True:
+                with self.cond:
+                    if self.running and not self.pending:
+                        timeout = None
+                        if dirty and self.fsync == "interval":
+                            timeout = max(0.0, self.last_fsync + self.fsync_interval - time.monotonic())
+                        self.cond.wait(timeout)
+                    batch, self.pending = self.pending, []
+                    stopping = not self.running
+                try:
+                    if batch:
+                        # Poora batch ek hi write me
+                        file.write("".join(line for _, line in batch))
+                        file.flush()
+                        dirty = True
+                    if dirty and self._should_sync(stopping):
+                        os.fsync(file.fileno())
+                        self.last_fsync = time.monotonic()
+                        dirty = False
+                except OSError as e:
+                    self.errors += 1
+                    logger.error(f"Journal write failed: {e}")
+                with self.cond:
+                    if batch:
+                        self.written_seq = batch[-1][0]
+                        self.written += len(batch)
+                        self.batches += 1
+                    self.cond.notify_all()
+                    if stopping and not self.pending:
+                        return
+
+    # Band hote waqt policy kuch bhi ho, fsync hota hai
+    def _should_sync(self, stopping):
+        if stopping or self.fsync == "always":
+            return True
+        if self.fsync == "interval":
+            return time.monotonic() - self.last_fsync >= self.fsync_interval
+        return False
+
+    # Jab tak `seq` tak ke events disk pe na ho, ruko (thread se call karo)
+    def wait_written(self, seq=None, timeout=None) -> bool:
+        target = self.seq if seq is None else seq
+        with self.cond:
+            return self.cond.wait_for(lambda: self.written_seq >= target, timeout)
+
+    # Checkpoint ke baad ke events (file order me) + har event ke baad ka byte offset
+    def _events_after_checkpoint(self):
+        try:
+            file = open(self.path, "rb")
+        except FileNotFoundError:
+            return
+        with file:
+            offset = self.checkpoint.get("offset", 0)
+            if offset > os.fstat(file.fileno()).st_size:
+                offset = 0  # journal kisi ne chhota kar diya - shuru se
+            file.seek(offset)
+            for line in file:
+                offset += len(line)
+                event = _parse(line)
+                if event is not None and event["seq"] > self.checkpoint["seq"]:
+                    yield event, offset
+
+    # Jo events snapshot me nahi hai (crash ke baad storage me shayad nahi pahunche)
+    def unsnapshotted(self):
+        return [event for event, _ in self._events_after_checkpoint()]
+
+    # Snapshot likho: `upto` seq tak ke events fold karo. Caller pakka kare ki unki
+    # storage writes ho chuki hai (bot PersistenceWorker drain karke bulata hai).
+    def snapshot(self, upto=None):
+        upto = self.seq if upto is None else upto
+        self.wait_written(upto)
+        state = json.loads(json.dumps(self.checkpoint["state"]))
+        seq, offset = self.checkpoint["seq"], self.checkpoint.get("offset", 0)
+        for event, end in self._events_after_checkpoint():
+            if event["seq"] > upto:
+                break
+            apply_event(state, event)
+            seq, offset = event["seq"], end
+        if seq == self.checkpoint["seq"]:
+            return False
+        snapshot = {"seq": seq, "offset": offset, "time": time.time(), "state": state}
+        atomic_write_json(self.snapshot_path, snapshot)
+        self.checkpoint = snapshot
+        return True
+
+    def stats(self):
+        return {"written": self.written, "batches": self.batches, "pending": self.depth,
+                "errors": self.errors, "checkpoint": self.checkpoint["seq"], "seq": self.seq}
+
+    # Pending events likho, fsync karo, thread band
+    def close(self, timeout=30):
+        if self.thread is None:
+            return
+        with self.cond:
+            self.running = False
+            self.cond.notify_all()
+        self.thread.join(timeout)
+        self.thread = None
+
+
+# python journal.py state [moderation.jsonl]  - snapshot + replay se bana state
+# python journal.py tail [moderation.jsonl] [chat_id|user_id]  - recent events
+if __name__ == "__main__":
+    if len(sys.argv) < 2 or sys.argv[1] not in ("state", "tail"):
+        print("Usage: python journal.py state|tail [journal_file] [chat_id|user_id]")
+        sys.exit(1)
+    path = sys.argv[2] if len(sys.argv) > 2 else "moderation.jsonl"
+    if sys.argv[1] == "state":
+        journal = ModerationJournal(path)
+        try:
+            with open(journal.snapshot_path, "r", encoding="utf-8") as file:
+                journal.checkpoint = json.load(file)
+        except FileNotFoundError:
+            pass
+        state = journal.checkpoint["state"]
+        for event in journal.unsnapshotted():
+            apply_event(state, event)
+        print(json.dumps(state, indent=2, ensure_ascii=False))
+    else:
+        target = int(sys.argv[3]) if len(sys.argv) > 3 else None
+        chat_id = target if target is not None and target < 0 else None
+        user_id = target if target is not None and target > 0 else None
+        for event in reversed(scan_recent(glob.glob(path), chat_id, user_id, limit=50)):
+            print(json.dumps(event, ensure_ascii=False))
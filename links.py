@@ -0,0 +1,122 @@
+import re
+
+# Telegram ke parse kiye hue link entities
+URL_ENTITY_TYPES = ("url", "text_link")
+
+# Scheme ke bina likhe domains sirf in TLDs pe link maane jaate hai
+# ("file.txt" / "v1.2" jaise text link na bane)
+COMMON_TLDS = frozenset("""
+    com net org info biz io me co ru in us uk de fr it es nl pl br cn jp kr tr ua kz
+    by ir pk bd id vn th ph my sg au ca mx ar cl eu xyz top site online app dev ly gg
+    tv cc ws su to link click live store shop club fun icu pro vip win bet cam рф
+""".split())
+
+# Fallback scanner (entities na ho tab): scheme optional, host capture hota hai
+URL_SCANNER = re.compile(
+    r"(?<![\w@.-])((?:https?|ftp)://)?"
+    r"((?:[^\W_](?:[\w-]{0,61}[^\W_])?\.)+[^\W\d_]{2,63})"
+    r"(?=$|[\s/?#:,;!)\]'\"<>]|\.(?:\s|$))",
+    re.IGNORECASE,
+)
+# Entity ke URL text se host nikaalo
+URL_HOST = re.compile(r"^(?:[a-z][a-z0-9+.-]*://)?(?:[^\s/@]*@)?([^\s/?#:]+)", re.IGNORECASE)
+
+END = ""
+
+
+# Host ko comparable form me lao: lowercase, "www." aur aakhri dot hatao
+def normalize_host(host):
+    host = host.strip().lower().rstrip(".")
+    if host.startswith("www."):
+        host = host[4:]
+    return host or None
+
+
+def host_from_url(url):
+    match = URL_HOST.match(url.strip())
+    return normalize_host(match.group(1)) if match else None
+
+
+# 🔹 Domains ka suffix trie (labels ulte order me: "t.me" -> me -> t)
+# "example.com" list me ho to "cdn.example.com" bhi match hota hai.
+class DomainTrie:
+    def __init__(self, domains=()):
+        self.root = {}
+        self.size = 0
+        for domain in domains:
+            self.add(domain)
+
+    def __len__(self):
+        return self.size
+
+    def add(self, domain):
+        node = self.root
+        for label in reversed(domain.split(".")):
+            node = node.setdefault(label, {})
+        if END not in node:
+            node[END] = True
+            self.size += 1
+
+    def remove(self, domain):
+        path = [self.root]
+        labels = list(reversed(domain.split(".")))
+        for label in labels:
+            node = path[-1].get(label)
+            if node is None:
+                return
+            path.append(node)
+        if path[-1].pop(END, None) is None:
+            return
+        self.size -= 1
+        # Khaali nodes hata do
+        for depth in range(len(labels), 0, -1):
+            if path[depth]:
+                break
+            del path[depth - 1][labels[depth - 1]]
+
+    # Host khud ya uska koi parent domain trie me hai?
+    def __contains__(self, host):
+        node = self.root
+        for label in reversed(host.split(".")):
+            node = node.get(label)
+            if node is None:
+                return False
+            if END in node:
+                return True
+        return False
+
+
+# 🔹 Message ke saare hosts (lazy - pehla blocked host milte hi scan ruk jaata hai)
+# entity_urls: Telegram ke url/text_link entities ka text/URL. Entities na ho to
+# compiled scanner text pe chalta hai.
+def extract_hosts(text, entity_urls=()):
+    found = False
+    for url in entity_urls:
+        host = host_from_url(url)
+        if host:
+            found = True
+            yield host
+    if found or not text or "." not in text:
+        return
+    for match in URL_SCANNER.finditer(text):
+        scheme, host = match.group(1), match.group(2)
+        if scheme or host.rsplit(".", 1)[-1].lower() in COMMON_TLDS:
+            host = normalize_host(host)
+            if host:
+                yield host
+
+
+# 🔹 Ek chat ki allow/deny lists
+# Deny list hamesha lagti hai; block_links on ho to allow list ke bahar sab blocked.
+class LinkFilter:
+    def __init__(self, allowed=(), denied=()):
+        self.allowed = DomainTrie(allowed)
+        self.denied = DomainTrie(denied)
+
+    def blocked_host(self, hosts, block_links):
+        for host in hosts:
+            if host in self.denied:
+                return host
+            if block_links and host not in self.allowed:
+                return host
+        return None
@@ -0,0 +1,110 @@
+# 🔹 Aho–Corasick matcher for banned words
+# Poori banned list ek automaton me compile hoti hai, phir har message ek hi
+# linear pass me scan hota hai - list kitni bhi badi ho.
+
+
+class BannedWordMatcher:
+    def __init__(self, patterns=()):
+        self._clear()
+        for pattern in patterns:
+            self.add(pattern)
+
+    def _clear(self):
+        # Node 0 root hai. goto[i] = {char: next_node}
+        self.goto = [{}]
+        self.fail = [0]
+        self.output = [None]   # Is node pe khatam hone wala pattern
+        self.dict_link = [0]   # Nearest suffix node jispe koi pattern khatam hota hai
+        self.patterns = set()
+        self.dead_nodes = 0
+        self.dirty = False
+
+    def __len__(self):
+        return len(self.patterns)
+
+    def __contains__(self, pattern):
+        return pattern in self.patterns
+
+    # Trie me naya pattern daalo; failure links agle search pe rebuild honge
+    def add(self, pattern):
+        if not pattern or pattern in self.patterns:
+            return
+        node = 0
+        for char in pattern:
+            nxt = self.goto[node].get(char)
+            if nxt is None:
+                nxt = len(self.goto)
+                self.goto.append({})
+                self.fail.append(0)
+                self.output.append(None)
+                self.dict_link.append(0)
+                self.goto[node][char] = nxt
+            node = nxt
+        self.output[node] = pattern
+        self.patterns.add(pattern)
+        self.dirty = True
+
+    # Pattern ka output hata do; zyada dead nodes ho jaye to trie compact karo
+    def remove(self, pattern):
+        if pattern not in self.patterns:
+            return
+        node = 0
+        for char in pattern:
+            node = self.goto[node][char]
+        self.output[node] = None
+        self.patterns.discard(pattern)
+        self.dead_nodes += len(pattern)
+        if self.dead_nodes > len(self.goto) // 2:
+            patterns = self.patterns
+            self._clear()
+            for pattern in patterns:
+                self.add(pattern)
+        else:
+            self.dirty = True
+
+    def reset(self, patterns):
+        self._clear()
+        for pattern in patterns:
+            self.add(pattern)
+
+    # BFS se failure aur dictionary links banao
+    def _build_links(self):
+        goto, fail, output, dict_link = self.goto, self.fail, self.output, self.dict_link
+        queue = []
+        for child in goto[0].values():
+            fail[child] = 0
+            dict_link[child] = 0
+            queue.append(child)
+
+        i = 0
+        while i < len(queue):
+            node = queue[i]
+            i += 1
+            for char, child in goto[node].items():
+                state = fail[node]
+                while state and char not in goto[state]:
+                    state = fail[state]
+                target = goto[state].get(char, 0)
+                fail[child] = target if target != child else 0
+                dict_link[child] = fail[child] if output[fail[child]] is not None else dict_link[fail[child]]
+                queue.append(child)
+        self.dirty = False
+
+    # Text me pehla banned pattern dhundo (ek hi pass), warna None
+    def search(self, text):
+        if not self.patterns:
+            return None
+        if self.dirty:
+            self._build_links()
+
+        goto, fail, output, dict_link = self.goto, self.fail, self.output, self.dict_link
+        state = 0
+        for char in text:
+            while state and char not in goto[state]:
+                state = fail[state]
+            state = goto[state].get(char, 0)
+            if output[state] is not None:
+                return output[state]
+            if dict_link[state]:
+                return output[dict_link[state]]
+        return None
@@ -0,0 +1,139 @@
+import logging
+import time
+from array import array
+from bisect import bisect_left
+from collections import deque
+from heapq import merge
+
+logger = logging.getLogger(__name__)
+
+# Itne naye ids set me jama ho to sorted array me merge karo
+MERGE_THRESHOLD = 1024
+
+
+def _sorted_contains(ids, user_id) -> bool:
+    i = bisect_left(ids, user_id)
+    return i < len(ids) and ids[i] == user_id
+
+
+# 🔹 Ek chat ke member ids: sorted array("q") (8 bytes per member) + naye ids ka chhota set
+# Naam/username memory me nahi rehte - sirf "pehle save hua ya nahi" ka jawab chahiye.
+class ChatMembers:
+    __slots__ = ("ids", "added")
+
+    def __init__(self, ids=None):
+        self.ids = ids      # None = storage ka index abhi ready nahi
+        self.added = set()
+
+    def __contains__(self, user_id):
+        if user_id in self.added:
+            return True
+        return self.ids is not None and _sorted_contains(self.ids, user_id)
+
+    def __len__(self):
+        return len(self.ids or ()) + len(self.added)
+
+    # Storage index ab aaya: jo ids usme pehle se hai unhe set se hatao
+    # (naye sorted ids me dekho - `in self` pehle `added` hi dekhta, sab hat jaate)
+    def attach(self, ids):
+        self.added = {user_id for user_id in self.added if not _sorted_contains(ids, user_id)}
+        self.ids = ids
+        self.merge()
+
+    def merge(self, threshold=0):
+        if self.ids is None or len(self.added) <= threshold:
+            return
+        self.ids = array("q", merge(self.ids, sorted(self.added)))
+        self.added = set()
+
+
+# 🔹 Resident member index: chat_id -> ChatMembers
+# Startup pe kuch load nahi hota; har chat ke ids pehli zarurat pe storage se aate hai.
+# Storage sirf flush() pe likha jaata hai, har message pe nahi.
+# Recent joins (bulk commands ke liye) sirf memory me, `join_window` seconds tak.
+class MemberIndex:
+    def __init__(self, storage, flush_interval=30, flush_threshold=200, join_window=3600, max_joins=5000):
+        self.storage = storage
+        self.flush_interval = flush_interval
+        self.flush_threshold = flush_threshold
+        self.join_window = join_window
+        self.max_joins = max_joins
+        self.chats = {}
+        self.joins = {}  # chat_id -> deque((join_time, user_id))
+        self.new_rows = []
+        self.last_flush = time.monotonic()
+
+    @property
+    def pending(self):
+        return len(self.new_rows)
+
+    def _chat(self, chat_id):
+        chat = self.chats.get(chat_id)
+        if chat is None:
+            chat = self.chats[chat_id] = ChatMembers(self.storage.member_ids(chat_id))
+        elif chat.ids is None:
+            ids = self.storage.member_ids(chat_id)
+            if ids is not None:
+                chat.attach(ids)
+        return chat
+
+    def contains(self, chat_id, user_id) -> bool:
+        return user_id in self._chat(str(chat_id))
+
+    # Naya member add karo, True return hota hai agar pehle se nahi tha
+    # (storage index ready hone se pehle duplicate likh sakta hai - compaction hata deta hai)
+    def add(self, chat_id, user_id, name, username=None, mobile=None) -> bool:
+        chat_id = str(chat_id)
+        chat = self._chat(chat_id)
+        if user_id in chat:
+            return False
+        chat.added.add(user_id)
+        chat.merge(MERGE_THRESHOLD)
+        self.new_rows.append((chat_id, user_id, name, username, mobile))
+        return True
+
+    def joined(self, chat_id, user_id, now=None):
+        now = time.time() if now is None else now
+        joins = self.joins.get(str(chat_id))
+        if joins is None:
+            joins = self.joins[str(chat_id)] = deque(maxlen=self.max_joins)
+        joins.append((now, user_id))
+        self._expire(joins, now)
+
+    # `since` (unix time) ke baad join hue users, join ke order me
+    def joined_since(self, chat_id, since):
+        joins = self.joins.get(str(chat_id), ())
+        return list(dict.fromkeys(user_id for joined_at, user_id in joins if joined_at >= since))
+
+    def _expire(self, joins, now):
+        while joins and joins[0][0] < now - self.join_window:
+            joins.popleft()
+
+    # Purani joins hatao (flush job se)
+    def expire_joins(self, now=None):
+        now = time.time() if now is None else now
+        for chat_id in list(self.joins):
+            self._expire(self.joins[chat_id], now)
+            if not self.joins[chat_id]:
+                del self.joins[chat_id]
+
+    def should_flush(self) -> bool:
+        if not self.pending:
+            return False
+        if self.pending >= self.flush_threshold:
+            return True
+        return time.monotonic() - self.last_flush >= self.flush_interval
+
+    # Pending members ko ek saath storage me likho
+    def flush(self) -> int:
+        if not self.new_rows:
+            return 0
+        rows, self.new_rows = self.new_rows, []
+        self.storage.add_members(rows)
+        self.last_flush = time.monotonic()
+        logger.info(f"Members flushed: {len(rows)} new")
+        return len(rows)
+
+    # Sirf jo chats abhi memory me hai unke members
+    def __len__(self):
+        return sum(len(chat) for chat in self.chats.values())
@@ -0,0 +1,282 @@
+import os
+import time
+import asyncio
+import logging
+import tempfile
+import threading
+from functools import wraps
+
+logger = logging.getLogger(__name__)
+
+# Latency buckets (seconds) - handler aur Bot API dono ke liye kaafi
+DEFAULT_BUCKETS = (0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+
+def _format_labels(names, values, extra=()):
+    pairs = [f'{name}="{_escape(value)}"' for name, value in zip(names, values)]
+    pairs.extend(f'{name}="{value}"' for name, value in extra)
+    return "{" + ",".join(pairs) + "}" if pairs else ""
+
+
+def _escape(value) -> str:
+    return str(value).replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _format_value(value) -> str:
+    if value == float("inf"):
+        return "+Inf"
+    if isinstance(value, float) and value.is_integer():
+        return str(int(value))
+    return repr(value) if isinstance(value, float) else str(value)
+
+
+class _CounterChild:
+    __slots__ = ("value", "lock")
+
+    def __init__(self):
+        self.value = 0
+        self.lock = threading.Lock()
+
+    def inc(self, amount=1):
+        with self.lock:
+            self.value += amount
+
+
+class _HistogramChild:
+    __slots__ = ("buckets", "counts", "sum", "count", "lock")
+
+    def __init__(self, buckets):
+        self.buckets = buckets
+        self.counts = [0] * len(buckets)
+        self.sum = 0.0
+        self.count = 0
+        self.lock = threading.Lock()
+
+    def observe(self, value):
+        with self.lock:
+            self.sum += value
+            self.count += 1
+            for i, bound in enumerate(self.buckets):
+                if value <= bound:
+                    self.counts[i] += 1
+                    break
+
+
+# 🔹 Counter / Histogram - label values ke hisaab se alag child
+class Metric:
+    kind = "untyped"
+
+    def __init__(self, name, documentation, labelnames=()):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self.children = {}
+        self.lock = threading.Lock()
+
+    def labels(self, *values):
+        child = self.children.get(values)
+        if child is None:
+            with self.lock:
+                child = self.children.setdefault(values, self._new_child())
+        return child
+
+    def _new_child(self):
+        raise NotImplementedError
+
+    def render(self):
+        yield f"# HELP {self.name} {self.documentation}"
+        yield f"# TYPE {self.name} {self.kind}"
+        for values, child in list(self.children.items()):
+            yield from self._render_child(values, child)
+
+
+class Counter(Metric):
+    kind = "counter"
+
+    def _new_child(self):
+        return _CounterChild()
+
+    def inc(self, amount=1):
+        self.labels().inc(amount)
+
+    def _render_child(self, values, child):
+        yield f"{self.name}{_format_labels(self.labelnames, values)} {_format_value(child.value)}"
+
+
+class Histogram(Metric):
+    kind = "histogram"
+
+    def __init__(self, name, documentation, labelnames=(), buckets=DEFAULT_BUCKETS):
+        super().__init__(name, documentation, labelnames)
+        self.buckets = tuple(sorted(buckets))
+
+    def _new_child(self):
+        return _HistogramChild(self.buckets)
+
+    def observe(self, value):
+        self.labels().observe(value)
+
+    def _render_child(self, values, child):
+        with child.lock:
+            counts, total, count = list(child.counts), child.sum, child.count
+        cumulative = 0
+        for bound, bucket_count in zip(self.buckets, counts):
+            cumulative += bucket_count
+            labels = _format_labels(self.labelnames, values, [("le", _format_value(float(bound)))])
+            yield f"{self.name}_bucket{labels} {cumulative}"
+        labels = _format_labels(self.labelnames, values, [("le", "+Inf")])
+        yield f"{self.name}_bucket{labels} {count}"
+        labels = _format_labels(self.labelnames, values)
+        yield f"{self.name}_sum{labels} {_format_value(total)}"
+        yield f"{self.name}_count{labels} {count}"
+
+
+# Gauge ki jagah: scrape ke waqt function call karke value lo (queue depth waghera)
+class GaugeCallback(Metric):
+    kind = "gauge"
+
+    def __init__(self, name, documentation, fn):
+        super().__init__(name, documentation)
+        self.fn = fn
+
+    def render(self):
+        yield f"# HELP {self.name} {self.documentation}"
+        yield f"# TYPE {self.name} {self.kind}"
+        try:
+            yield f"{self.name} {_format_value(self.fn())}"
+        except Exception as e:
+            logger.error(f"Gauge {self.name} failed: {e}")
+
+
+# 🔹 Metrics registry
+# Disabled ho to koi wrapper/observer lagta hi nahi - hot path pe zero kaam.
+class Metrics:
+    def __init__(self, enabled=False, prefix="bot"):
+        self.enabled = enabled
+        self.prefix = prefix
+        self.metrics = []
+
+        self.updates = self.counter("updates_total", "Updates received", ("type",))
+        self.handler_calls = self.counter("handler_calls_total", "Handler invocations", ("handler",))
+        self.handler_errors = self.counter("handler_errors_total", "Handlers that raised", ("handler",))
+        self.handler_latency = self.histogram("handler_seconds", "Handler latency", ("handler",))
+        self.bot_calls = self.counter("api_calls_total", "Outbound Bot API calls by outcome", ("priority", "outcome"))
+        self.bot_latency = self.histogram("api_seconds", "Outbound Bot API call latency", ("priority",))
+        self.writes = self.counter("storage_writes_total", "Storage writes by outcome", ("op", "outcome"))
+        self.write_latency = self.histogram("storage_write_seconds", "Storage write time", ("op",))
+
+    def counter(self, name, documentation, labelnames=()):
+        metric = Counter(f"{self.prefix}_{name}", documentation, labelnames)
+        self.metrics.append(metric)
+        return metric
+
+    def histogram(self, name, documentation, labelnames=(), buckets=DEFAULT_BUCKETS):
+        metric = Histogram(f"{self.prefix}_{name}", documentation, labelnames, buckets)
+        self.metrics.append(metric)
+        return metric
+
+    def gauge(self, name, documentation, fn):
+        metric = GaugeCallback(f"{self.prefix}_{name}", documentation, fn)
+        self.metrics.append(metric)
+        return metric
+
+    # Prometheus text exposition format
+    def render(self) -> str:
+        lines = []
+        for metric in self.metrics:
+            lines.extend(metric.render())
+        return "\n".join(lines) + "\n"
+
+    # File me likho (temp file + rename, node_exporter textfile collector ke liye bhi theek)
+    def dump(self, path):
+        directory = os.path.dirname(os.path.abspath(path))
+        fd, tmp_path = tempfile.mkstemp(prefix=".tmp-", suffix=".prom", dir=directory)
+        try:
+            with os.fdopen(fd, "w", encoding="utf-8") as file:
+                file.write(self.render())
+            os.replace(tmp_path, path)
+        except BaseException:
+            try:
+                os.unlink(tmp_path)
+            except FileNotFoundError:
+                pass
+            raise
+
+    # Handler callback ko calls/errors/latency ke saath wrap karo
+    def wrap_handler(self, callback, name):
+        calls = self.handler_calls.labels(name)
+        errors = self.handler_errors.labels(name)
+        latency = self.handler_latency.labels(name)
+
+        @wraps(callback)
+        async def wrapper(update, context):
+            calls.inc()
+            started = time.perf_counter()
+            try:
+                return await callback(update, context)
+            except BaseException:
+                errors.inc()
+                raise
+            finally:
+                latency.observe(time.perf_counter() - started)
+
+        return wrapper
+
+    # OutboundScheduler.observer
+    def observe_bot_call(self, priority, seconds, outcome):
+        self.bot_calls.labels(priority, outcome).inc()
+        self.bot_latency.labels(priority).observe(seconds)
+
+    # PersistenceWorker.observer
+    def observe_write(self, fn, seconds, failed):
+        op = getattr(fn, "__name__", "write").lstrip("_")
+        self.writes.labels(op, "error" if failed else "ok").inc()
+        self.write_latency.labels(op).observe(seconds)
+
+
+# 🔹 Local /metrics endpoint (sirf GET, Prometheus scrape ke liye)
+class MetricsServer:
+    def __init__(self, metrics, host="127.0.0.1", port=9090, path="/metrics"):
+        self.metrics = metrics
+        self.host = host
+        self.port = port
+        self.path = path
+        self.server = None
+
+    async def start(self):
+        self.server = await asyncio.start_server(self._handle, self.host, self.port)
+        sockets = self.server.sockets or ()
+        if sockets:
+            self.port = sockets[0].getsockname()[1]
+        logger.info(f"Metrics on http://{self.host}:{self.port}{self.path}")
+
+    async def stop(self):
+        if self.server is None:
+            return
+        self.server.close()
+        await self.server.wait_closed()
+        self.server = None
+
+    async def _handle(self, reader, writer):
+        try:
+            request_line = await reader.readline()
+            while (await reader.readline()) not in (b"\r\n", b"\n", b""):
+                pass
+            parts = request_line.decode("latin-1").split()
+            if len(parts) < 2 or parts[1].split("?", 1)[0] != self.path:
+                status, body = "404 Not Found", b""
+            elif parts[0] != "GET":
+                status, body = "405 Method Not Allowed", b""
+            else:
+                status, body = "200 OK", self.metrics.render().encode()
+            writer.write(
+                f"HTTP/1.1 {status}\r\n"
+                f"Content-Type: text/plain; version=0.0.4; charset=utf-8\r\n"
+                f"Content-Length: {len(body)}\r\n"
+                f"Connection: close\r\n\r\n".encode("latin-1") + body
+            )
+            await writer.drain()
+        except ConnectionError:
+            pass
+        finally:
+            writer.close()
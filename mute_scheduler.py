@@ -0,0 +1,49 @@
+import heapq
+
+
+# 🔹 Min-heap of mute deadlines: (unmute_time, (chat_id, user_id))
+# Schedule/cancel O(log n); cancel lazy hai - heap ki purani entry tab tak
+# padi rehti hai jab tak woh top pe na aa jaye.
+class MuteScheduler:
+    def __init__(self):
+        self.heap = []
+        self.deadlines = {}
+
+    def __len__(self):
+        return len(self.deadlines)
+
+    def __contains__(self, key):
+        return key in self.deadlines
+
+    def schedule(self, chat_id, user_id, until):
+        key = (str(chat_id), str(user_id))
+        self.deadlines[key] = until
+        heapq.heappush(self.heap, (until, key))
+        # Bahut saari stale entries ho gayi to heap dobara banao
+        if len(self.heap) > 2 * len(self.deadlines) + 64:
+            self.heap = [(until, key) for key, until in self.deadlines.items()]
+            heapq.heapify(self.heap)
+
+    def cancel(self, chat_id, user_id):
+        self.deadlines.pop((str(chat_id), str(user_id)), None)
+
+    # Stale (cancel/reschedule ho chuki) entries top se hatao
+    def _prune(self):
+        heap, deadlines = self.heap, self.deadlines
+        while heap and deadlines.get(heap[0][1]) != heap[0][0]:
+            heapq.heappop(heap)
+
+    def next_deadline(self):
+        self._prune()
+        return self.heap[0][0] if self.heap else None
+
+    # Jinka time ho gaya unhe nikalo: [(chat_id, user_id), ...]
+    def pop_due(self, now):
+        due = []
+        while True:
+            self._prune()
+            if not self.heap or self.heap[0][0] > now:
+                return due
+            _, key = heapq.heappop(self.heap)
+            del self.deadlines[key]
+            due.append(key)
@@ -0,0 +1,98 @@
+import re
+import unicodedata
+from functools import lru_cache
+
+# Raw text -> normalized text ka LRU (spam ki copies dobara normalize nahi hoti)
+DEFAULT_CACHE_SIZE = 4096
+
+# Zero-width / invisible characters jo shabdon ke beech chhupaye jaate hai
+INVISIBLE = dict.fromkeys(map(ord, (
+    "\u00ad"   # soft hyphen
+    "\u034f"   # combining grapheme joiner
+    "\u180e"   # mongolian vowel separator
+    "\u200b\u200c\u200d\u200e\u200f"
+    "\u2060\u2061\u2062\u2063\u2064"
+    "\ufeff"
+)), None)
+
+# Homoglyphs (Cyrillic/Greek) -> Latin
+CONFUSABLES = str.maketrans({
+    # Cyrillic
+    "а": "a", "в": "b", "е": "e", "ё": "e", "к": "k", "м": "m", "н": "h", "о": "o",
+    "р": "p", "с": "c", "т": "t", "у": "y", "х": "x", "ѕ": "s", "і": "i", "ї": "i",
+    "ј": "j", "ԁ": "d", "ԛ": "q", "ԝ": "w", "ү": "y", "һ": "h",
+    # Greek
+    "α": "a", "β": "b", "ε": "e", "η": "n", "ι": "i", "κ": "k", "ν": "v", "ο": "o",
+    "ρ": "p", "τ": "t", "υ": "u", "χ": "x", "ω": "w",
+})
+
+# Leetspeak -> letters, sirf jab letters ke beech ho ("sp4m", "h3ll0" nahi - "5555", "!!!" literal rehte hai)
+LEET = str.maketrans({
+    "0": "o", "1": "i", "3": "e", "4": "a", "5": "s", "7": "t", "8": "b",
+    "@": "a", "$": "s", "!": "i", "|": "l",
+})
+LEET_RUN = re.compile(r"(?<=[^\W\d_])[0134578@$!|]+(?=[^\W\d_])")
+
+# "s p a m" / "s.p.a.m" - teen ya zyada akele characters separator ke saath
+SPACED_OUT = re.compile(r"(?<![^\W_])(?:[^\W_][\s.\-_*]+){2,}[^\W_](?![^\W_])")
+SEPARATORS = re.compile(r"[\s.\-_*]+")
+WHITESPACE = re.compile(r"\s+")
+# "spaaaam" -> "spam" (banned entries bhi isi tarah collapse hote hai)
+REPEATS = re.compile(r"(.)\1+", re.S)
+
+
+# Isse chhota normalized banned pattern bharosemand nahi ("ass" -> "as" har "was" me milta)
+MIN_PATTERN_LENGTH = 3
+
+
+def _join_spaced(match):
+    return SEPARATORS.sub("", match.group())
+
+
+def _unleet(match):
+    return match.group().translate(LEET)
+
+
+# NFKC -> zero-width strip -> accents hatao -> casefold -> confusables fold
+# -> spaced-out letters jodo -> leet fold (repeats abhi collapse nahi)
+def _fold(text):
+    if not text.isascii():
+        text = unicodedata.normalize("NFKC", text).translate(INVISIBLE)
+        text = "".join(c for c in unicodedata.normalize("NFD", text) if not unicodedata.combining(c))
+    text = WHITESPACE.sub(" ", text.casefold().translate(CONFUSABLES))
+    text = SPACED_OUT.sub(_join_spaced, text)
+    return LEET_RUN.sub(_unleet, text)
+
+
+# Banned entry ka normalized pattern, ya None jab repeat collapse galat messages pakde:
+# bahut chhota ho, ya collapse se letters kho de ("hell" -> "hel" "help" me milta).
+# None wale words folded (collapse ke bina) form me folded message pe match hote hai.
+def banned_pattern(word):
+    folded = _fold(word)
+    pattern = REPEATS.sub(r"\1", folded)
+    if len(pattern) < MIN_PATTERN_LENGTH or pattern != folded:
+        return None
+    return pattern
+
+
+# 🔹 Obfuscation-resistant normalization: fold + repeated chars collapse ("spaaam" -> "spam").
+# Message aur banned word dono isi se guzarte hai, isliye matching ek hi pass me hoti hai.
+# fold() wahi bina collapse ke (doubled letters wale banned words ke liye).
+class TextNormalizer:
+    def __init__(self, cache_size=DEFAULT_CACHE_SIZE):
+        self.fold = lru_cache(maxsize=cache_size)(_fold)
+        self.normalize = lru_cache(maxsize=cache_size)(self._normalize)
+
+    def _normalize(self, text):
+        return REPEATS.sub(r"\1", self.fold(text))
+
+    def __call__(self, text):
+        return self.normalize(text)
+
+    def stats(self):
+        info = self.normalize.cache_info()
+        return {"hits": info.hits, "misses": info.misses, "size": info.currsize}
+
+
+# Shared instance (bot aur chat policies dono yahi use karte hai)
+normalize_text = TextNormalizer()
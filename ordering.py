@@ -0,0 +1,126 @@
+import asyncio
+import logging
+from collections import deque
+
+from telegram import Update
+from telegram.ext import BaseUpdateProcessor
+
+logger = logging.getLogger(__name__)
+
+
+# Ek hi chat ke updates isi key pe line me lagte hai (private/inline: user id)
+def update_chat_key(update):
+    if not isinstance(update, Update):
+        return None
+    chat = update.effective_chat
+    if chat is not None:
+        return chat.id
+    user = update.effective_user
+    return user.id if user is not None else None
+
+
+# 🔹 Per-chat ordered update processing
+# Alag chats ke updates saath chalte hai (max `workers` ek waqt pe); ek chat ke updates
+# hamesha aane ke order me, ek ke baad ek. Jis chat ka update chal raha hai uske agle
+# updates worker slot nahi rokte - woh apni chat ki line me wait karte hai, taaki ek
+# slow group baaki groups ko na roke.
+class ChatOrderedProcessor(BaseUpdateProcessor):
+    def __init__(self, workers, max_pending=1000):
+        # Base class ka semaphore sirf upar ki had hai; asli backpressure BoundedUpdateQueue me
+        super().__init__(max(workers, max_pending))
+        self.workers = workers
+        self.slots = asyncio.Semaphore(workers)
+        self.chats = {}  # chat key -> deque(wait karne wale futures); key hai = chat busy
+        self.running = 0
+        self.waiting = 0
+        self.processed = 0
+
+    async def initialize(self) -> None:
+        pass
+
+    async def shutdown(self) -> None:
+        pass
+
+    async def do_process_update(self, update, coroutine) -> None:
+        key = update_chat_key(update)
+        try:
+            if key is not None:
+                await self._turn(key)
+        except asyncio.CancelledError:
+            coroutine.close()
+            raise
+        try:
+            async with self.slots:
+                self.running += 1
+                try:
+                    await coroutine
+                finally:
+                    self.running -= 1
+        finally:
+            self.processed += 1
+            if key is not None:
+                self._next(key)
+
+    # Chat free hai to turant; warna pichle update ke khatam hone tak ruko (FIFO)
+    async def _turn(self, key):
+        waiters = self.chats.get(key)
+        if waiters is None:
+            self.chats[key] = deque()
+            return
+        waiter = asyncio.get_running_loop().create_future()
+        waiters.append(waiter)
+        self.waiting += 1
+        try:
+            await waiter
+        except asyncio.CancelledError:
+            # Turn mil chuki thi to agle ko do (cancelled waiter line me skip hota hai)
+            if waiter.done() and not waiter.cancelled():
+                self._next(key)
+            raise
+        finally:
+            self.waiting -= 1
+
+    def _next(self, key):
+        waiters = self.chats[key]
+        while waiters:
+            waiter = waiters.popleft()
+            if not waiter.done():
+                waiter.set_result(None)
+                return
+        del self.chats[key]
+
+    def stats(self):
+        return {"workers": self.workers, "running": self.running, "waiting": self.waiting,
+                "busy_chats": len(self.chats), "processed": self.processed}
+
+
+# 🔹 Backpressure: itne updates (queue me + chal rahe) ho jaye to naye updates ka put() rukta
+# hai. Polling me getUpdates ruk jaata hai, webhook me HTTP response - Telegram apne paas
+# rakhta hai, bot ki memory nahi bharti. Application har update ke baad task_done() bulata hai.
+class BoundedUpdateQueue(asyncio.Queue):
+    def __init__(self, limit=1000):
+        super().__init__()
+        self.limit = limit
+        self.backlog = 0
+        self.throttled = 0
+        self.room = asyncio.Event()
+        self.room.set()
+
+    async def put(self, item):
+        # Stop signal jaisi cheezein kabhi nahi rukti
+        if isinstance(item, Update) and self.backlog >= self.limit:
+            self.throttled += 1
+            while self.backlog >= self.limit:
+                self.room.clear()
+                await self.room.wait()
+        await super().put(item)
+
+    def put_nowait(self, item):
+        super().put_nowait(item)
+        self.backlog += 1
+
+    def task_done(self):
+        super().task_done()
+        self.backlog -= 1
+        if self.backlog < self.limit:
+            self.room.set()
@@ -0,0 +1,262 @@
+import asyncio
+import heapq
+import itertools
+import logging
+import time
+from collections import OrderedDict
+
+from telegram.error import BadRequest, NetworkError, RetryAfter, TimedOut
+
+logger = logging.getLogger(__name__)
+
+# Chhota number = pehle jaata hai
+PRIORITY_MODERATION = 0   # delete / restrict / ban
+PRIORITY_REPLY = 1        # command replies, trigger forwards
+PRIORITY_WELCOME = 2      # group welcome
+PRIORITY_BULK = 3         # private welcome DMs, bulk notices
+
+PRIORITY_NAMES = {
+    PRIORITY_MODERATION: "moderation",
+    PRIORITY_REPLY: "reply",
+    PRIORITY_WELCOME: "welcome",
+    PRIORITY_BULK: "bulk",
+}
+
+
+class TokenBucket:
+    __slots__ = ("rate", "burst", "tokens", "last", "blocked_until")
+
+    def __init__(self, rate, burst):
+        self.rate = rate
+        self.burst = burst
+        self.tokens = burst
+        self.last = time.monotonic()
+        self.blocked_until = 0.0
+
+    # Agle token tak kitna wait (0 = abhi available)
+    def wait_time(self, now) -> float:
+        self.tokens = min(self.burst, self.tokens + (now - self.last) * self.rate)
+        self.last = now
+        if now < self.blocked_until:
+            return self.blocked_until - now
+        if self.tokens >= 1:
+            return 0.0
+        return (1 - self.tokens) / self.rate
+
+    def take(self):
+        self.tokens -= 1
+
+
+class OutboundJob:
+    __slots__ = ("priority", "seq", "chat_id", "call", "future", "attempts")
+
+    def __init__(self, priority, seq, chat_id, call, future):
+        self.priority = priority
+        self.seq = seq
+        self.chat_id = chat_id
+        self.call = call
+        self.future = future
+        self.attempts = 0
+
+
+# 🔹 Outbound Bot API scheduler
+# Saari bheji jaane wali calls priority queue se nikalti hai: moderation pehle,
+# welcomes baad me. Global token bucket (Telegram ~30 msg/s) + per-chat bucket
+# (group me ~20 msg/min). RetryAfter aaye to job (aur us chat ka bucket) utni der
+# ruk kar dobara try hota hai - error swallow nahi hota.
+class OutboundScheduler:
+    def __init__(self, global_rate=25.0, global_burst=25, chat_rate=20 / 60, chat_burst=3,
+                 concurrency=8, max_retries=3, max_chats=10000):
+        self.global_bucket = TokenBucket(global_rate, global_burst)
+        self.chat_rate = chat_rate
+        self.chat_burst = chat_burst
+        self.chat_buckets = OrderedDict()
+        self.max_chats = max_chats
+        self.max_retries = max_retries
+        self.concurrency = asyncio.Semaphore(concurrency)
+        self.queue = []     # (priority, seq, job)
+        self.delayed = []   # (ready_at, seq, job)
+        self.seq = itertools.count()
+        self.wakeup = None
+        self.task = None
+        self.inflight = set()
+        self.sent = 0
+        self.retries = 0
+        self.failures = 0
+        self.rate_limited = 0
+        self.observer = None  # observer(priority_name, seconds, outcome) - metrics ke liye
+
+    def start(self):
+        if self.task is None:
+            self.wakeup = asyncio.Event()
+            self.task = asyncio.get_running_loop().create_task(self._dispatch())
+        return self
+
+    async def stop(self, drain_timeout=10):
+        if self.task is None:
+            return
+        deadline = time.monotonic() + drain_timeout
+        while (self.queue or self.delayed or self.inflight) and time.monotonic() < deadline:
+            await asyncio.sleep(0.05)
+        self.task.cancel()
+        try:
+            await self.task
+        except asyncio.CancelledError:
+            pass
+        self.task = None
+        for _, _, job in self.queue + self.delayed:
+            if not job.future.done():
+                job.future.cancel()
+        self.queue.clear()
+        self.delayed.clear()
+
+    # call: bina argument ka coroutine function, e.g. lambda: bot.send_message(...)
+    # chat_id=None -> sirf global limit lagti hai
+    def submit(self, priority, call, chat_id=None) -> asyncio.Future:
+        if self.task is None:
+            self.start()
+        future = asyncio.get_running_loop().create_future()
+        job = OutboundJob(priority, next(self.seq), chat_id, call, future)
+        heapq.heappush(self.queue, (priority, job.seq, job))
+        self.wakeup.set()
+        return future
+
+    async def call(self, priority, call, chat_id=None):
+        return await self.submit(priority, call, chat_id)
+
+    # Fire-and-forget: result ka wait nahi, error sirf log hota hai
+    def fire(self, priority, call, chat_id=None, label="Outbound call"):
+        future = self.submit(priority, call, chat_id)
+
+        def log_error(done):
+            if not done.cancelled() and done.exception() is not None:
+                logger.error(f"{label} failed: {done.exception()}")
+
+        future.add_done_callback(log_error)
+        return future
+
+    def _chat_bucket(self, chat_id):
+        bucket = self.chat_buckets.get(chat_id)
+        if bucket is None:
+            bucket = TokenBucket(self.chat_rate, self.chat_burst)
+            self.chat_buckets[chat_id] = bucket
+            if len(self.chat_buckets) > self.max_chats:
+                self.chat_buckets.popitem(last=False)
+        else:
+            self.chat_buckets.move_to_end(chat_id)
+        return bucket
+
+    def _delay(self, job, ready_at):
+        heapq.heappush(self.delayed, (ready_at, job.seq, job))
+
+    async def _dispatch(self):
+        while True:
+            now = time.monotonic()
+            while self.delayed and self.delayed[0][0] <= now:
+                _, _, job = heapq.heappop(self.delayed)
+                heapq.heappush(self.queue, (job.priority, job.seq, job))
+
+            if not self.queue:
+                timeout = self.delayed[0][0] - now if self.delayed else None
+                self.wakeup.clear()
+                try:
+                    await asyncio.wait_for(self.wakeup.wait(), timeout)
+                except asyncio.TimeoutError:
+                    pass
+                continue
+
+            _, _, job = heapq.heappop(self.queue)
+            if job.future.done():
+                continue
+
+            # Chat ka bucket khali hai to job side me rakho, baaki chats na ruke
+            if job.chat_id is not None:
+                bucket = self._chat_bucket(job.chat_id)
+                wait = bucket.wait_time(now)
+                if wait > 0:
+                    self._delay(job, now + wait)
+                    continue
+
+            wait = self.global_bucket.wait_time(now)
+            if wait > 0:
+                heapq.heappush(self.queue, (job.priority, job.seq, job))
+                await asyncio.sleep(wait)
+                continue
+
+            self.global_bucket.take()
+            if job.chat_id is not None:
+                self._chat_bucket(job.chat_id).take()
+
+            await self.concurrency.acquire()
+            task = asyncio.get_running_loop().create_task(self._execute(job))
+            self.inflight.add(task)
+            task.add_done_callback(self.inflight.discard)
+
+    async def _execute(self, job):
+        outcome = "ok"
+        started = time.perf_counter()
+        try:
+            job.attempts += 1
+            result = await job.call()
+            self.sent += 1
+            if not job.future.done():
+                job.future.set_result(result)
+        except RetryAfter as e:
+            outcome = "rate_limited"
+            self.rate_limited += 1
+            retry_after = e.retry_after.total_seconds() if hasattr(e.retry_after, "total_seconds") else e.retry_after
+            logger.warning(f"RetryAfter {retry_after}s (chat {job.chat_id})")
+            ready_at = time.monotonic() + retry_after
+            if job.chat_id is not None:
+                self._chat_bucket(job.chat_id).blocked_until = ready_at
+            else:
+                self.global_bucket.blocked_until = ready_at
+            self._retry(job, ready_at, e)
+        except BadRequest as e:
+            # BadRequest bhi NetworkError hai, par dobara bhejne se kuch nahi badlega
+            outcome = "error"
+            self._fail(job, e)
+        except (TimedOut, NetworkError) as e:
+            outcome = "network_error"
+            self._retry(job, time.monotonic() + min(2 ** job.attempts, 30), e)
+        except Exception as e:
+            outcome = "error"
+            self._fail(job, e)
+        finally:
+            if self.observer is not None:
+                self.observer(PRIORITY_NAMES.get(job.priority, str(job.priority)),
+                              time.perf_counter() - started, outcome)
+            self.concurrency.release()
+            self.wakeup.set()
+
+    def _fail(self, job, error):
+        self.failures += 1
+        if not job.future.done():
+            job.future.set_exception(error)
+
+    def _retry(self, job, ready_at, error):
+        if job.attempts > self.max_retries:
+            self.failures += 1
+            logger.error(f"Outbound call failed after {job.attempts} attempts: {error}")
+            if not job.future.done():
+                job.future.set_exception(error)
+            return
+        self.retries += 1
+        self._delay(job, ready_at)
+
+    # Queue depth per priority + counters
+    def stats(self):
+        depth = {name: 0 for name in PRIORITY_NAMES.values()}
+        for _, _, job in self.queue + self.delayed:
+            name = PRIORITY_NAMES.get(job.priority, str(job.priority))
+            depth[name] = depth.get(name, 0) + 1
+        return {
+            "queued": len(self.queue),
+            "delayed": len(self.delayed),
+            "inflight": len(self.inflight),
+            "depth": depth,
+            "sent": self.sent,
+            "retries": self.retries,
+            "rate_limited": self.rate_limited,
+            "failures": self.failures,
+        }
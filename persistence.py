@@ -0,0 +1,113 @@
+import os
+import json
+import asyncio
+import logging
+import tempfile
+import threading
+import time
+from collections import OrderedDict
+
+logger = logging.getLogger(__name__)
+
+
+# Temp file me likho, fsync karo, phir rename - crash me bhi file aadhi nahi hogi
+def atomic_write_json(path, data):
+    directory = os.path.dirname(os.path.abspath(path))
+    fd, tmp_path = tempfile.mkstemp(prefix=".tmp-", suffix=".json", dir=directory)
+    try:
+        with os.fdopen(fd, "w", encoding="utf-8") as file:
+            json.dump(data, file)
+            file.flush()
+            os.fsync(file.fileno())
+        os.replace(tmp_path, path)
+    except BaseException:
+        try:
+            os.unlink(tmp_path)
+        except FileNotFoundError:
+            pass
+        raise
+
+
+# 🔹 Persistence worker: saari writes ek background thread me
+# Har write ek key ke saath aati hai. Same key ki nayi write purani pending write
+# ko replace karke queue ke end me chali jaati hai (coalescing), key=None wali
+# writes kabhi merge nahi hoti. Event loop kabhi disk ka wait nahi karta.
+class PersistenceWorker:
+    def __init__(self, name="persistence"):
+        self.name = name
+        self.pending = OrderedDict()
+        self.cond = threading.Condition()
+        self.thread = None
+        self.running = False
+        self.busy = False
+        self.seq = 0
+        self.writes = 0
+        self.coalesced = 0
+        self.errors = 0
+        self.observer = None  # observer(fn, seconds, failed) - metrics ke liye
+
+    def start(self):
+        if self.thread is not None:
+            return self
+        self.running = True
+        self.thread = threading.Thread(target=self._run, name=self.name, daemon=True)
+        self.thread.start()
+        return self
+
+    @property
+    def depth(self):
+        return len(self.pending)
+
+    def submit(self, key, fn, *args):
+        with self.cond:
+            if key is None:
+                self.seq += 1
+                key = ("__seq__", self.seq)
+            elif key in self.pending:
+                del self.pending[key]
+                self.coalesced += 1
+            self.pending[key] = (fn, args)
+            self.cond.notify_all()
+
+    def _run(self):
+        while True:
+            with self.cond:
+                while self.running and not self.pending:
+                    self.cond.wait()
+                if not self.pending:
+                    return
+                _, (fn, args) = self.pending.popitem(last=False)
+                self.busy = True
+            failed = False
+            started = time.perf_counter()
+            try:
+                fn(*args)
+                self.writes += 1
+            except Exception as e:
+                failed = True
+                self.errors += 1
+                logger.error(f"Persistence write failed ({getattr(fn, '__name__', fn)}): {e}")
+            finally:
+                if self.observer is not None:
+                    self.observer(fn, time.perf_counter() - started, failed)
+                with self.cond:
+                    self.busy = False
+                    self.cond.notify_all()
+
+    # Jab tak queue khali na ho, ruko (thread se call karo, loop se nahi)
+    def wait_idle(self, timeout=None) -> bool:
+        with self.cond:
+            return self.cond.wait_for(lambda: not self.pending and not self.busy, timeout)
+
+    async def drain(self, timeout=None) -> bool:
+        return await asyncio.to_thread(self.wait_idle, timeout)
+
+    # Pending writes poori karke thread band karo
+    def stop(self, timeout=30):
+        if self.thread is None:
+            return
+        with self.cond:
+            self.running = False
+            self.cond.notify_all()
+        self.thread.join(timeout)
+        self.thread = None
@@ -0,0 +1,105 @@
+import time
+import logging
+
+logger = logging.getLogger(__name__)
+
+
+# 🔹 Ek update ka shared data - text ek hi baar normalize hota hai,
+# admin check ek hi baar (zarurat pade to) hota hai
+class MessageContext:
+    __slots__ = ("update", "context", "message", "chat", "user", "policy",
+                 "raw_text", "text", "stripped", "_normalized", "_normalize", "_folded", "_fold",
+                 "_is_admin", "_admin_check")
+
+    def __init__(self, update, context, policy, admin_check, normalize=str.lower, fold=str.lower):
+        self.update = update
+        self.context = context
+        self.message = update.message
+        self.chat = update.effective_chat
+        self.user = update.effective_user
+        self.policy = policy
+        self.raw_text = self.message.text or self.message.caption or ""
+        self.text = self.raw_text.lower()
+        self.stripped = self.text.strip()
+        self._normalized = None
+        self._normalize = normalize
+        self._folded = None
+        self._fold = fold
+        self._is_admin = None
+        self._admin_check = admin_check
+
+    # Obfuscation hata ke text (banned words isi pe match hote hai)
+    @property
+    def normalized(self) -> str:
+        if self._normalized is None:
+            self._normalized = self._normalize(self.raw_text)
+        return self._normalized
+
+    # Normalized jaisa, lekin repeated chars collapse nahi hote
+    @property
+    def folded(self) -> str:
+        if self._folded is None:
+            self._folded = self._fold(self.raw_text)
+        return self._folded
+
+    async def sender_is_admin(self) -> bool:
+        if self._is_admin is None:
+            self._is_admin = await self._admin_check(self.update)
+        return self._is_admin
+
+
+class StageStats:
+    __slots__ = ("calls", "hits", "total", "max")
+
+    def __init__(self):
+        self.calls = 0
+        self.hits = 0
+        self.total = 0.0
+        self.max = 0.0
+
+
+# 🔹 Ordered moderation stages; pehla verdict milte hi ruk jaata hai.
+# Har stage `async def stage(msg) -> verdict | None` hai.
+class Pipeline:
+    # policy_lookup(update) -> ChatPolicy
+    def __init__(self, stages, policy_lookup, admin_check, normalize=str.lower, fold=str.lower):
+        self.stages = list(stages)
+        self.policy_lookup = policy_lookup
+        self.admin_check = admin_check
+        self.normalize = normalize
+        self.fold = fold
+        self.stats = {name: StageStats() for name, _ in self.stages}
+
+    async def run(self, update, context):
+        if update.message is None or update.effective_chat is None:
+            return None
+
+        msg = MessageContext(update, context, self.policy_lookup(update),
+                             self.admin_check, self.normalize, self.fold)
+        clock = time.perf_counter
+        for name, stage in self.stages:
+            stats = self.stats[name]
+            started = clock()
+            try:
+                verdict = await stage(msg)
+            finally:
+                elapsed = clock() - started
+                stats.calls += 1
+                stats.total += elapsed
+                if elapsed > stats.max:
+                    stats.max = elapsed
+            if verdict:
+                stats.hits += 1
+                return verdict
+        return None
+
+    # /stats ke liye chhota text report
+    def report(self) -> str:
+        lines = []
+        for name, _ in self.stages:
+            stats = self.stats[name]
+            avg = stats.total / stats.calls * 1e6 if stats.calls else 0.0
+            lines.append(
+                f"{name}: {stats.calls} runs, {stats.hits} hits, avg {avg:.0f}µs, max {stats.max * 1e6:.0f}µs"
+            )
+        return "\n".join(lines)
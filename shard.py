@@ -0,0 +1,284 @@
+import os
+import sys
+import json
+import zlib
+import signal
+import asyncio
+import logging
+import secrets
+
+from dotenv import load_dotenv
+from telegram import Bot, Update
+
+from storage import open_storage
+from webhook import WebhookServer
+
+logger = logging.getLogger(__name__)
+
+# Update ke in keys me "chat" hota hai (Update.effective_chat wali saari types)
+CHAT_UPDATE_KEYS = ("message", "edited_message", "channel_post", "edited_channel_post",
+                    "chat_member", "my_chat_member", "chat_join_request",
+                    "message_reaction", "message_reaction_count", "chat_boost", "removed_chat_boost",
+                    "business_message", "edited_business_message", "deleted_business_messages")
+
+RESTART_DELAY = 2
+STOP_TIMEOUT = 30
+
+
+# 🔹 chat_id -> worker (crc32: har process me same result, hash() ki tarah random nahi)
+def shard_for(chat_id, count) -> int:
+    if count <= 1:
+        return 0
+    return zlib.crc32(str(chat_id).encode()) % count
+
+
+# Raw update JSON se chat_id (private/inline updates user id pe shard hote hai)
+def update_chat_id(data):
+    for key in CHAT_UPDATE_KEYS:
+        chat = (data.get(key) or {}).get("chat")
+        if chat and "id" in chat:
+            return chat["id"]
+    callback = data.get("callback_query") or {}
+    chat = (callback.get("message") or {}).get("chat")
+    if chat and "id" in chat:
+        return chat["id"]
+    for value in data.values():
+        if isinstance(value, dict):
+            # inline/callback me "from", poll_answer me "user"
+            user = value.get("from") or value.get("user")
+            if isinstance(user, dict):
+                return user.get("id", 0)
+    return 0
+
+
+# 🔹 Ek worker ke WebhookServer tak keep-alive HTTP connections (localhost)
+class WorkerClient:
+    def __init__(self, host, port, path, secret_token, max_connections=16):
+        self.host = host
+        self.port = port
+        self.path = path
+        self.secret_token = secret_token
+        self.idle = []
+        self.slots = asyncio.Semaphore(max_connections)
+        self.failed = 0
+
+    # Worker ka HTTP status; worker down ho to 503 (Telegram baad me dobara bhejega)
+    async def post(self, body) -> int:
+        async with self.slots:
+            # Purana keep-alive connection band mila to ek baar naye connection pe try
+            for attempt in range(2):
+                reused = bool(self.idle)
+                try:
+                    conn = self.idle.pop() if reused else await asyncio.open_connection(self.host, self.port)
+                except OSError:
+                    self.failed += 1
+                    return 503
+                try:
+                    status, keep_alive = await self._request(conn, body)
+                except (OSError, asyncio.IncompleteReadError, ValueError):
+                    conn[1].close()
+                    if reused and attempt == 0:
+                        continue
+                    self.failed += 1
+                    return 503
+                if keep_alive:
+                    self.idle.append(conn)
+                else:
+                    conn[1].close()
+                return status
+        return 503
+
+    async def _request(self, conn, body):
+        reader, writer = conn
+        writer.write(
+            f"POST {self.path} HTTP/1.1\r\n"
+            f"Host: {self.host}:{self.port}\r\n"
+            f"Content-Type: application/json\r\n"
+            f"Content-Length: {len(body)}\r\n"
+            f"X-Telegram-Bot-Api-Secret-Token: {self.secret_token}\r\n\r\n".encode("latin-1") + body
+        )
+        await writer.drain()
+        status_line = await reader.readline()
+        if not status_line:
+            raise ConnectionResetError("worker closed the connection")
+        status = int(status_line.split()[1])
+        length, keep_alive = 0, True
+        while True:
+            line = await reader.readline()
+            if line in (b"\r\n", b"\n", b""):
+                break
+            name, _, value = line.decode("latin-1").partition(":")
+            name = name.strip().lower()
+            if name == "content-length":
+                length = int(value)
+            elif name == "connection":
+                keep_alive = value.strip().lower() != "close"
+        if length:
+            await reader.readexactly(length)
+        return status, keep_alive
+
+    def close(self):
+        for _, writer in self.idle:
+            writer.close()
+        self.idle.clear()
+
+
+# 🔹 Front dispatcher: Telegram ka webhook yahan aata hai, body as-is owner worker ko
+class Dispatcher:
+    def __init__(self, workers):
+        self.workers = workers
+        self.routed = [0] * len(workers)
+
+    async def deliver(self, body) -> int:
+        try:
+            data = json.loads(body)
+        except ValueError:
+            return 400
+        if not isinstance(data, dict):
+            return 400
+        index = shard_for(update_chat_id(data), len(self.workers))
+        self.routed[index] += 1
+        return await self.workers[index].post(body)
+
+    def close(self):
+        for worker in self.workers:
+            worker.close()
+
+
+# 🔹 Worker processes: har ek apna bot.py (BOT_MODE=webhook, localhost port)
+class WorkerProcess:
+    def __init__(self, index, env, script):
+        self.index = index
+        self.env = env
+        self.script = script
+        self.process = None
+        self.stopping = False
+
+    # Crash ho to thodi der baad dobara chalao
+    async def supervise(self):
+        while not self.stopping:
+            self.process = await asyncio.create_subprocess_exec(sys.executable, self.script, env=self.env)
+            logger.info(f"Shard {self.index} started (pid {self.process.pid})")
+            code = await self.process.wait()
+            if self.stopping:
+                break
+            logger.error(f"Shard {self.index} exited with code {code}, restarting")
+            await asyncio.sleep(RESTART_DELAY)
+
+    # SIGTERM: worker apni queue khatam karke state flush karta hai
+    async def stop(self):
+        self.stopping = True
+        if self.process is None or self.process.returncode is not None:
+            return
+        self.process.terminate()
+        try:
+            await asyncio.wait_for(self.process.wait(), STOP_TIMEOUT)
+        except asyncio.TimeoutError:
+            logger.error(f"Shard {self.index} did not stop in {STOP_TIMEOUT}s, killing")
+            self.process.kill()
+            await self.process.wait()
+
+
+def worker_env(index, count, port, secret_token):
+    env = dict(os.environ)
+    env.update({
+        "BOT_MODE": "webhook",
+        "WEBHOOK_LISTEN": "127.0.0.1",
+        "WEBHOOK_PORT": str(port),
+        "WEBHOOK_SECRET": secret_token,
+        "WEBHOOK_URL": "",
+        "STORAGE_BACKEND": "sqlite",
+        "SHARD_INDEX": str(index),
+        "SHARD_COUNT": str(count),
+    })
+    metrics_port = int(os.getenv("METRICS_PORT", "0"))
+    if metrics_port:
+        env["METRICS_PORT"] = str(metrics_port + index)
+    return env
+
+
+async def run(count, listen, port, path, base_port, secret_token=None, webhook_url=None,
+              token=None, bot_api_url=None):
+    # Workers ke beech ka secret (bahar se worker ports pe koi update na daal sake)
+    internal_secret = secrets.token_hex(16)
+    script = os.path.join(os.path.dirname(os.path.abspath(__file__)), "bot.py")
+    processes = [
+        WorkerProcess(i, worker_env(i, count, base_port + i, internal_secret), script)
+        for i in range(count)
+    ]
+    dispatcher = Dispatcher([
+        WorkerClient("127.0.0.1", base_port + i, path, internal_secret) for i in range(count)
+    ])
+    server = WebhookServer(None, host=listen, port=port, path=path,
+                           secret_token=secret_token, deliver=dispatcher.deliver)
+
+    stop_event = asyncio.Event()
+    loop = asyncio.get_running_loop()
+    for sig in (signal.SIGINT, signal.SIGTERM):
+        try:
+            loop.add_signal_handler(sig, stop_event.set)
+        except (NotImplementedError, RuntimeError):
+            pass
+
+    supervisors = [asyncio.create_task(process.supervise()) for process in processes]
+    await server.start()
+    if webhook_url:
+        bot = Bot(token, base_url=f"{bot_api_url}/bot" if bot_api_url else "https://api.telegram.org/bot")
+        async with bot:
+            await bot.set_webhook(
+                url=webhook_url,
+                secret_token=secret_token,
+                allowed_updates=Update.ALL_TYPES,
+                max_connections=max(40, 10 * count),
+            )
+    logger.info(f"Dispatching to {count} shards on ports {base_port}-{base_port + count - 1}")
+    try:
+        await stop_event.wait()
+    finally:
+        logger.info("Shard dispatcher shutting down")
+        await server.stop()
+        # Keep-alive connections pehle band, taaki workers saaf exit kare
+        dispatcher.close()
+        await asyncio.gather(*(process.stop() for process in processes))
+        await asyncio.gather(*supervisors, return_exceptions=True)
+        logger.info(f"Updates routed per shard: {dispatcher.routed}")
+
+
+# python shard.py - SHARD_COUNT workers, sab SQLite store share karte hai
+def main() -> None:
+    load_dotenv()
+    logging.basicConfig(
+        format='%(asctime)s - %(name)s - %(levelname)s - %(message)s',
+        level=logging.INFO
+    )
+    port = int(os.getenv("WEBHOOK_PORT", "8443"))
+    secret_token = os.getenv("WEBHOOK_SECRET") or None
+    if not secret_token:
+        logger.warning("WEBHOOK_SECRET not set - webhook requests are not authenticated")
+
+    # Schema/JSON import ek hi baar yahin ho, workers ek saath migrate na kare
+    storage = open_storage(
+        "sqlite",
+        database_file=os.getenv("DATABASE_FILE", "bot.db"),
+        members_file="members.jsonl",
+        users_file="users.json",
+        settings_file="settings.json",
+        triggers_file="triggers.json",
+    )
+    storage.close()
+
+    asyncio.run(run(
+        count=int(os.getenv("SHARD_COUNT") or os.cpu_count() or 1),
+        listen=os.getenv("WEBHOOK_LISTEN", "127.0.0.1"),
+        port=port,
+        path=os.getenv("WEBHOOK_PATH", "/telegram"),
+        base_port=int(os.getenv("SHARD_BASE_PORT") or port + 1),
+        secret_token=secret_token,
+        webhook_url=os.getenv("WEBHOOK_URL") or None,
+        token=os.getenv("BOT_TOKEN"),
+        bot_api_url=os.getenv("BOT_API_URL") or None,
+    ))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,40 @@
+import time
+import logging
+
+logger = logging.getLogger(__name__)
+
+
+# 🔹 Boot ke phases ka time: imports, storage, journal, config, application ...
+# mark(name) = pichle mark se ab tak ka phase. Pehla update aate hi poori report log hoti hai.
+class StartupTimer:
+    def __init__(self, started=None):
+        self.started = time.perf_counter() if started is None else started
+        self.last = self.started
+        self.phases = []          # (name, seconds)
+        self.first_update = None  # start se pehle processed update tak (seconds)
+
+    def mark(self, name) -> float:
+        now = time.perf_counter()
+        seconds = now - self.last
+        self.phases.append((name, seconds))
+        self.last = now
+        return seconds
+
+    @property
+    def ready(self):
+        return self.last - self.started
+
+    # Har update pe bulaya jaata hai - sirf pehli baar kuch karta hai
+    def update_seen(self) -> bool:
+        if self.first_update is not None:
+            return False
+        self.first_update = time.perf_counter() - self.started
+        logger.info(f"Startup: {self.report()}")
+        return True
+
+    def report(self) -> str:
+        text = ", ".join(f"{name} {seconds * 1000:.0f}ms" for name, seconds in self.phases)
+        text += f" - ready in {self.ready:.2f}s"
+        if self.first_update is not None:
+            text += f", first update at {self.first_update:.2f}s"
+        return text
@@ -0,0 +1,880 @@
+import os
+import json
+import logging
+import sqlite3
+import sys
+import tempfile
+import threading
+from array import array
+
+from persistence import atomic_write_json
+
+logger = logging.getLogger(__name__)
+
+# Is chat_id ki settings naye groups ke liye default template hai
+# (purani global settings.json yahin migrate hoti hai)
+DEFAULT_CHAT = "*"
+
+DEFAULT_SETTINGS = {
+    "block_links": False,
+    "block_media": False,
+    "message_timer": 0,
+    "muted_users": {},
+    "banned_words": [],
+    "allowed_domains": [],
+    "denied_domains": []
+}
+
+# Settings jo settings table me key/value (JSON value) ki tarah jaate hai
+SCALAR_SETTINGS = ("block_links", "block_media", "message_timer", "allowed_domains", "denied_domains")
+
+
+def default_settings():
+    return {
+        key: (value.copy() if isinstance(value, (dict, list)) else value)
+        for key, value in DEFAULT_SETTINGS.items()
+    }
+
+
+# Purane member records ke placeholders - ab disk pe None jaata hai
+MEMBER_PLACEHOLDERS = ("N/A", "Not Available")
+
+
+def placeholder_to_none(value):
+    return None if value in MEMBER_PLACEHOLDERS else value
+
+
+# File badli ya nahi - (mtime, size); file na ho to None
+def file_signature(path):
+    try:
+        stat = os.stat(path)
+    except FileNotFoundError:
+        return None
+    return stat.st_mtime_ns, stat.st_size
+
+
+# Ek chat ki settings ki independent copy (snapshot / seeding ke liye)
+def copy_settings(settings):
+    return {
+        **settings,
+        "muted_users": dict(settings["muted_users"]),
+        "banned_words": list(settings["banned_words"]),
+        "allowed_domains": list(settings.get("allowed_domains", [])),
+        "denied_domains": list(settings.get("denied_domains", []))
+    }
+
+
+# 🔹 Storage interface
+# Bot sirf yeh methods use karta hai; backend JSON files ho ya SQLite.
+# `writer` (PersistenceWorker) set ho to writes background thread me jaati hai.
+class Storage:
+    writer = None
+    # Config writes (members ke alawa) ki ginti - hot reload isse race pakadta hai
+    config_writes = 0
+
+    # Write ko worker pe bhejo (same key wali pending write replace ho jaati hai)
+    def _defer(self, key, fn, *args, config=True):
+        if config:
+            self.config_writes += 1
+        if self.writer is None:
+            fn(*args)
+        else:
+            self.writer.submit(key, fn, *args)
+
+    # Ek chat ke saare user ids: sorted array("q"). None = abhi ready nahi (baad me poochho)
+    def member_ids(self, chat_id):
+        raise NotImplementedError
+
+    # Startup ke baad (bot chalu hone pe): jo data background me pehle se padha ja sakta hai
+    def preload(self):
+        pass
+
+    # Export ke liye stream: (chat_id, user_id, name, username, mobile), chat ke hisaab se grouped.
+    # Worker thread se chalta hai.
+    def iter_members(self, chat_ids=None):
+        raise NotImplementedError
+
+    # rows: [(chat_id, user_id, name, username, mobile), ...] - sirf naye members.
+    # username/mobile na ho to None (placeholder text disk pe nahi jaata)
+    def add_members(self, rows):
+        raise NotImplementedError
+
+    def load_users(self):
+        raise NotImplementedError
+
+    def add_user(self, user_id):
+        raise NotImplementedError
+
+    def remove_user(self, user_id):
+        raise NotImplementedError
+
+    # Ek chat ki settings: scalar keys + domain lists + "banned_words" list + "muted_users" dict.
+    # Chat pehle kabhi save nahi hui to None.
+    def load_chat_settings(self, chat_id):
+        raise NotImplementedError
+
+    # Poori chat settings ek saath likho (naye chat ko template se seed karna)
+    def save_chat_settings(self, chat_id, settings):
+        raise NotImplementedError
+
+    def set_setting(self, chat_id, key, value):
+        raise NotImplementedError
+
+    def add_banned_word(self, chat_id, word):
+        raise NotImplementedError
+
+    def remove_banned_word(self, chat_id, word):
+        raise NotImplementedError
+
+    def set_mute(self, chat_id, user_id, until):
+        raise NotImplementedError
+
+    def remove_mutes(self, chat_id, user_ids):
+        raise NotImplementedError
+
+    # Saari chats ke mutes: [(chat_id, user_id, until), ...]
+    def load_mutes(self):
+        raise NotImplementedError
+
+    def load_triggers(self):
+        raise NotImplementedError
+
+    def set_trigger(self, trigger, data):
+        raise NotImplementedError
+
+    def remove_trigger(self, trigger):
+        raise NotImplementedError
+
+    # 🔹 Hot reload
+    # Kisi aur ne (editor, admin tool, dusra shard) config badla? Apni writes nahi ginti.
+    def config_changed(self) -> bool:
+        return False
+
+    # Taaza config padho: ({chat_id: settings}, triggers, users). Worker thread pe
+    # chalta hai, backend ka state nahi badalta. chats me kam se kam chat_ids hote hai.
+    def read_config(self, chat_ids):
+        chats = {chat_id: self.load_chat_settings(chat_id) for chat_id in chat_ids}
+        return chats, self.load_triggers(), self.load_users()
+
+    # Snapshot swap ke waqt (loop pe) backend ka apna state bhi naya karo
+    def apply_config(self, chats, triggers, users):
+        pass
+
+    def close(self):
+        pass
+
+
+# 🔹 Purana JSON format (members.jsonl, users.json, settings.json, triggers.json)
+# Har change pe poori file dobara likhi jaati hai - chhote setups ke liye theek hai.
+# Members alag hai: JSON Lines, sirf nayi lines append hoti hai.
+# settings.json: {"version": 2, "chats": {chat_id: settings}}; purani flat file
+# DEFAULT_CHAT ban jaati hai.
+class JsonStorage(Storage):
+    def __init__(self, members_file="members.jsonl", users_file="users.json",
+                 settings_file="settings.json", triggers_file="triggers.json"):
+        self.members_file = members_file
+        # Purani members.json ({chat_id: [member dict, ...]}) pehli baar jsonl me badli jaati hai
+        self.legacy_members_file = members_file[:-1] if members_file.endswith(".jsonl") else None
+        self.users_file = users_file
+        self.settings_file = settings_file
+        self.triggers_file = triggers_file
+        self.member_index = None   # chat_id -> sorted array("q"), background me banta hai
+        self.member_index_thread = None
+        self.member_lines = 0      # file me lines (last compaction / index ke waqt)
+        self.member_appends = 0    # uske baad append hui lines
+        self.users = set()
+        self.chats = None
+        # Har chat ki aakhri saved copy - save pe sirf badli hui chat copy hoti hai,
+        # poori settings.json worker thread pe banti hai
+        self.saved_chats = None
+        self.saved_lock = threading.Lock()
+        self.triggers = {}
+        # path -> (mtime, size): jo humne padha / khud likha (hot reload ke liye)
+        self.seen = {}
+        self.written = {}
+
+    # strict: aadhi likhi / kharab file pe error do (reload purana config rakhe)
+    def _read(self, path, strict=False):
+        self.seen[path] = file_signature(path)
+        try:
+            with open(path, "r", encoding="utf-8") as file:
+                return json.load(file)
+        except FileNotFoundError:
+            return None
+        except json.JSONDecodeError:
+            if strict:
+                raise
+            return None
+
+    # Data ka snapshot abhi lo (caller thread pe), file write worker me ho
+    def _write(self, path, data):
+        self._defer(path, self._write_file, path, data, config=path != self.members_file)
+
+    def _write_file(self, path, data):
+        atomic_write_json(path, data)
+        self.written[path] = file_signature(path)
+
+    # 🔹 Members (JSON Lines): har line [chat_id, user_id, name, username, mobile]
+    def _convert_legacy_members(self):
+        if self.legacy_members_file is None or os.path.exists(self.members_file):
+            return
+        data = self._read(self.legacy_members_file)
+        if not isinstance(data, dict):
+            return
+        rows = [
+            (str(chat_id), member["id"], member.get("name"),
+             placeholder_to_none(member.get("username")), placeholder_to_none(member.get("mobile")))
+            for chat_id, members in data.items() if isinstance(members, list)
+            for member in members if isinstance(member, dict) and "id" in member
+        ]
+        self._rewrite_members(rows)
+        logger.info(f"Converted {self.legacy_members_file} -> {self.members_file} ({len(rows)} members)")
+
+    def _member_rows(self):
+        self._convert_legacy_members()
+        try:
+            file = open(self.members_file, "r", encoding="utf-8")
+        except FileNotFoundError:
+            return
+        with file:
+            for line in file:
+                try:
+                    row = json.loads(line)
+                except ValueError:
+                    continue  # crash me adhuri likhi aakhri line
+                if isinstance(row, list) and len(row) == 5:
+                    yield row
+
+    def _rewrite_members(self, rows):
+        directory = os.path.dirname(os.path.abspath(self.members_file))
+        fd, tmp_path = tempfile.mkstemp(prefix=".tmp-", suffix=".jsonl", dir=directory)
+        count = 0
+        try:
+            with os.fdopen(fd, "w", encoding="utf-8") as file:
+                for row in rows:
+                    file.write(json.dumps(list(row), ensure_ascii=False, separators=(",", ":")) + "\n")
+                    count += 1
+                file.flush()
+                os.fsync(file.fileno())
+            os.replace(tmp_path, self.members_file)
+        except BaseException:
+            try:
+                os.unlink(tmp_path)
+            except FileNotFoundError:
+                pass
+            raise
+        return count
+
+    # Member index background thread me (ek hi baar)
+    def preload(self):
+        if self.member_index_thread is None:
+            self.member_index_thread = threading.Thread(
+                target=self._build_member_index, name="member-index", daemon=True
+            )
+            self.member_index_thread.start()
+
+    # Saari file ek baar padhke sirf ids ka compact index (background thread)
+    def _build_member_index(self):
+        index = {}
+        lines = 0
+        for chat_id, user_id, *_ in self._member_rows():
+            ids = index.get(chat_id)
+            if ids is None:
+                ids = index[chat_id] = array("q")
+            ids.append(user_id)
+            lines += 1
+        for chat_id, ids in index.items():
+            index[chat_id] = array("q", sorted(ids))
+        self.member_lines = lines
+        self.member_index = index
+        logger.info(f"Member index ready: {lines} members in {len(index)} chats")
+
+    def member_ids(self, chat_id):
+        if self.member_index is None:
+            self.preload()
+            return None
+        # Caller (MemberIndex) ise rakhta hai - yahan dobara copy na rahe
+        return self.member_index.pop(str(chat_id), None) or array("q")
+
+    # Chat ke hisaab se group (JSON me file order chat-wise nahi hota) + duplicates hatao.
+    # Pehle pass me sirf har chat ke ids (dedupe) aur pehli baar wali lines ke file offsets;
+    # dusre pass me chat-wise wahi lines padh ke yield - naam/username kabhi ek saath memory me nahi.
+    # Ek hi file handle: compaction beech me file replace kare to bhi offsets sahi rehte hai.
+    def _grouped_members(self, chat_ids=None):
+        self._convert_legacy_members()
+        order = None if chat_ids is None else [str(chat_id) for chat_id in chat_ids]
+        wanted = None if order is None else set(order)
+        try:
+            file = open(self.members_file, "rb")
+        except FileNotFoundError:
+            return
+        with file:
+            chats = {}  # chat_id -> (seen ids, offsets)
+            offset = 0
+            for line in file:
+                start, offset = offset, offset + len(line)
+                try:
+                    row = json.loads(line)
+                except ValueError:
+                    continue  # crash me adhuri likhi aakhri line
+                if not (isinstance(row, list) and len(row) == 5):
+                    continue
+                chat_id, user_id = row[0], row[1]
+                if wanted is not None and chat_id not in wanted:
+                    continue
+                chat = chats.get(chat_id)
+                if chat is None:
+                    chat = chats[chat_id] = (set(), array("q"))
+                if user_id not in chat[0]:
+                    chat[0].add(user_id)
+                    chat[1].append(start)
+            offsets = {chat_id: chat[1] for chat_id, chat in chats.items()}
+            del chats
+
+            for chat_id in (list(offsets) if order is None else order):
+                for start in offsets.pop(chat_id, ()):
+                    file.seek(start)
+                    yield tuple(json.loads(file.readline()))
+
+    def iter_members(self, chat_ids=None):
+        return self._grouped_members(chat_ids)
+
+    def add_members(self, rows):
+        rows = [(str(chat_id), user_id, name, username, mobile) for chat_id, user_id, name, username, mobile in rows]
+        # key=None: appends kabhi coalesce nahi hote
+        self._defer(None, self._append_members, rows, config=False)
+
+    def _append_members(self, rows):
+        self._convert_legacy_members()
+        with open(self.members_file, "a", encoding="utf-8") as file:
+            for row in rows:
+                file.write(json.dumps(list(row), ensure_ascii=False, separators=(",", ":")) + "\n")
+            file.flush()
+            os.fsync(file.fileno())
+        self.member_appends += len(rows)
+        # File pichhli baar se dugni ho gayi to compact karo (amortized O(1) per member)
+        if self.member_index is not None and self.member_appends >= max(10000, self.member_lines):
+            self._compact_members()
+
+    # Duplicates hatao (index ready hone se pehle ho sakte hai) aur chat-wise likho
+    def _compact_members(self):
+        count = self._rewrite_members(self._grouped_members())
+        self.member_lines = count
+        self.member_appends = 0
+        logger.info(f"Members file compacted: {count} members")
+
+    def load_users(self):
+        data = self._read(self.users_file)
+        self.users = set(data.get("allowed_users", [])) if isinstance(data, dict) else set()
+        return self.users
+
+    def _save_users(self):
+        self._write(self.users_file, {"allowed_users": list(self.users)})
+
+    def add_user(self, user_id):
+        self.users.add(user_id)
+        self._save_users()
+
+    def remove_user(self, user_id):
+        self.users.discard(user_id)
+        self._save_users()
+
+    # settings.json ek baar padho; purana flat format ho to upgrade karke likho
+    def all_chat_settings(self):
+        if self.chats is not None:
+            return self.chats
+
+        data = self._read(self.settings_file)
+        self.chats = self._parse_settings(data)
+        if isinstance(data, dict) and data.get("version") != 2:
+            self._save_settings()
+        return self.chats
+
+    @staticmethod
+    def _parse_settings(data):
+        chats = {}
+        if isinstance(data, dict) and data.get("version") == 2:
+            for chat_id, settings in data.get("chats", {}).items():
+                chats[str(chat_id)] = settings
+        elif isinstance(data, dict):
+            chats[DEFAULT_CHAT] = data
+
+        # Ensure all keys exist
+        for settings in chats.values():
+            for key, default in default_settings().items():
+                settings.setdefault(key, default)
+        return chats
+
+    # chat_id diya ho to loop pe sirf us chat ki copy; None = saari chats dobara copy
+    def _save_settings(self, chat_id=None):
+        with self.saved_lock:
+            if chat_id is None or self.saved_chats is None:
+                self.saved_chats = {cid: copy_settings(settings) for cid, settings in self.chats.items()}
+            else:
+                chat_id = str(chat_id)
+                self.saved_chats[chat_id] = copy_settings(self.chats[chat_id])
+        self._defer(self.settings_file, self._write_settings)
+
+    # Worker thread pe: copies pe haath nahi lagta (nayi save poori copy replace karti hai)
+    def _write_settings(self):
+        with self.saved_lock:
+            chats = dict(self.saved_chats)
+        self._write_file(self.settings_file, {"version": 2, "chats": chats})
+
+    def _chat(self, chat_id):
+        chats = self.all_chat_settings()
+        return chats.setdefault(str(chat_id), default_settings())
+
+    def load_chat_settings(self, chat_id):
+        settings = self.all_chat_settings().get(str(chat_id))
+        return copy_settings(settings) if settings is not None else None
+
+    def save_chat_settings(self, chat_id, settings):
+        self.all_chat_settings()[str(chat_id)] = copy_settings(settings)
+        self._save_settings(chat_id)
+
+    def set_setting(self, chat_id, key, value):
+        self._chat(chat_id)[key] = value
+        self._save_settings(chat_id)
+
+    def add_banned_word(self, chat_id, word):
+        words = self._chat(chat_id)["banned_words"]
+        if word not in words:
+            words.append(word)
+        self._save_settings(chat_id)
+
+    def remove_banned_word(self, chat_id, word):
+        words = self._chat(chat_id)["banned_words"]
+        if word in words:
+            words.remove(word)
+        self._save_settings(chat_id)
+
+    def set_mute(self, chat_id, user_id, until):
+        self._chat(chat_id)["muted_users"][str(user_id)] = until
+        self._save_settings(chat_id)
+
+    def remove_mutes(self, chat_id, user_ids):
+        muted = self._chat(chat_id)["muted_users"]
+        for user_id in user_ids:
+            muted.pop(str(user_id), None)
+        self._save_settings(chat_id)
+
+    def load_mutes(self):
+        return [
+            (chat_id, user_id, until)
+            for chat_id, settings in self.all_chat_settings().items()
+            for user_id, until in settings["muted_users"].items()
+        ]
+
+    def load_triggers(self):
+        data = self._read(self.triggers_file)
+        self.triggers = data if isinstance(data, dict) else {}
+        return self.triggers
+
+    def set_trigger(self, trigger, data):
+        self.triggers[trigger] = data
+        self._write(self.triggers_file, dict(self.triggers))
+
+    def remove_trigger(self, trigger):
+        self.triggers.pop(trigger, None)
+        self._write(self.triggers_file, dict(self.triggers))
+
+    def config_changed(self):
+        changed = False
+        for path in (self.users_file, self.settings_file, self.triggers_file):
+            signature = file_signature(path)
+            if signature != self.seen.get(path) and signature != self.written.get(path):
+                changed = True
+            self.seen[path] = signature
+        return changed
+
+    # Poori files dobara padho (instance state ko haath nahi lagta)
+    def read_config(self, chat_ids):
+        chats = self._parse_settings(self._read(self.settings_file, strict=True))
+        triggers = self._read(self.triggers_file, strict=True)
+        users = self._read(self.users_file, strict=True)
+        return (
+            chats,
+            triggers if isinstance(triggers, dict) else {},
+            set(users.get("allowed_users", [])) if isinstance(users, dict) else set(),
+        )
+
+    def apply_config(self, chats, triggers, users):
+        self.chats = {chat_id: copy_settings(settings) for chat_id, settings in chats.items()}
+        with self.saved_lock:
+            self.saved_chats = {chat_id: copy_settings(settings) for chat_id, settings in chats.items()}
+        self.triggers = triggers
+        self.users = users
+
+
+SCHEMA_VERSION = 4
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS meta (
+    key TEXT PRIMARY KEY,
+    value TEXT
+);
+CREATE TABLE IF NOT EXISTS members (
+    chat_id TEXT NOT NULL,
+    user_id INTEGER NOT NULL,
+    name TEXT,
+    username TEXT,
+    mobile TEXT,
+    PRIMARY KEY (chat_id, user_id)
+) WITHOUT ROWID;
+CREATE TABLE IF NOT EXISTS allowed_users (
+    user_id INTEGER PRIMARY KEY
+);
+CREATE TABLE IF NOT EXISTS chats (
+    chat_id TEXT PRIMARY KEY
+);
+CREATE TABLE IF NOT EXISTS chat_settings (
+    chat_id TEXT NOT NULL,
+    key TEXT NOT NULL,
+    value TEXT NOT NULL,
+    PRIMARY KEY (chat_id, key)
+) WITHOUT ROWID;
+CREATE TABLE IF NOT EXISTS chat_banned_words (
+    chat_id TEXT NOT NULL,
+    word TEXT NOT NULL,
+    UNIQUE (chat_id, word)
+);
+CREATE TABLE IF NOT EXISTS chat_mutes (
+    chat_id TEXT NOT NULL,
+    user_id TEXT NOT NULL,
+    until REAL NOT NULL,
+    PRIMARY KEY (chat_id, user_id)
+) WITHOUT ROWID;
+CREATE INDEX IF NOT EXISTS chat_mutes_until ON chat_mutes (until);
+CREATE TABLE IF NOT EXISTS triggers (
+    trigger TEXT PRIMARY KEY,
+    chat_id INTEGER NOT NULL,
+    message_id INTEGER NOT NULL,
+    mode TEXT NOT NULL DEFAULT 'exact',
+    content TEXT
+);
+INSERT OR IGNORE INTO meta (key, value) VALUES ('config_version', '0');
+""" + "".join(
+    # Config tables pe har write (kisi bhi connection se) config_version badhata hai
+    f"CREATE TRIGGER IF NOT EXISTS {table}_{event.lower()}_config AFTER {event} ON {table} "
+    f"BEGIN UPDATE meta SET value = CAST(value AS INTEGER) + 1 WHERE key = 'config_version'; END;\n"
+    for table in ("allowed_users", "chat_settings", "chat_banned_words", "triggers")
+    for event in ("INSERT", "UPDATE", "DELETE")
+)
+
+# v1 (global settings) -> v2 (per-chat): purani rows DEFAULT_CHAT me jaati hai
+MIGRATE_V1 = f"""
+INSERT OR IGNORE INTO chats (chat_id) VALUES ('{DEFAULT_CHAT}');
+INSERT OR IGNORE INTO chat_settings (chat_id, key, value) SELECT '{DEFAULT_CHAT}', key, value FROM settings;
+INSERT OR IGNORE INTO chat_banned_words (chat_id, word) SELECT '{DEFAULT_CHAT}', word FROM banned_words ORDER BY rowid;
+INSERT OR IGNORE INTO chat_mutes (chat_id, user_id, until) SELECT '{DEFAULT_CHAT}', user_id, until FROM mutes;
+DROP TABLE settings;
+DROP TABLE banned_words;
+DROP TABLE mutes;
+"""
+
+# v2 -> v3: trigger match mode + cached message content (JSON)
+MIGRATE_V2 = """
+ALTER TABLE triggers ADD COLUMN mode TEXT NOT NULL DEFAULT 'exact';
+ALTER TABLE triggers ADD COLUMN content TEXT;
+"""
+
+TRIGGER_UPSERT = (
+    "INSERT INTO triggers (trigger, chat_id, message_id, mode, content) VALUES (?, ?, ?, ?, ?) "
+    "ON CONFLICT(trigger) DO UPDATE SET chat_id = excluded.chat_id, message_id = excluded.message_id, "
+    "mode = excluded.mode, content = excluded.content"
+)
+
+
+def trigger_row(trigger, data):
+    content = data.get("content")
+    return (trigger, data["chat_id"], data["message_id"], data.get("mode", "exact"),
+            json.dumps(content) if content is not None else None)
+
+
+# 🔹 SQLite backend (WAL mode)
+# Har write sirf badli hui rows touch karta hai, ek transaction me.
+# sqlite3 same SQL string ke prepared statements cache karta hai.
+class SqliteStorage(Storage):
+    def __init__(self, path="bot.db"):
+        self.path = path
+        self.lock = threading.RLock()
+        # timeout: sharded mode me kai processes ek hi DB pe likhte hai
+        self.conn = sqlite3.connect(path, check_same_thread=False, cached_statements=256, timeout=30)
+        self.conn.execute("PRAGMA journal_mode=WAL")
+        self.conn.execute("PRAGMA synchronous=NORMAL")
+        version = self.conn.execute("PRAGMA user_version").fetchone()[0]
+        # Schema current ho to boot pe koi write transaction nahi (sharded workers lock pe nahi ladte)
+        if version != SCHEMA_VERSION:
+            with self.conn:
+                self.conn.executescript(SCHEMA)
+                if version == 1:
+                    self.conn.executescript("BEGIN;" + MIGRATE_V1 + "COMMIT;")
+                    logger.info("Migrated SQLite schema v1 -> v2 (per-chat settings)")
+                if version in (1, 2):
+                    self.conn.executescript("BEGIN;" + MIGRATE_V2 + "COMMIT;")
+                    logger.info("Migrated SQLite schema v2 -> v3 (trigger modes)")
+                self.conn.execute(f"PRAGMA user_version={SCHEMA_VERSION}")
+        self.seen_versions = self._config_versions()
+
+    # Ek statement, ek transaction (worker thread ya caller pe chalta hai)
+    def _execute(self, sql, params=()):
+        with self.lock, self.conn:
+            self.conn.execute(sql, params)
+
+    def _executemany(self, sql, rows):
+        with self.lock, self.conn:
+            self.conn.executemany(sql, rows)
+
+    # Kai statements ek hi transaction me: [(sql, params), ...]
+    def _transaction(self, statements):
+        with self.lock, self.conn:
+            for sql, params in statements:
+                self.conn.execute(sql, params)
+
+    def _query(self, sql, params=()):
+        with self.lock:
+            return self.conn.execute(sql, params).fetchall()
+
+    # Dusre connections (processes) ke commit pe badalta hai - sasta change check
+    def data_version(self):
+        return self._query("PRAGMA data_version")[0][0]
+
+    # (data_version, config_version): pehla dusre connections ke commit pe badalta hai,
+    # dusra sirf config tables ke writes pe (members/mutes pe nahi)
+    def _config_versions(self):
+        return self.data_version(), self.get_meta("config_version")
+
+    # Dono badle tabhi reload (sirf apni writes = data_version same)
+    def config_changed(self):
+        data_version, config_version = self._config_versions()
+        seen_data, seen_config = self.seen_versions
+        self.seen_versions = (data_version, config_version)
+        return data_version != seen_data and config_version != seen_config
+
+    def get_meta(self, key):
+        rows = self._query("SELECT value FROM meta WHERE key = ?", (key,))
+        return rows[0][0] if rows else None
+
+    def set_meta(self, key, value):
+        self._execute(
+            "INSERT INTO meta (key, value) VALUES (?, ?) "
+            "ON CONFLICT(key) DO UPDATE SET value = excluded.value",
+            (key, value),
+        )
+
+    # Primary key (chat_id, user_id) ka range scan - ids pehle se sorted aate hai
+    def member_ids(self, chat_id):
+        with self.lock:
+            return array("q", (row[0] for row in self.conn.execute(
+                "SELECT user_id FROM members WHERE chat_id = ? ORDER BY user_id", (str(chat_id),)
+            )))
+
+    # Alag read connection (WAL): export chalte waqt writes nahi rukti, rows stream hoti hai
+    def iter_members(self, chat_ids=None):
+        conn = sqlite3.connect(self.path, timeout=30)
+        try:
+            columns = "SELECT chat_id, user_id, name, username, mobile FROM members"
+            if chat_ids is None:
+                yield from conn.execute(f"{columns} ORDER BY chat_id, user_id")
+            else:
+                for chat_id in chat_ids:
+                    yield from conn.execute(f"{columns} WHERE chat_id = ? ORDER BY user_id", (str(chat_id),))
+        finally:
+            conn.close()
+
+    def add_members(self, rows):
+        self._defer(
+            None,
+            self._executemany,
+            "INSERT OR IGNORE INTO members (chat_id, user_id, name, username, mobile) "
+            "VALUES (?, ?, ?, ?, ?)",
+            [(str(chat_id), user_id, name, username, mobile) for chat_id, user_id, name, username, mobile in rows],
+            config=False,
+        )
+
+    def load_users(self):
+        return {row[0] for row in self._query("SELECT user_id FROM allowed_users")}
+
+    def add_user(self, user_id):
+        self._defer(
+            ("user", user_id), self._execute,
+            "INSERT OR IGNORE INTO allowed_users (user_id) VALUES (?)", (user_id,),
+        )
+
+    def remove_user(self, user_id):
+        self._defer(
+            ("user", user_id), self._execute,
+            "DELETE FROM allowed_users WHERE user_id = ?", (user_id,),
+        )
+
+    def load_chat_settings(self, chat_id):
+        chat_id = str(chat_id)
+        if not self._query("SELECT 1 FROM chats WHERE chat_id = ?", (chat_id,)):
+            return None
+        settings = default_settings()
+        for key, value in self._query("SELECT key, value FROM chat_settings WHERE chat_id = ?", (chat_id,)):
+            settings[key] = json.loads(value)
+        settings["banned_words"] = [
+            row[0] for row in self._query(
+                "SELECT word FROM chat_banned_words WHERE chat_id = ? ORDER BY rowid", (chat_id,)
+            )
+        ]
+        settings["muted_users"] = {
+            user_id: until for user_id, until in self._query(
+                "SELECT user_id, until FROM chat_mutes WHERE chat_id = ?", (chat_id,)
+            )
+        }
+        return settings
+
+    def _seed_statements(self, chat_id, settings):
+        chat_id = str(chat_id)
+        statements = [("INSERT OR IGNORE INTO chats (chat_id) VALUES (?)", (chat_id,))]
+        statements += [
+            ("INSERT INTO chat_settings (chat_id, key, value) VALUES (?, ?, ?) "
+             "ON CONFLICT(chat_id, key) DO UPDATE SET value = excluded.value",
+             (chat_id, key, json.dumps(settings[key])))
+            for key in SCALAR_SETTINGS if key in settings
+        ]
+        statements += [
+            ("INSERT OR IGNORE INTO chat_banned_words (chat_id, word) VALUES (?, ?)", (chat_id, word))
+            for word in settings.get("banned_words", [])
+        ]
+        statements += [
+            ("INSERT INTO chat_mutes (chat_id, user_id, until) VALUES (?, ?, ?) "
+             "ON CONFLICT(chat_id, user_id) DO UPDATE SET until = excluded.until",
+             (chat_id, str(user_id), until))
+            for user_id, until in settings.get("muted_users", {}).items()
+        ]
+        return statements
+
+    def save_chat_settings(self, chat_id, settings):
+        self._defer(None, self._transaction, self._seed_statements(chat_id, settings))
+
+    # Har per-chat write pehle chat ko `chats` me register karta hai
+    def _chat_write(self, key, sql, params):
+        self._defer(key, self._transaction, [
+            ("INSERT OR IGNORE INTO chats (chat_id) VALUES (?)", (params[0],)),
+            (sql, params),
+        ])
+
+    def set_setting(self, chat_id, key, value):
+        self._chat_write(
+            ("setting", str(chat_id), key),
+            "INSERT INTO chat_settings (chat_id, key, value) VALUES (?, ?, ?) "
+            "ON CONFLICT(chat_id, key) DO UPDATE SET value = excluded.value",
+            (str(chat_id), key, json.dumps(value)),
+        )
+
+    def add_banned_word(self, chat_id, word):
+        self._chat_write(
+            ("banned_word", str(chat_id), word),
+            "INSERT OR IGNORE INTO chat_banned_words (chat_id, word) VALUES (?, ?)",
+            (str(chat_id), word),
+        )
+
+    def remove_banned_word(self, chat_id, word):
+        self._chat_write(
+            ("banned_word", str(chat_id), word),
+            "DELETE FROM chat_banned_words WHERE chat_id = ? AND word = ?",
+            (str(chat_id), word),
+        )
+
+    def set_mute(self, chat_id, user_id, until):
+        self._chat_write(
+            ("mute", str(chat_id), str(user_id)),
+            "INSERT INTO chat_mutes (chat_id, user_id, until) VALUES (?, ?, ?) "
+            "ON CONFLICT(chat_id, user_id) DO UPDATE SET until = excluded.until",
+            (str(chat_id), str(user_id), until),
+        )
+
+    def remove_mutes(self, chat_id, user_ids):
+        self._defer(
+            None, self._executemany,
+            "DELETE FROM chat_mutes WHERE chat_id = ? AND user_id = ?",
+            [(str(chat_id), str(user_id)) for user_id in user_ids],
+        )
+
+    def load_mutes(self):
+        return self._query("SELECT chat_id, user_id, until FROM chat_mutes")
+
+    def load_triggers(self):
+        triggers = {}
+        for trigger, chat_id, message_id, mode, content in self._query(
+            "SELECT trigger, chat_id, message_id, mode, content FROM triggers"
+        ):
+            data = {"chat_id": chat_id, "message_id": message_id, "mode": mode}
+            if content is not None:
+                data["content"] = json.loads(content)
+            triggers[trigger] = data
+        return triggers
+
+    def set_trigger(self, trigger, data):
+        self._defer(("trigger", trigger), self._execute, TRIGGER_UPSERT, trigger_row(trigger, data))
+
+    def remove_trigger(self, trigger):
+        self._defer(
+            ("trigger", trigger), self._execute,
+            "DELETE FROM triggers WHERE trigger = ?", (trigger,),
+        )
+
+    def close(self):
+        with self.lock:
+            self.conn.close()
+
+
+# 🔹 One-shot migrator: JSON files -> SQLite (ek hi transaction me)
+def migrate_json_to_sqlite(source: JsonStorage, target: SqliteStorage):
+    members = list(source.iter_members())
+    users = source.load_users()
+    chats = source.all_chat_settings()
+    triggers = source.load_triggers()
+
+    statements = [
+        ("INSERT OR IGNORE INTO members (chat_id, user_id, name, username, mobile) VALUES (?, ?, ?, ?, ?)", row)
+        for row in members
+    ]
+    statements += [
+        ("INSERT OR IGNORE INTO allowed_users (user_id) VALUES (?)", (user_id,)) for user_id in users
+    ]
+    for chat_id, settings in chats.items():
+        statements += target._seed_statements(chat_id, settings)
+    statements += [(TRIGGER_UPSERT, trigger_row(trigger, data)) for trigger, data in triggers.items()]
+    statements.append((
+        "INSERT INTO meta (key, value) VALUES ('json_migrated', '1') "
+        "ON CONFLICT(key) DO UPDATE SET value = excluded.value", ()
+    ))
+    target._transaction(statements)
+
+    logger.info(
+        f"Migrated JSON -> SQLite: {len(members)} members, "
+        f"{len(chats)} chats, {len(triggers)} triggers"
+    )
+
+
+# Config ke hisaab se backend kholo (STORAGE_BACKEND=json|sqlite)
+def open_storage(backend="json", database_file="bot.db", **json_files):
+    if backend == "sqlite":
+        storage = SqliteStorage(database_file)
+        # Pehli baar SQLite pe aaye to purani JSON files import kar lo
+        if storage.get_meta("json_migrated") is None:
+            source = JsonStorage(**json_files)
+            if any(os.path.exists(path) for path in vars(source).values() if isinstance(path, str)):
+                migrate_json_to_sqlite(source, storage)
+            else:
+                storage.set_meta("json_migrated", "0")
+        return storage
+    if backend == "json":
+        return JsonStorage(**json_files)
+    raise ValueError(f"Unknown storage backend: {backend}")
+
+
+# Manual migration: python storage.py migrate [bot.db]
+if __name__ == "__main__":
+    logging.basicConfig(format="%(asctime)s - %(name)s - %(levelname)s - %(message)s", level=logging.INFO)
+    if len(sys.argv) < 2 or sys.argv[1] != "migrate":
+        print("Usage: python storage.py migrate [database_file]")
+        sys.exit(1)
+    target = SqliteStorage(sys.argv[2] if len(sys.argv) > 2 else "bot.db")
+    migrate_json_to_sqlite(JsonStorage(), target)
+    target.close()
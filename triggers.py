@@ -0,0 +1,218 @@
+import re
+import time
+from collections import OrderedDict
+
+MODES = ("exact", "prefix", "keyword", "fuzzy")
+
+WORD = re.compile(r"\w+")
+END = ""
+
+
+def is_word_char(char) -> bool:
+    return char.isalnum() or char == "_"
+
+
+# Fuzzy trigger me kitni galtiyan chalegi (chhote words pe kam)
+def max_edits(trigger) -> int:
+    if len(trigger) < 4:
+        return 0
+    return 1 if len(trigger) < 9 else 2
+
+
+def trigrams(text):
+    padded = f"  {text} "
+    return {padded[i:i + 3] for i in range(len(padded) - 2)}
+
+
+# Levenshtein distance <= limit? (kisi row me sab limit se bade ho to wahin ruk jaata hai)
+def within_distance(a, b, limit) -> bool:
+    if abs(len(a) - len(b)) > limit:
+        return False
+    previous = list(range(len(b) + 1))
+    for i, char_a in enumerate(a, start=1):
+        current = [i]
+        for j, char_b in enumerate(b, start=1):
+            current.append(min(previous[j] + 1, current[j - 1] + 1, previous[j - 1] + (char_a != char_b)))
+        if min(current) > limit:
+            return False
+        previous = current
+    return previous[-1] <= limit
+
+
+# 🔹 Trigger index (/set pe banta hai, har message pe sirf lookup)
+# exact:   poora message == trigger (dict)
+# prefix:  message trigger se shuru ho, word boundary pe (character trie, longest match)
+# keyword: trigger ke words message me kahin bhi (pehle word pe index)
+# fuzzy:   poora message trigger se thoda alag (trigram index + edit distance)
+class TriggerIndex:
+    def __init__(self, triggers=None):
+        self.clear()
+        for trigger, data in (triggers or {}).items():
+            self.add(trigger, data.get("mode", "exact"))
+
+    def clear(self):
+        self.modes = {}
+        self.exact = {}
+        self.prefix_root = {}
+        self.keywords = {}     # first word -> [(word tuple, trigger), ...]
+        self.fuzzy = {}        # trigram -> {trigger, ...}
+        self.fuzzy_grams = {}  # trigger -> trigram count
+
+    def __len__(self):
+        return len(self.modes)
+
+    def __contains__(self, trigger):
+        return trigger in self.modes
+
+    def add(self, trigger, mode="exact"):
+        if trigger in self.modes:
+            self.remove(trigger)
+        self.modes[trigger] = mode
+        if mode == "prefix":
+            node = self.prefix_root
+            for char in trigger:
+                node = node.setdefault(char, {})
+            node[END] = trigger
+        elif mode == "keyword":
+            words = tuple(WORD.findall(trigger))
+            if words:
+                self.keywords.setdefault(words[0], []).append((words, trigger))
+        elif mode == "fuzzy":
+            grams = trigrams(trigger)
+            self.fuzzy_grams[trigger] = len(grams)
+            for gram in grams:
+                self.fuzzy.setdefault(gram, set()).add(trigger)
+        else:
+            self.exact[trigger] = trigger
+
+    def remove(self, trigger):
+        mode = self.modes.pop(trigger, None)
+        if mode == "prefix":
+            node = self.prefix_root
+            for char in trigger:
+                node = node.get(char)
+                if node is None:
+                    return
+            node.pop(END, None)
+        elif mode == "keyword":
+            words = tuple(WORD.findall(trigger))
+            if words:
+                phrases = [entry for entry in self.keywords.get(words[0], ()) if entry[1] != trigger]
+                if phrases:
+                    self.keywords[words[0]] = phrases
+                else:
+                    self.keywords.pop(words[0], None)
+        elif mode == "fuzzy":
+            self.fuzzy_grams.pop(trigger, None)
+            for gram in trigrams(trigger):
+                bucket = self.fuzzy.get(gram)
+                if bucket is not None:
+                    bucket.discard(trigger)
+                    if not bucket:
+                        del self.fuzzy[gram]
+        elif mode is not None:
+            self.exact.pop(trigger, None)
+
+    # text = lowercased, stripped message; pehla match (exact > prefix > keyword > fuzzy)
+    def match(self, text):
+        trigger = self.exact.get(text)
+        if trigger is not None:
+            return trigger
+        return self.partial_match(text)
+
+    def exact_match(self, text):
+        return self.exact.get(text)
+
+    # Sirf prefix / keyword / fuzzy triggers
+    def partial_match(self, text):
+        if not text or len(self.exact) == len(self.modes):
+            return None
+
+        if self.prefix_root:
+            node, found = self.prefix_root, None
+            for i, char in enumerate(text):
+                node = node.get(char)
+                if node is None:
+                    break
+                # Trigger word boundary pe khatam ho: "hi" -> "hi there" haan, "history" nahi
+                if END in node and (i + 1 == len(text) or not (is_word_char(char) and is_word_char(text[i + 1]))):
+                    found = node[END]
+            if found is not None:
+                return found
+
+        if self.keywords:
+            words = WORD.findall(text)
+            for i, word in enumerate(words):
+                for phrase, trigger in self.keywords.get(word, ()):
+                    if tuple(words[i:i + len(phrase)]) == phrase:
+                        return trigger
+
+        if self.fuzzy and len(text) <= 64:
+            return self._fuzzy_match(text)
+        return None
+
+    def _fuzzy_match(self, text):
+        counts = {}
+        for gram in trigrams(text):
+            for trigger in self.fuzzy.get(gram, ()):
+                counts[trigger] = counts.get(trigger, 0) + 1
+        best = None
+        for trigger, shared in counts.items():
+            limit = max_edits(trigger)
+            # q-gram filter: har edit zyada se zyada 3 trigrams todta hai
+            if shared < self.fuzzy_grams[trigger] - 3 * limit:
+                continue
+            if within_distance(text, trigger, limit) and (best is None or len(trigger) > len(best)):
+                best = trigger
+        return best
+
+
+# 🔹 Message ka content jo bina source chat ke dobara bheja ja sake
+# (text + entities ya media ka file_id + caption). None = copy_message karna padega.
+MEDIA_KINDS = ("animation", "audio", "document", "video", "voice", "video_note", "sticker")
+
+
+def message_content(message):
+    if message is None:
+        return None
+    if message.text:
+        return {
+            "type": "text",
+            "text": message.text,
+            "entities": [entity.to_dict() for entity in message.entities or ()],
+        }
+    caption = {
+        "caption": message.caption,
+        "caption_entities": [entity.to_dict() for entity in message.caption_entities or ()],
+    }
+    if message.photo:
+        return {"type": "photo", "file_id": message.photo[-1].file_id, **caption}
+    for kind in MEDIA_KINDS:
+        media = getattr(message, kind, None)
+        if media is not None:
+            return {"type": kind, "file_id": media.file_id, **caption}
+    return None
+
+
+# 🔹 Per (chat, trigger) cooldown: ek hi trigger baar baar spam na ho
+class TriggerCooldown:
+    def __init__(self, seconds=10, max_entries=50000):
+        self.seconds = seconds
+        self.max_entries = max_entries
+        self.last = OrderedDict()
+
+    # True = abhi bhej sakte hai (aur time note ho jaata hai)
+    def allow(self, chat_id, trigger, now=None) -> bool:
+        if self.seconds <= 0:
+            return True
+        if now is None:
+            now = time.monotonic()
+        key = (chat_id, trigger)
+        last = self.last.get(key)
+        if last is not None and now - last < self.seconds:
+            return False
+        self.last[key] = now
+        self.last.move_to_end(key)
+        if len(self.last) > self.max_entries:
+            self.last.popitem(last=False)
+        return True
@@ -0,0 +1,241 @@
+import asyncio
+import hmac
+import json
+import logging
+import signal
+
+from telegram import Update
+
+logger = logging.getLogger(__name__)
+
+STATUS_TEXT = {
+    200: "OK",
+    400: "Bad Request",
+    403: "Forbidden",
+    404: "Not Found",
+    405: "Method Not Allowed",
+    411: "Length Required",
+    413: "Payload Too Large",
+    431: "Request Header Fields Too Large",
+    502: "Bad Gateway",
+    503: "Service Unavailable",
+}
+
+
+# 🔹 Chhota async HTTP server jo Telegram ke webhook POSTs leta hai
+# Har valid request ka JSON -> Update banke application.update_queue me jaata hai.
+# deliver diya ho (shard dispatcher) to raw body usko milti hai aur uska status jaata hai.
+# Local testing: canned Update JSON ko curl se POST karo.
+# Default sirf localhost pe (TLS reverse proxy ke peeche chalta hai). Slow / atke clients:
+# headers + body read_timeout me, keep-alive pe agli request idle_timeout me - warna connection band.
+class WebhookServer:
+    def __init__(self, application, host="127.0.0.1", port=8443, path="/telegram",
+                 secret_token=None, max_body=1024 * 1024, deliver=None,
+                 max_header=16 * 1024, read_timeout=10, idle_timeout=60, stop_grace=5):
+        self.application = application
+        self.deliver = deliver
+        self.host = host
+        self.port = port
+        self.path = path if path.startswith("/") else f"/{path}"
+        self.secret_token = secret_token
+        self.max_body = max_body
+        self.max_header = max_header
+        self.read_timeout = read_timeout
+        self.idle_timeout = idle_timeout
+        self.stop_grace = stop_grace
+        self.server = None
+        self.closing = False
+        self.connections = set()  # handler tasks
+        self.idle = set()         # writers jo agli request ka wait kar rahe hai
+        self.received = 0
+        self.rejected = 0
+
+    async def start(self):
+        self.closing = False
+        # limit: ek line (request line / header) isse lambi ho to readline ValueError deta hai
+        self.server = await asyncio.start_server(self._handle_connection, self.host, self.port,
+                                                 limit=self.max_header)
+        sockets = self.server.sockets or ()
+        if sockets:
+            self.port = sockets[0].getsockname()[1]
+        logger.info(f"Webhook listening on {self.host}:{self.port}{self.path}")
+
+    # Naye connections band karo; idle keep-alive connections turant band,
+    # chal rahi requests ko stop_grace seconds, phir cancel (aur unka wait)
+    async def stop(self):
+        if self.server is None:
+            return
+        self.closing = True
+        self.server.close()
+        for writer in list(self.idle):
+            writer.close()
+        if self.connections:
+            _, pending = await asyncio.wait(list(self.connections), timeout=self.stop_grace)
+            for task in pending:
+                task.cancel()
+            await asyncio.gather(*pending, return_exceptions=True)
+        await self.server.wait_closed()
+        self.server = None
+
+    async def _handle_connection(self, reader, writer):
+        task = asyncio.current_task()
+        self.connections.add(task)
+        try:
+            # HTTP/1.1 keep-alive: ek connection pe kai requests
+            while not self.closing:
+                keep_alive = await self._handle_request(reader, writer)
+                if not keep_alive:
+                    break
+        except (asyncio.IncompleteReadError, asyncio.TimeoutError, ConnectionError):
+            pass
+        except asyncio.CancelledError:
+            # stop() ne grace ke baad cancel kiya - cancelled task streams callback me traceback log karta
+            pass
+        except Exception as e:
+            logger.error(f"Webhook connection error: {e}")
+        finally:
+            self.connections.discard(task)
+            writer.close()
+            try:
+                await writer.wait_closed()
+            except ConnectionError:
+                pass
+
+    async def _handle_request(self, reader, writer) -> bool:
+        self.idle.add(writer)
+        try:
+            request_line = await asyncio.wait_for(reader.readline(), self.idle_timeout)
+        except ValueError:
+            # Request line max_header se lambi
+            await self._respond(writer, 431, False)
+            return False
+        finally:
+            self.idle.discard(writer)
+        if not request_line:
+            return False
+        try:
+            method, target, version = request_line.decode("latin-1").split()
+        except ValueError:
+            await self._respond(writer, 400, False)
+            return False
+
+        try:
+            headers = await asyncio.wait_for(self._read_headers(reader, len(request_line)),
+                                             self.read_timeout)
+        except ValueError:
+            await self._respond(writer, 431, False)
+            return False
+
+        keep_alive = version == "HTTP/1.1" and headers.get("connection", "").lower() != "close"
+        # Body ki length chahiye (chunked support nahi); kharab length pe connection band
+        length = headers.get("content-length")
+        if length is None and method == "POST":
+            await self._respond(writer, 411, False)
+            return False
+        length = length or "0"
+        if not length.isdigit():
+            await self._respond(writer, 400, False)
+            return False
+        length = int(length)
+        if length > self.max_body:
+            await self._respond(writer, 413, False)
+            return False
+        body = await asyncio.wait_for(reader.readexactly(length), self.read_timeout) if length else b""
+
+        status = await self._dispatch(method, target.split("?", 1)[0], headers, body)
+        # stop() ke dauraan aayi request: jawab do, phir connection band
+        keep_alive = keep_alive and not self.closing
+        await self._respond(writer, status, keep_alive)
+        return keep_alive
+
+    # Request line + saare headers milake max_header se zyada ho to ValueError
+    async def _read_headers(self, reader, size):
+        headers = {}
+        while True:
+            line = await reader.readline()
+            size += len(line)
+            if size > self.max_header:
+                raise ValueError("request headers too large")
+            if line in (b"\r\n", b"\n", b""):
+                return headers
+            name, _, value = line.decode("latin-1").partition(":")
+            headers[name.strip().lower()] = value.strip()
+
+    async def _dispatch(self, method, path, headers, body) -> int:
+        if path != self.path:
+            return 404
+        if method != "POST":
+            return 405
+        if self.secret_token is not None:
+            given = headers.get("x-telegram-bot-api-secret-token", "")
+            if not hmac.compare_digest(given.encode(), self.secret_token.encode()):
+                self.rejected += 1
+                logger.warning("Webhook request with wrong secret token rejected")
+                return 403
+        if self.deliver is not None:
+            self.received += 1
+            return await self.deliver(body)
+        try:
+            data = json.loads(body)
+            # Valid JSON lekin object nahi ([1, 2], "x") - Update nahi ban sakta
+            if not isinstance(data, dict):
+                raise ValueError(f"expected a JSON object, got {type(data).__name__}")
+            update = Update.de_json(data, self.application.bot)
+        except (ValueError, TypeError, KeyError) as e:
+            self.rejected += 1
+            logger.warning(f"Invalid webhook payload: {e}")
+            return 400
+        if update is None:
+            return 400
+        self.received += 1
+        await self.application.update_queue.put(update)
+        return 200
+
+    async def _respond(self, writer, status, keep_alive):
+        writer.write(
+            f"HTTP/1.1 {status} {STATUS_TEXT[status]}\r\n"
+            f"Content-Length: 0\r\n"
+            f"Connection: {'keep-alive' if keep_alive else 'close'}\r\n\r\n".encode("latin-1")
+        )
+        await writer.drain()
+
+
+# 🔹 Webhook mode ka poora lifecycle (run_polling jaisa):
+# initialize -> post_init -> set_webhook (agar url diya) -> start -> serve
+# SIGINT/SIGTERM pe: server band, queue ke pending updates process, post_stop,
+# shutdown, post_shutdown (state flush).
+async def serve_webhook(application, server, webhook_url=None, allowed_updates=None,
+                        max_connections=40, stop_event=None):
+    if stop_event is None:
+        stop_event = asyncio.Event()
+        loop = asyncio.get_running_loop()
+        for sig in (signal.SIGINT, signal.SIGTERM):
+            try:
+                loop.add_signal_handler(sig, stop_event.set)
+            except (NotImplementedError, RuntimeError):
+                pass
+
+    await application.initialize()
+    if application.post_init:
+        await application.post_init(application)
+    if webhook_url:
+        await application.bot.set_webhook(
+            url=webhook_url,
+            secret_token=server.secret_token,
+            allowed_updates=allowed_updates,
+            max_connections=max_connections,
+        )
+    await application.start()
+    await server.start()
+    try:
+        await stop_event.wait()
+    finally:
+        logger.info("Webhook shutting down")
+        await server.stop()
+        # Application.stop() queue me pade updates process karke rukta hai
+        await application.stop()
+        if application.post_stop:
+            await application.post_stop(application)
+        await application.shutdown()
+        if application.post_shutdown:
+            await application.post_shutdown(application)